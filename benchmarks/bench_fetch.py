@@ -0,0 +1,121 @@
+"""
+Measures Session.fetch and Session.fetch_local end to end against the local HTTP stand-in server: requests per second, latency percentiles, and how many requests were cache hits, misses or coalesced onto an identical request that was already being sent
+
+Usage:
+python benchmarks/bench_fetch.py [--requests 2000] [--threads 16] [--latency-ms 5] [--throttle-every 0] [--bad-claims-every 0] [--real-budgets]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from valorant.rateLimiter import DEFAULT_BUDGETS, RateLimiter  # noqa: E402
+from valorant.session import Session  # noqa: E402
+from http_stand_in_server import HTTPStandInServer, StandInConfig, make_puuid  # noqa: E402
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if len(values) == 0:
+        return 0.0
+
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def run_case(session: Session, requests: int, threads: int, request: Callable[[int], object]) -> dict:
+    cache_before = session.cache.get_stats()
+    coalesced_before = session.in_flight.coalesced
+
+    latencies: List[float] = []
+
+    def timed(i: int) -> None:
+        started_at = time.perf_counter()
+        request(i)
+        latencies.append((time.perf_counter() - started_at) * 1000)
+
+    started_at = time.perf_counter()
+
+    with ThreadPoolExecutor(threads) as executor:
+        for _ in executor.map(timed, range(requests)):
+            pass
+
+    elapsed = time.perf_counter() - started_at
+
+    cache_after = session.cache.get_stats()
+    latencies.sort()
+
+    return {
+        "requests_per_second": requests / elapsed,
+        "p50_ms": percentile(latencies, 0.50),
+        "p99_ms": percentile(latencies, 0.99),
+        "hits": cache_after["hits"] - cache_before["hits"],
+        "misses": cache_after["misses"] - cache_before["misses"],
+        "coalesced": session.in_flight.coalesced - coalesced_before
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=5, help="delay added by the server to every response")
+    parser.add_argument("--throttle-every", type=int, default=0, help="answer every nth remote request with 429")
+    parser.add_argument("--bad-claims-every", type=int, default=0, help="answer every nth request with BAD_CLAIMS")
+    parser.add_argument("--real-budgets", action="store_true", help="limit requests with the RateLimiter's recommended budgets (DEFAULT_BUDGETS)")
+    arguments = parser.parse_args()
+
+    config = StandInConfig(latency_seconds=arguments.latency_ms / 1000, throttle_every=arguments.throttle_every, retry_after_seconds=0, bad_claims_every=arguments.bad_claims_every)
+    server = HTTPStandInServer(config)
+    base_url = server.start()
+
+    # the recommended budgets would make the benchmark measure the rate limiter, so they are opt-in
+    budgets = DEFAULT_BUDGETS if arguments.real_budgets else None
+
+    with tempfile.TemporaryDirectory() as directory:
+        lockfile_path, log_path = server.write_client_files(directory)
+        session = Session(rate_limiter=RateLimiter(budgets), lazy=True, base_url=base_url, lockfile_path=lockfile_path, log_path=log_path)
+
+        # resolve the region, headers and local account before timing
+        session.warm_up()
+
+        requests = arguments.requests
+
+        cases = [
+            # every request is for a different player, so each one is sent
+            ("pd, all distinct", lambda i: session.fetch(f"{session.pd_url}/mmr/v1/players/{make_puuid(i)}")),
+            # the same players again, answered from the cache
+            ("pd, all cached", lambda i: session.fetch(f"{session.pd_url}/mmr/v1/players/{make_puuid(i)}")),
+            # uncached requests in runs of 10 for the same key, so concurrent identical requests share one response
+            ("pd, uncached, 10% distinct", lambda i: session.fetch(f"{session.pd_url}/mmr/v1/players/{make_puuid(requests + i // 10)}", use_cache=False)),
+            ("glz, uncached", lambda i: session.fetch(f"{session.glz_url}/parties/v1/parties/party-{i}", use_cache=False)),
+            ("local, uncached", lambda i: session.fetch_local("chat/v4/presences", use_cache=False)),
+        ]
+
+        print(f"{requests} requests per case on {arguments.threads} threads, {arguments.latency_ms:g} ms server latency\n")
+        print(f"{'case':<28} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'hits':>7} {'misses':>7} {'coalesced':>10}")
+
+        for name, request in cases:
+            result = run_case(session, requests, arguments.threads, request)
+
+            print(
+                f"{name:<28} {result['requests_per_second']:>10,.0f} {result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} "
+                f"{result['hits']:>7} {result['misses']:>7} {result['coalesced']:>10}"
+            )
+
+        print(f"\nserver requests: {dict(server.request_counts)}")
+        print(f"server responses: {dict(server.responses_by_status)}")
+        print(f"transport: {session.transport.get_stats()}")
+
+        session.transport.close()
+
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
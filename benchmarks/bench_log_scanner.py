@@ -0,0 +1,89 @@
+"""
+Compares the old full-file reads of ShooterGame.log with LogScanner on a synthetic log
+
+Usage:
+python benchmarks/bench_log_scanner.py [--size-mb 300]
+"""
+
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from valorant.logScanner import LogScanner  # noqa: E402
+
+
+FILLER_LINE = "[2024.01.01-00.00.00:000][  0]LogShooterGame: Display: Synthetic filler line used for benchmarking the log scanner\n"
+
+
+def write_synthetic_log(path: str, size_mb: int) -> None:
+    target = size_mb * 1024 * 1024
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[2024.01.01-00.00.00:000][  0]LogShooterGame: Display: CI server version: release-08.00-12-2345678\n")
+
+        block = FILLER_LINE * 10000
+        written = 0
+        i = 0
+
+        while written < target:
+            f.write(block)
+            f.write(f"[2024.01.01-00.00.00:000][  0]LogPlatformSessionManager: https://glz-eu-1.eu.a.pvp.net/session/v1/sessions/{i}\n")
+            written += len(block)
+            i += 1
+
+        f.write("[2024.01.01-00.00.00:000][  0]LogPlatformSessionManager: https://glz-na-1.na.a.pvp.net/session/v1/sessions/last\n")
+        f.write(FILLER_LINE * 100)
+
+
+def old_get_region(path: str) -> tuple:
+    with open(path, "r") as f:
+        content = f.read()
+
+    return re.search("https://glz-(.+?)-1.(.+?).a.pvp.net", content).groups()
+
+
+def old_get_game_version(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        while True:
+            line = f.readline()
+            if 'CI server version:' in line:
+                return line.split('CI server version: ')[1].strip()
+
+
+def measure(name: str, func) -> float:
+    started_at = time.perf_counter()
+    output = func()
+    elapsed = time.perf_counter() - started_at
+
+    print(f"{name:<36} {elapsed * 1000:10.2f} ms   {output}")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=300)
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "ShooterGame.log")
+        write_synthetic_log(path, arguments.size_mb)
+        print(f"synthetic log: {os.path.getsize(path) / 1024 / 1024:.0f} MiB\n")
+
+        old = measure("old get_region + get_game_version", lambda: (old_get_region(path), old_get_game_version(path)))
+
+        def scan():
+            result = LogScanner(path).scan()
+            return (result.shard, result.region), result.version
+
+        new = measure("LogScanner.scan", scan)
+
+        print(f"\nspeedup: {old / new:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Compares the allocations and time per stanza of the old eager PresenceUpdate with the lazy PresenceUpdate
+
+Usage:
+python benchmarks/bench_presence_update.py [--stanzas 20000]
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from valorant.rank import Rank  # noqa: E402
+from valorant.user.user import User  # noqa: E402
+from valorant.social.updateTypes.presenceUpdate import PresenceUpdate  # noqa: E402
+
+
+class OldPresenceUpdate:
+    """
+    The PresenceUpdate that decoded everything in its constructor, kept here so the two can be compared
+    """
+
+    def __init__(self, session, XML_data: ET.Element):
+        self.raw = XML_data
+
+        self.from_user = self.make_user(session, XML_data.attrib['from'].split("@")[0])
+        self.to_user = self.make_user(session, XML_data.attrib['to'].split("@")[0])
+        self.is_self = self.from_user.puuid == self.to_user.puuid
+
+        self.presence_data = XML_data.find('.//p')
+
+        self.is_unavailable = "type" in XML_data.attrib and XML_data.attrib["type"] == "unavailable"
+        self.invalid = self.presence_data is None
+
+        if self.is_unavailable or self.invalid:
+            return
+
+        self.presence_data = json.loads(base64.b64decode(self.presence_data.text).decode())
+
+        self.from_user.rank = Rank(self.presence_data["competitiveTier"], None)
+        self.from_user.account_level = self.presence_data["accountLevel"]
+
+        self.is_idle = self.presence_data["isIdle"]
+
+        self.queue_ID = self.presence_data["queueId"]
+        self.current_state = self.presence_data["sessionLoopState"]
+
+        self.party_size = self.presence_data["partySize"]
+        self.max_party_size = self.presence_data["maxPartySize"]
+
+        self.ally_team_score = self.presence_data["partyOwnerMatchScoreAllyTeam"]
+        self.enemy_team_score = self.presence_data["partyOwnerMatchScoreEnemyTeam"]
+
+        self.team = self.presence_data["partyOwnerMatchCurrentTeam"]
+        self.map = self.presence_data["matchMap"]
+
+        self.party_ID = self.presence_data["partyId"]
+
+        if self.current_state == "INGAME" and self.team == "":
+            self.invalid = True
+            return
+
+    @staticmethod
+    def make_user(session, puuid: str) -> User:
+        name = session.names.get_cached(puuid)
+        if name is None:
+            return User(session, puuid)
+
+        return User(session, puuid, game_name=name[0], game_tag=name[1])
+
+
+class FakeNameResolver:
+    def get_cached(self, puuid: str):
+        return None
+
+
+class FakeSession:
+    def __init__(self):
+        self.names = FakeNameResolver()
+
+
+def make_presence(i: int) -> ET.Element:
+    private = base64.b64encode(json.dumps({
+        "isValid": True, "sessionLoopState": "MENUS", "partyId": f"party-{i % 50}", "queueId": "competitive",
+        "competitiveTier": i % 25, "accountLevel": i % 400, "isIdle": False, "partySize": 1, "maxPartySize": 5,
+        "partyOwnerMatchScoreAllyTeam": 0, "partyOwnerMatchScoreEnemyTeam": 0, "partyOwnerMatchCurrentTeam": "", "matchMap": "",
+        "playerCardId": "9fb348bc-41a0-91ad-8a3e-818035c4e561", "playerTitleId": "d13e579c-435e-44d4-cec2-6eae5a3c5ed4"
+    }).encode()).decode()
+
+    return ET.fromstring(
+        f'<presence from="{i:08d}-0000-0000-0000-000000000000@eu1.pvp.net/RC-1" to="self@eu1.pvp.net/RC-2" id="presence_{i}">'
+        f'<games><valorant><st>chat</st><s.t>1700000000000</s.t><m></m><s.p>valorant</s.p><p>{private}</p></valorant></games>'
+        f'<show>chat</show><status></status></presence>'
+    )
+
+
+# what a listener reads from each update
+ACCESS_PATTERNS = {
+    "puuid only": lambda update: (update.invalid, update.is_unavailable, update.from_user.puuid if isinstance(update, OldPresenceUpdate) else update.from_puuid),
+    "every field": lambda update: (
+        update.invalid, update.from_user.rank, update.to_user.puuid, update.is_idle, update.queue_ID, update.current_state,
+        update.party_size, update.max_party_size, update.ally_team_score, update.enemy_team_score, update.team, update.map, update.party_ID
+    )
+}
+
+
+def measure(name: str, update_class, access, session, stanzas: list) -> None:
+    # keep the updates alive, as a listener or presence store that holds on to them would
+    tracemalloc.start()
+    updates = []
+
+    for stanza in stanzas:
+        update = update_class(session, stanza)
+        access(update)
+        updates.append(update)
+
+    current, peak = tracemalloc.get_traced_memory()
+    blocks = sum(statistic.count for statistic in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.stop()
+
+    del updates
+
+    started_at = time.perf_counter()
+    for stanza in stanzas:
+        access(update_class(session, stanza))
+    elapsed = time.perf_counter() - started_at
+
+    print(f"{name:<28} {blocks / len(stanzas):8.1f} blocks/stanza {current / len(stanzas):10.0f} B/stanza {elapsed / len(stanzas) * 1e6:8.2f} us/stanza")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stanzas", type=int, default=20000)
+    arguments = parser.parse_args()
+
+    session = FakeSession()
+    stanzas = [make_presence(i) for i in range(arguments.stanzas)]
+
+    for pattern, access in ACCESS_PATTERNS.items():
+        print(f"listener reads {pattern}:")
+
+        measure("old PresenceUpdate", OldPresenceUpdate, access, session, stanzas)
+        measure("lazy PresenceUpdate", PresenceUpdate, access, session, stanzas)
+
+        print()
+
+
+if __name__ == "__main__":
+    main()
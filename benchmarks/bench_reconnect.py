@@ -0,0 +1,115 @@
+"""
+Measures how quickly SocialManager recovers when the XMPP connection breaks: the time from the replay server dropping or stalling the connection until the "resync" event, the number of attempts, and how often the server details and tokens were fetched
+
+Usage:
+python benchmarks/bench_reconnect.py [--runs 5] [--stanzas 2000]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+from typing import List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from valorant.social.socialManager import ServerDetails, SocialManager  # noqa: E402
+from valorant.user.nameResolver import NameResolver  # noqa: E402
+from xmpp_replay_server import XMPPReplayServer, make_roster, make_stream  # noqa: E402
+
+
+# (name, failure, failed connections, ping interval, ping timeout)
+CASES = [
+    ("server closes the connection", "disconnect", 1, 20, 10),
+    ("server closes it 3 times", "disconnect", 3, 20, 10),
+    ("server stalls (0.25 s ping timeout)", "stall", 1, 0.25, 0.25),
+]
+
+
+class CountingSocialManager(SocialManager):
+    def __init__(self, *args, port: int, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.port = port
+        self.server_details_fetches = 0
+        self.token_fetches = 0
+
+    # stand-ins for the clientconfig and PAS requests
+    def get_server_details(self) -> ServerDetails:
+        self.server_details_fetches += 1
+        return ServerDetails("127.0.0.1", self.port, "eu1")
+
+    def get_tokens(self, force_renew: bool = False) -> Tuple[str, str, str]:
+        self.token_fetches += 1
+        return ("pas", "rso", "entitlement")
+
+
+async def run_case(stanzas: List[str], failure: str, failures: int, ping_interval: float, ping_timeout: Optional[float]) -> dict:
+    server = XMPPReplayServer(stanzas, roster=make_roster(100), chunk_size=16 * 1024, failure=failure, fail_after=len(stanzas) // 2, failures=failures)
+    port = server.start_in_thread()
+
+    session = SimpleNamespace()
+    session.names = NameResolver(session)
+
+    social = CountingSocialManager(session, port=port, ping_interval=ping_interval, ping_timeout=ping_timeout)
+
+    resynced = asyncio.Event()
+    resync_events = []
+
+    async with social.subscribe(tag="resync") as subscription:
+        async def wait_for_resync():
+            async for event in subscription:
+                resync_events.append((time.perf_counter(), event))
+
+                if len(resync_events) == failures:
+                    resynced.set()
+
+        waiter = asyncio.create_task(wait_for_resync())
+
+        await social.start()
+        await asyncio.wait_for(resynced.wait(), 60)
+
+        recovered_at, event = resync_events[-1]
+
+        await social.stop()
+        waiter.cancel()
+
+    social.dispatcher.close()
+    server.stop_thread()
+
+    return {
+        "recovery_ms": (recovered_at - server.failed_at) * 1000,
+        "attempts": sum(event.attempts for _, event in resync_events),
+        "reason": event.reason,
+        "server_details_fetches": social.server_details_fetches,
+        "token_fetches": social.token_fetches
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--stanzas", type=int, default=2000)
+    arguments = parser.parse_args()
+
+    stanzas = make_stream(arguments.stanzas)
+
+    print(f"{arguments.runs} runs per case, recovery is measured from the last simulated failure to the resync event\n")
+    print(f"{'case':<38} {'median ms':>10} {'max ms':>8} {'attempts':>9} {'details fetched':>16} {'get_tokens calls':>17}  reason")
+
+    for name, failure, failures, ping_interval, ping_timeout in CASES:
+        results = [asyncio.run(run_case(stanzas, failure, failures, ping_interval, ping_timeout)) for _ in range(arguments.runs)]
+        recoveries = [result["recovery_ms"] for result in results]
+
+        print(
+            f"{name:<38} {statistics.median(recoveries):>10.1f} {max(recoveries):>8.1f} {results[-1]['attempts']:>9} "
+            f"{results[-1]['server_details_fetches']:>16} {results[-1]['token_fetches']:>17}  {results[-1]['reason']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
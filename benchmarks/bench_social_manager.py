@@ -0,0 +1,128 @@
+"""
+Measures SocialManager throughput against the local XMPP replay server: stanzas per second, end-to-end callback latency percentiles and CPU time per stanza through XMLParser.parse_stream and send_event
+
+Usage:
+python benchmarks/bench_social_manager.py [--stanzas 20000] [--rate 0] [--recording path] [--modes inline,thread]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+from typing import List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from valorant.social.socialManager import ServerDetails, SocialManager  # noqa: E402
+from valorant.user.nameResolver import NameResolver  # noqa: E402
+from xmpp_replay_server import XMPPReplayServer, load_recording, make_roster, make_stream  # noqa: E402
+
+
+# (name, chunk size, random split)
+SPLITS = [
+    ("one stanza per write", None, False),
+    ("1 KiB writes", 1024, False),
+    ("16 KiB writes", 16 * 1024, False),
+    ("random 1-4096 B writes", 4096, True),
+]
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if len(values) == 0:
+        return 0.0
+
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def make_session() -> SimpleNamespace:
+    # SocialManager only needs the NameResolver's cache once the server details and tokens are given
+    session = SimpleNamespace()
+    session.names = NameResolver(session)
+
+    return session
+
+
+async def run_case(stanzas: List[str], roster: str, dispatch_mode: str, chunk_size: Optional[int], random_split: bool, rate: Optional[float]) -> dict:
+    server = XMPPReplayServer(stanzas, roster=roster, rate=rate, chunk_size=chunk_size, random_split=random_split)
+    port = server.start_in_thread()
+
+    social = SocialManager(make_session(), dispatch_mode=dispatch_mode)
+
+    latencies: List[float] = []
+    finished = threading.Event()
+    lock = threading.Lock()
+
+    def on_event(event) -> None:
+        received_at = time.perf_counter_ns()
+        raw = getattr(event, "raw", event)
+
+        with lock:
+            latencies.append((received_at - int(raw.attrib["id"])) / 1e6)
+
+            if len(latencies) == len(stanzas):
+                finished.set()
+
+    social.add_callback(on_event, "presence")
+    social.add_callback(on_event, "message")
+
+    # the server starts replaying as soon as the roster is requested, so the handshake is included in the timing
+    started_at = time.perf_counter()
+    cpu_started_at = time.thread_time()
+
+    await social.start(ServerDetails("127.0.0.1", port, "eu1"), ("pas", "rso", "entitlement"))
+
+    while not finished.is_set():
+        await asyncio.sleep(0.001)
+
+    elapsed = time.perf_counter() - started_at
+    cpu = time.thread_time() - cpu_started_at
+
+    await social.stop()
+    social.dispatcher.close()
+    server.stop_thread()
+
+    latencies.sort()
+
+    return {
+        "stanzas_per_second": len(stanzas) / elapsed,
+        "p50_ms": percentile(latencies, 0.50),
+        "p90_ms": percentile(latencies, 0.90),
+        "p99_ms": percentile(latencies, 0.99),
+        "cpu_us_per_stanza": cpu / len(stanzas) * 1e6
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stanzas", type=int, default=20000)
+    parser.add_argument("--rate", type=float, default=0, help="stanzas per second sent by the server, 0 for as fast as possible")
+    parser.add_argument("--roster-items", type=int, default=500)
+    parser.add_argument("--recording", help="a file with recorded XMPP data to replay instead of the synthetic stream")
+    parser.add_argument("--modes", default="inline,thread", help="comma separated dispatch modes")
+    arguments = parser.parse_args()
+
+    stanzas = load_recording(arguments.recording) if arguments.recording else make_stream(arguments.stanzas)
+    roster = make_roster(arguments.roster_items)
+    rate = arguments.rate if arguments.rate > 0 else None
+
+    print(f"{len(stanzas)} stanzas, roster of {arguments.roster_items}, rate {'unlimited' if rate is None else f'{rate:.0f}/s'}")
+    print("cpu is the time spent on the client's event loop thread (reading, TLS, parsing and dispatching)\n")
+
+    print(f"{'dispatch':<8} {'split':<24} {'stanzas/s':>12} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'cpu us/stanza':>14}")
+
+    for dispatch_mode in arguments.modes.split(","):
+        for name, chunk_size, random_split in SPLITS:
+            result = asyncio.run(run_case(stanzas, roster, dispatch_mode, chunk_size, random_split, rate))
+
+            print(
+                f"{dispatch_mode:<8} {name:<24} {result['stanzas_per_second']:>12,.0f} {result['p50_ms']:>9.2f} "
+                f"{result['p90_ms']:>9.2f} {result['p99_ms']:>9.2f} {result['cpu_us_per_stanza']:>14.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Compares the old regex-and-recursion XMLParser with the streaming XMLParser on a synthetic XMPP stream
+
+Usage:
+python benchmarks/bench_xml_parser.py [--stanzas 20000] [--chunk-size 1024] [--roster-items 10000]
+"""
+
+import argparse
+import base64
+import json
+import os
+import re
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from valorant.social.xmlParser import XMLParser  # noqa: E402
+
+
+class OldXMLParser:
+    """
+    The parser that XMLParser replaced, kept here so the two can be compared
+    """
+
+    def __init__(self):
+        self.buffer = ""
+
+    def custom_checks(self, xml_data: str) -> bool:
+        return xml_data.startswith("<?xml") or xml_data.startswith("<stream:features>") or xml_data.startswith("<message")
+
+    def parse_xml(self, xml_data: str) -> list:
+        xml_data = self.buffer + xml_data
+        self.buffer = ""
+
+        if self.custom_checks(xml_data):
+            return [xml_data]
+
+        start_tag = re.findall(r'<(\w+)', xml_data)
+
+        if len(start_tag) == 0:
+            self.buffer = xml_data
+            return []
+
+        start_tag = start_tag[0]
+        start_tag_length = len(start_tag)
+
+        stop_tag = xml_data.find(f"</{start_tag}")
+
+        if stop_tag == -1:
+            self.buffer = xml_data
+            return []
+
+        if len(xml_data) <= stop_tag + start_tag_length + 3:
+            return [xml_data]
+
+        newest_xml = xml_data[:stop_tag + start_tag_length + 3]
+        search_output = self.parse_xml(xml_data[len(newest_xml):])
+
+        return [newest_xml] + search_output
+
+
+def make_presence(i: int) -> str:
+    private = base64.b64encode(json.dumps({
+        "isValid": True, "sessionLoopState": "MENUS", "partyId": f"party-{i % 50}", "queueId": "competitive",
+        "competitiveTier": i % 25, "accountLevel": i % 400, "isIdle": False, "partySize": 1, "maxPartySize": 5,
+        "partyOwnerMatchScoreAllyTeam": 0, "partyOwnerMatchScoreEnemyTeam": 0, "partyOwnerMatchCurrentTeam": "", "matchMap": ""
+    }).encode()).decode()
+
+    return (
+        f'<presence from="{i:08d}-0000-0000-0000-000000000000@eu1.pvp.net/RC-1" to="self@eu1.pvp.net/RC-2" id="presence_{i}">'
+        f'<games><valorant><st>chat</st><s.t>1700000000000</s.t><m></m><s.p>valorant</s.p><p>{private}</p></valorant></games>'
+        f'<show>chat</show><status></status></presence>'
+    )
+
+
+def make_roster(items: int) -> str:
+    roster = "".join(f'<item jid="{i:08d}-0000-0000-0000-000000000000@eu1.pvp.net" name="player{i}" subscription="both"><id name="player{i}" tagline="{i % 10000}"/></item>' for i in range(items))
+    return f'<iq type="result" id="2"><query xmlns="jabber:iq:riotgames:roster">{roster}</query></iq>'
+
+
+def make_stream(stanzas: int) -> str:
+    return "".join(make_presence(i) for i in range(stanzas))
+
+
+def split_chunks(stream: str, chunk_size: int) -> list:
+    return [stream[i:i + chunk_size] for i in range(0, len(stream), chunk_size)]
+
+
+def run_old(chunks: list) -> int:
+    parser = OldXMLParser()
+    count = 0
+
+    for chunk in chunks:
+        for xml in parser.parse_xml(chunk):
+            # the old parser only split the stream, the stanzas were parsed later in send_event
+            try:
+                ET.fromstring(xml)
+                count += 1
+            except ET.ParseError:
+                pass
+
+    return count
+
+
+def run_new(chunks: list) -> int:
+    parser = XMLParser()
+    count = 0
+
+    for chunk in chunks:
+        count += len(parser.parse_xml(chunk))
+
+    return count
+
+
+def measure(name: str, func, chunks: list, expected: int) -> float:
+    started_at = time.perf_counter()
+    count = func(chunks)
+    elapsed = time.perf_counter() - started_at
+
+    print(f"{name:<24} {elapsed * 1000:10.2f} ms   {count / elapsed:12,.0f} stanzas/s   {count}/{expected} stanzas")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stanzas", type=int, default=20000)
+    parser.add_argument("--chunk-size", type=int, default=1024)
+    parser.add_argument("--roster-items", type=int, default=10000)
+    arguments = parser.parse_args()
+
+    stream = make_stream(arguments.stanzas)
+    print(f"synthetic stream: {arguments.stanzas} stanzas, {len(stream) / 1024:.0f} KiB\n")
+
+    for chunk_size in (arguments.chunk_size, 64 * 1024):
+        chunks = split_chunks(stream, chunk_size)
+        print(f"chunk size {chunk_size} bytes:")
+
+        old = measure("old XMLParser", run_old, chunks, arguments.stanzas)
+        new = measure("streaming XMLParser", run_new, chunks, arguments.stanzas)
+
+        print(f"speedup: {old / new:.1f}x\n")
+
+    # a single large stanza, such as the roster, arriving in many small chunks
+    roster = make_roster(arguments.roster_items)
+    chunks = split_chunks(roster, arguments.chunk_size)
+    print(f"roster with {arguments.roster_items} items, {len(roster) / 1024:.0f} KiB, chunk size {arguments.chunk_size} bytes:")
+
+    old = measure("old XMLParser", run_old, chunks, 1)
+    new = measure("streaming XMLParser", run_new, chunks, 1)
+
+    print(f"speedup: {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,495 @@
+"""
+A local HTTP stand-in for the local Riot Client API and Riot's pd, glz, shared, auth, PAS and clientconfig servers. A Session is pointed at it with Session(base_url=..., lockfile_path=..., log_path=...), using the files written by write_client_files
+
+Remote services are served under their name as the first part of the path (ex. /pd/mmr/v1/players/{puuid}), and everything else is treated as the local Riot Client API
+"""
+
+import base64
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qs, urlsplit
+
+
+LOCAL_PUUID = "00000000-0000-0000-0000-00000000self"
+
+# the currency and item type IDs that the wrapper's parsers look up
+VALORANT_POINTS_ID = "85ad13f7-3d1b-5128-9eb2-7cd8ee0b5741"
+KINGDOM_CREDITS_ID = "85ca954a-41f2-ce94-9b45-8ca3dd39a00d"
+RADIANITE_POINTS_ID = "e59aa87c-4cbf-517a-5983-6e81511be9b7"
+FREE_AGENTS_ID = "f08d4ae3-939c-4576-ab26-09ce1f23bb37"
+
+SKIN_TYPE_ID = "e7c63390-eda7-46e0-bb7a-a6abdacd2433"
+BUDDY_TYPE_ID = "dd3bf334-87f3-40bd-b043-682a57a8dc3a"
+SPRAY_TYPE_ID = "d5f120f8-ff8c-4aac-92ea-f2b5acbe9475"
+CURRENCY_TYPE_ID = "ea6fcd2e-8373-4137-b1c0-b458947aa86d"
+
+
+def make_jwt(payload: dict) -> str:
+    def encode(data: dict) -> str:
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+
+    return f"{encode({'alg': 'none', 'typ': 'JWT'})}.{encode(payload)}.signature"
+
+
+def make_puuid(i: int) -> str:
+    return f"{i:08d}-0000-0000-0000-000000000000"
+
+
+def make_offer(offer_ID: str, item_type_ID: str, item_ID: str, currency_ID: str, cost: int, quantity: int = 1) -> dict:
+    return {
+        "OfferID": offer_ID,
+        "IsDirectPurchase": True,
+        "StartDate": "2024-01-01T00:00:00Z",
+        "Cost": {currency_ID: cost},
+        "Rewards": [{"ItemTypeID": item_type_ID, "ItemID": item_ID, "Quantity": quantity}]
+    }
+
+
+def make_player_identity(puuid: str, i: int) -> dict:
+    return {
+        "Subject": puuid,
+        "PlayerCardID": "9fb348bc-41a0-91ad-8a3e-818035c4e561",
+        "PlayerTitleID": "",
+        "AccountLevel": 20 + i,
+        "PreferredLevelBorderID": "",
+        "Incognito": i % 5 == 4,
+        "HideAccountLevel": i % 3 == 2
+    }
+
+
+class StandInHTTPServer(ThreadingHTTPServer):
+    # the default backlog of 5 drops connections when many clients connect at once, which then wait a second to retry
+    request_queue_size = 128
+
+
+class StandInConfig:
+    def __init__(self, latency_seconds: Union[float, Tuple[float, float]] = 0.0, throttle_every: int = 0, retry_after_seconds: float = 1, bad_claims_every: int = 0, seed: int = 0):
+        """
+        Parameters:
+        latency_seconds (Union[float, Tuple[float, float]], defaults to 0): The delay before every response, or a (minimum, maximum) range to pick it from
+        throttle_every (int, defaults to 0): If not 0, every nth request to a remote service is answered with 429 and a Retry-After header
+        retry_after_seconds (float, defaults to 1): The Retry-After value sent with 429 responses
+        bad_claims_every (int, defaults to 0): If not 0, every nth request is answered with a BAD_CLAIMS error
+        seed (int, defaults to 0): The seed for random latencies
+        """
+
+        self.latency_seconds = latency_seconds
+        self.throttle_every = throttle_every
+        self.retry_after_seconds = retry_after_seconds
+        self.bad_claims_every = bad_claims_every
+        self.random = random.Random(seed)
+
+    def get_latency(self) -> float:
+        if isinstance(self.latency_seconds, tuple):
+            return self.random.uniform(*self.latency_seconds)
+
+        return self.latency_seconds
+
+
+class HTTPStandInServer:
+    def __init__(self, config: Optional[StandInConfig] = None, friends: int = 100, matches: int = 200, shard: str = "eu", region: str = "eu", version: str = "release-08.00-shipping-12-2345678"):
+        """
+        Parameters:
+        config (StandInConfig, optional, defaults to None): The latency and error injection settings
+        friends (int, defaults to 100): The number of friends returned by chat/v4/friends
+        matches (int, defaults to 200): The number of matches in the local account's match history
+        shard (str, defaults to "eu"): The shard written to the logging file
+        region (str, defaults to "eu"): The region written to the logging file
+        version (str, defaults to "release-08.00-shipping-12-2345678"): The CI server version written to the logging file
+        """
+
+        self.config = config if config is not None else StandInConfig()
+
+        self.friends = friends
+        self.matches = matches
+        self.shard = shard
+        self.region = region
+        self.version = version
+
+        self.password = "stand-in-password"
+
+        # tokens expire in an hour, so the TokenManager does not refresh them during a benchmark
+        expires_at = int(time.time()) + 3600
+        self.access_token = make_jwt({"sub": LOCAL_PUUID, "exp": expires_at})
+        self.entitlement_token = make_jwt({"sub": LOCAL_PUUID, "exp": expires_at})
+        self.pas_token = make_jwt({"sub": LOCAL_PUUID, "exp": expires_at, "affinity": region})
+
+        self.request_counts: Counter = Counter()
+        self.responses_by_status: Counter = Counter()
+        self.requests = 0
+        self.lock = threading.Lock()
+
+        self.routes: List[Tuple[str, "re.Pattern", Callable[..., Tuple[int, Union[dict, list, str]]]]] = []
+        self.add_routes()
+
+        self.server: Optional[StandInHTTPServer] = None
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        if self.server is None:
+            raise RuntimeError("The stand-in server has not been started. Call start() first")
+
+        return self.server.server_address[1]
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def write_client_files(self, directory: str) -> Tuple[str, str]:
+        """
+        Writes a lockfile that points at this server and a Valorant logging file with its shard, region and version. The server must have been started, since the lockfile contains its port
+
+        Parameters:
+        directory (str): The directory to write the files to
+
+        Returns:
+        Tuple[str, str]: The paths to the lockfile and the logging file
+        """
+
+        port = self.port
+
+        lockfile_path = os.path.join(directory, "lockfile")
+        log_path = os.path.join(directory, "ShooterGame.log")
+
+        with open(lockfile_path, "w") as f:
+            f.write(f"Riot Client:{os.getpid()}:{port}:{self.password}:http")
+
+        # the version is stored in the log without "shipping", which Session adds back
+        log_version = self.version.replace("-shipping", "")
+
+        with open(log_path, "w") as f:
+            f.write(f"[2024.01.01-00.00.00:000][  0]LogShooterGame: Display: CI server version: {log_version}\n")
+            f.write(f"[2024.01.01-00.00.01:000][  0]LogPlatformSessionManager: https://glz-{self.shard}-1.{self.region}.a.pvp.net/session/v1/sessions/{LOCAL_PUUID}\n")
+
+        return lockfile_path, log_path
+
+    def start(self) -> str:
+        """
+        Starts the server on a free port in a background thread
+
+        Returns:
+        str: The base url to pass to Session
+        """
+
+        handler = self.make_handler()
+        self.server = StandInHTTPServer(("127.0.0.1", 0), handler)
+        self.server.daemon_threads = True
+
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+        return self.base_url
+
+    def stop(self) -> None:
+        if self.server is None:
+            return
+
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+        self.server = None
+        self.thread = None
+
+    def route(self, method: str, pattern: str):
+        def decorator(func):
+            self.routes.append((method, re.compile(pattern + "$"), func))
+            return func
+
+        return decorator
+
+    def add_routes(self) -> None:
+        route = self.route
+
+        # the local Riot Client API
+        @route("GET", r"/entitlements/v1/token")
+        def entitlements(match, query, body):
+            return 200, {"accessToken": self.access_token, "token": self.entitlement_token, "subject": LOCAL_PUUID, "entitlements": []}
+
+        @route("GET", r"/chat/v4/friends")
+        def friends(match, query, body):
+            return 200, {"friends": [
+                {"puuid": make_puuid(i), "game_name": f"friend{i}", "game_tag": f"{i % 10000}", "note": "", "region": self.region, "last_online_ts": 0, "pid": f"{make_puuid(i)}@{self.region}1.pvp.net"}
+                for i in range(self.friends)
+            ]}
+
+        @route("GET", r"/chat/v4/presences")
+        def presences(match, query, body):
+            return 200, {"presences": []}
+
+        @route("GET", r"/chat/v6/conversations(?:/ares-coregame)?")
+        def conversations(match, query, body):
+            return 200, {"conversations": []}
+
+        @route("GET", r"/chat/v6/messages")
+        def get_messages(match, query, body):
+            return 200, {"messages": []}
+
+        @route("POST", r"/chat/v6/messages")
+        def send_message(match, query, body):
+            return 200, {"messages": [{"body": (body or {}).get("message", ""), "cid": (body or {}).get("cid", "")}]}
+
+        @route("GET", r"/chat/v5/participants")
+        def participants(match, query, body):
+            return 200, {"participants": []}
+
+        @route("GET", r"/help")
+        def help(match, query, body):
+            return 200, {"events": {}, "functions": {}, "types": {}}
+
+        # auth, PAS and clientconfig
+        @route("GET", r"/auth/userinfo")
+        def userinfo(match, query, body):
+            return 200, {"sub": LOCAL_PUUID, "country": "gbr", "acct": {"game_name": "stand-in", "tag_line": "0000"}}
+
+        @route("GET", r"/pas/pas/v1/service/chat")
+        def pas(match, query, body):
+            return 200, self.pas_token
+
+        @route("GET", r"/clientconfig/api/v1/config/player")
+        def clientconfig(match, query, body):
+            return 200, {
+                "chat.affinities": {self.region: "127.0.0.1"},
+                "chat.port": 5223,
+                "chat.affinity_domains": {self.region: f"{self.region}1"}
+            }
+
+        # pd
+        @route("PUT", r"/pd/name-service/v2/players")
+        def names(match, query, body):
+            return 200, [{"Subject": puuid, "GameName": f"player-{puuid[:8]}", "TagLine": "0000", "DisplayName": ""} for puuid in (body or [])]
+
+        @route("GET", r"/pd/mmr/v1/players/([^/]+)")
+        def mmr(match, query, body):
+            return 200, {"Subject": match.group(1), "QueueSkills": {"competitive": {"SeasonalInfoBySeasonID": {"season": {"Rank": 15, "RankedRating": 40}}}}}
+
+        @route("GET", r"/pd/mmr/v1/players/([^/]+)/competitiveupdates")
+        def competitive_updates(match, query, body):
+            start, end = self.get_range(query)
+            return 200, {"Subject": match.group(1), "Matches": [
+                {"MatchID": f"match-{i}", "MapID": "/Game/Maps/Ascent/Ascent", "MatchStartTime": 1700000000000 - i * 3600000, "TierAfterUpdate": 15, "TierBeforeUpdate": 15,
+                 "RankedRatingAfterUpdate": 40, "RankedRatingBeforeUpdate": 30, "RankedRatingEarned": 10, "RankedRatingPerformanceBonus": 0, "AFKPenalty": 0, "CompetitiveMovement": "MOVEMENT_UNKNOWN", "SeasonID": "season"}
+                for i in range(start, min(end, self.matches))
+            ]}
+
+        @route("GET", r"/pd/match-history/v1/history/([^/]+)")
+        def match_history(match, query, body):
+            start, end = self.get_range(query)
+            return 200, {"Subject": match.group(1), "BeginIndex": start, "EndIndex": end, "Total": self.matches, "History": [
+                {"MatchID": f"match-{i}", "GameStartTime": 1700000000000 - i * 3600000, "QueueID": "competitive"}
+                for i in range(start, min(end, self.matches))
+            ]}
+
+        @route("GET", r"/pd/match-details/v1/matches/([^/]+)")
+        def match_details(match, query, body):
+            return 200, {
+                "matchInfo": {"matchId": match.group(1), "mapId": "/Game/Maps/Ascent/Ascent", "queueID": "competitive", "gameStartMillis": 1700000000000, "gameLengthMillis": 1800000},
+                "players": [{"subject": make_puuid(i), "teamId": "Red" if i < 5 else "Blue", "competitiveTier": 15, "stats": {"kills": i, "deaths": 10 - i, "assists": 3}} for i in range(10)],
+                "teams": [{"teamId": "Red", "won": True, "roundsWon": 13}, {"teamId": "Blue", "won": False, "roundsWon": 7}]
+            }
+
+        @route("GET", r"/pd/store/v2/storefront/([^/]+)")
+        def storefront(match, query, body):
+            skin_offers = [make_offer(f"offer-{i}", SKIN_TYPE_ID, f"skin-{i}", VALORANT_POINTS_ID, 1775) for i in range(4)]
+
+            bundle_items = [
+                {"Item": {"ItemTypeID": SKIN_TYPE_ID, "ItemID": f"bundle-skin-{i}", "Amount": 1}, "BasePrice": 1775, "CurrencyID": VALORANT_POINTS_ID, "DiscountPercent": 0.33, "DiscountedPrice": 1189, "IsPromoItem": False}
+                for i in range(4)
+            ]
+
+            bundle = {
+                "ID": "bundle-1",
+                "DataAssetID": "bundle-asset-1",
+                "CurrencyID": VALORANT_POINTS_ID,
+                "Items": bundle_items,
+                "TotalBaseCost": {VALORANT_POINTS_ID: 7100},
+                "TotalDiscountedCost": {VALORANT_POINTS_ID: 4756},
+                "TotalDiscountPercent": 0.33,
+                "DurationRemainingInSeconds": 86400,
+                "WholesaleOnly": False
+            }
+
+            return 200, {
+                "FeaturedBundle": {"Bundle": bundle, "Bundles": [bundle], "BundleRemainingDurationInSeconds": 86400},
+                "SkinsPanelLayout": {
+                    "SingleItemOffers": [offer["OfferID"] for offer in skin_offers],
+                    "SingleItemStoreOffers": skin_offers,
+                    "SingleItemOffersRemainingDurationInSeconds": 3600
+                },
+                "UpgradeCurrencyStore": {"UpgradeCurrencyOffers": [
+                    {"OfferID": f"radianite-{i}", "StorefrontItemID": f"radianite-item-{i}", "Offer": make_offer(f"radianite-{i}", CURRENCY_TYPE_ID, RADIANITE_POINTS_ID, VALORANT_POINTS_ID, 800 * (i + 1), quantity=20 * (i + 1))}
+                    for i in range(2)
+                ]},
+                "AccessoryStore": {
+                    "AccessoryStoreOffers": [
+                        {"Offer": make_offer(f"accessory-{i}", SPRAY_TYPE_ID if i % 2 else BUDDY_TYPE_ID, f"accessory-{i}", KINGDOM_CREDITS_ID, 4000), "ContractID": "contract-1"}
+                        for i in range(4)
+                    ],
+                    "AccessoryStoreRemainingDurationInSeconds": 604800,
+                    "StorefrontID": "storefront-1"
+                }
+            }
+
+        @route("GET", r"/pd/store/v1/offers/?")
+        def offers(match, query, body):
+            return 200, {"Offers": [{"OfferID": f"offer-{i}", "Cost": {VALORANT_POINTS_ID: 1775}, "Rewards": []} for i in range(500)]}
+
+        @route("GET", r"/pd/store/v1/wallet/([^/]+)")
+        def wallet(match, query, body):
+            return 200, {"Balances": {VALORANT_POINTS_ID: 1000, KINGDOM_CREDITS_ID: 5000, RADIANITE_POINTS_ID: 40, FREE_AGENTS_ID: 1}}
+
+        @route("GET", r"/pd/store/v1/entitlements/([^/]+)/([^/]+)")
+        def entitlements_by_type(match, query, body):
+            return 200, {"ItemTypeID": match.group(2), "Entitlements": [{"TypeID": match.group(2), "ItemID": f"item-{i}"} for i in range(20)]}
+
+        @route("GET", r"/pd/restrictions/v3/penalties")
+        def penalties(match, query, body):
+            return 200, {"Penalties": []}
+
+        # glz
+        @route("GET", r"/glz/core-game/v1/players/([^/]+)")
+        def core_game_player(match, query, body):
+            return 200, {"Subject": match.group(1), "MatchID": "core-game-match"}
+
+        @route("GET", r"/glz/core-game/v1/matches/([^/]+)")
+        def core_game_match(match, query, body):
+            return 200, {
+                "MatchID": match.group(1),
+                "State": "IN_PROGRESS",
+                "MapID": "/Game/Maps/Ascent/Ascent",
+                "ModeID": "/Game/GameModes/Bomb/BombGameMode.BombGameMode_C",
+                "ProvisioningFlow": "Matchmaking",
+                "Players": [
+                    {"Subject": make_puuid(i), "TeamID": "Red" if i < 5 else "Blue", "CharacterID": f"agent-{i}", "PlayerIdentity": make_player_identity(make_puuid(i), i), "IsCoach": False, "IsAssociated": True}
+                    for i in range(10)
+                ]
+            }
+
+        @route("GET", r"/glz/pregame/v1/players/([^/]+)")
+        def pregame_player(match, query, body):
+            return 200, {"Subject": match.group(1), "MatchID": "pregame-match"}
+
+        @route("GET", r"/glz/pregame/v1/matches/([^/]+)")
+        def pregame_match(match, query, body):
+            # players that have not locked in an agent yet have an empty CharacterID
+            ally_team = {"TeamID": "Red", "Players": [
+                {"Subject": make_puuid(i), "CharacterID": f"agent-{i}" if i % 2 == 0 else "", "CharacterSelectionState": "locked" if i % 2 == 0 else "", "PregamePlayerState": "joined", "CompetitiveTier": 15, "PlayerIdentity": make_player_identity(make_puuid(i), i), "IsCaptain": i == 0}
+                for i in range(5)
+            ]}
+
+            return 200, {
+                "ID": match.group(1),
+                "Teams": [ally_team],
+                "AllyTeam": ally_team,
+                "EnemyTeam": None,
+                "ObserverSubjects": [],
+                "MapID": "/Game/Maps/Ascent/Ascent",
+                "Mode": "/Game/GameModes/Bomb/BombGameMode.BombGameMode_C",
+                "QueueID": "competitive",
+                "IsRanked": True,
+                "PregameState": "character_select_active",
+                "PhaseTimeRemainingNS": 60000000000
+            }
+
+        @route("GET", r"/glz/parties/v1/players/([^/]+)")
+        def party_player(match, query, body):
+            return 200, {"Subject": match.group(1), "CurrentPartyID": "party-1"}
+
+        @route("GET", r"/glz/parties/v1/parties/([^/]+)")
+        def party(match, query, body):
+            return 200, {"ID": match.group(1), "Members": [{"Subject": LOCAL_PUUID}], "State": "DEFAULT"}
+
+        # shared
+        @route("GET", r"/shared/content-service/v3/content")
+        def content(match, query, body):
+            return 200, {"Seasons": [{"ID": "season", "Name": "ACT 1", "Type": "act", "IsActive": True}], "Events": []}
+
+    @staticmethod
+    def get_range(query: Dict[str, List[str]]) -> Tuple[int, int]:
+        start = int(query.get("startIndex", ["0"])[0])
+        end = int(query.get("endIndex", [str(start + 20)])[0])
+
+        return start, end
+
+    def handle(self, method: str, path: str, body: Optional[Union[dict, list]]) -> Tuple[int, Dict[str, str], Union[dict, list, str]]:
+        """
+        Answers a request
+
+        Returns:
+        Tuple[int, Dict[str, str], Union[dict, list, str]]: The status code, extra headers and body
+        """
+
+        split_path = urlsplit(path)
+        query = parse_qs(split_path.query)
+        service = split_path.path.split("/", 2)[1]
+        is_remote = service in ("pd", "glz", "shared", "auth", "pas", "clientconfig")
+
+        with self.lock:
+            self.requests += 1
+            request_number = self.requests
+            self.request_counts[service if is_remote else "local"] += 1
+
+        latency = self.config.get_latency()
+        if latency > 0:
+            time.sleep(latency)
+
+        if is_remote and self.config.throttle_every and request_number % self.config.throttle_every == 0:
+            return 429, {"Retry-After": str(self.config.retry_after_seconds)}, {"errorCode": "RESOURCE_EXHAUSTED", "message": "Rate Limited"}
+
+        if self.config.bad_claims_every and request_number % self.config.bad_claims_every == 0 and split_path.path != "/entitlements/v1/token":
+            return 400, {}, {"httpStatus": 400, "errorCode": "BAD_CLAIMS", "message": "Failure validating/decoding RSO Access Token"}
+
+        for route_method, pattern, func in self.routes:
+            if route_method != method:
+                continue
+
+            match = pattern.match(split_path.path)
+            if match is not None:
+                status, response = func(match, query, body)
+                return status, {}, response
+
+        return 404, {}, {"httpStatus": 404, "errorCode": "RESOURCE_NOT_FOUND", "message": f"{method} {split_path.path} is not emulated"}
+
+    def make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            # the headers and body are separate writes, which would otherwise wait on the client's delayed ACK
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def respond(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length)) if length else None
+
+                status, headers, response = server.handle(self.command, self.path, body)
+                data = response.encode() if isinstance(response, str) else json.dumps(response).encode()
+
+                with server.lock:
+                    server.responses_by_status[status] += 1
+
+                self.send_response(status)
+                self.send_header("Content-Type", "text/plain" if isinstance(response, str) else "application/json")
+                self.send_header("Content-Length", str(len(data)))
+
+                for name, value in headers.items():
+                    self.send_header(name, value)
+
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_PUT = do_POST = do_DELETE = respond
+
+        return Handler
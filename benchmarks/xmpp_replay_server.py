@@ -0,0 +1,325 @@
+"""
+A local TLS stand-in for the Riot chat (XMPP) server. It answers the authentication sequence sent by SocialManager.send_auth_messages, answers the roster query, and then replays a recorded or synthetic stanza stream
+
+Stanzas may contain the placeholder __SENT_AT__, which is replaced with time.perf_counter_ns() when the stanza is written, so a client in the same process can measure end-to-end latency
+"""
+
+import asyncio
+import base64
+import json
+import os
+import random
+import re
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from typing import Iterator, List, Optional, Tuple
+
+
+SENT_AT_PLACEHOLDER = "__SENT_AT__"
+
+PING_PATTERN = re.compile(r"<iq[^>]*id=['\"]([^'\"]+)['\"][^>]*><ping ")
+
+FAILURES = ("disconnect", "stall")
+
+STREAM_HEADER = "<?xml version='1.0'?><stream:stream xmlns='jabber:client' xmlns:stream='http://etherx.jabber.org/streams' version='1.0' id='replay'>"
+
+
+def generate_certificate(directory: str) -> Tuple[str, str]:
+    """
+    Generates a self-signed certificate for localhost with the openssl command line tool
+
+    Returns:
+    Tuple[str, str]: The paths to the certificate and the private key
+    """
+
+    certificate_path = os.path.join(directory, "replay-cert.pem")
+    key_path = os.path.join(directory, "replay-key.pem")
+
+    try:
+        subprocess.run(
+            ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-keyout", key_path, "-out", certificate_path, "-days", "1", "-subj", "/CN=localhost"],
+            check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise RuntimeError("Unable to generate a certificate for the replay server. Is openssl installed?") from e
+
+    return certificate_path, key_path
+
+
+def make_presence(i: int, puuid: Optional[str] = None, session_loop_state: str = "MENUS") -> str:
+    """
+    Creates a synthetic Valorant presence stanza that is stamped with its send time
+    """
+
+    puuid = puuid if puuid is not None else f"{i:08d}-0000-0000-0000-000000000000"
+
+    payload = base64.b64encode(json.dumps({
+        "isValid": True, "sessionLoopState": session_loop_state, "partyId": f"party-{i % 50}", "queueId": "competitive",
+        "competitiveTier": i % 25, "accountLevel": i % 400, "isIdle": False, "partySize": 1, "maxPartySize": 5,
+        "partyOwnerMatchScoreAllyTeam": 0, "partyOwnerMatchScoreEnemyTeam": 0, "partyOwnerMatchCurrentTeam": "", "matchMap": ""
+    }).encode()).decode()
+
+    return (
+        f'<presence from="{puuid}@eu1.pvp.net/RC-1" to="self@eu1.pvp.net/RC-2" id="{SENT_AT_PLACEHOLDER}">'
+        f'<games><valorant><st>chat</st><s.t>1700000000000</s.t><m></m><s.p>valorant</s.p><p>{payload}</p></valorant></games>'
+        f'<show>chat</show><status></status></presence>'
+    )
+
+
+def make_message(i: int) -> str:
+    return (
+        f'<message from="{i:08d}-0000-0000-0000-000000000000@eu1.pvp.net/RC-1" to="self@eu1.pvp.net" type="chat" id="{SENT_AT_PLACEHOLDER}">'
+        f'<body>message {i} &amp; some text</body></message>'
+    )
+
+
+def make_roster(items: int) -> str:
+    roster = "".join(
+        f'<item jid="{i:08d}-0000-0000-0000-000000000000@eu1.pvp.net" puuid="{i:08d}-0000-0000-0000-000000000000" subscription="both">'
+        f'<id name="player{i}" tagline="{i % 10000}"/></item>'
+        for i in range(items)
+    )
+
+    return f'<iq type="result" id="2"><query xmlns="jabber:iq:riotgames:roster">{roster}</query></iq>'
+
+
+def make_stream(stanzas: int, senders: int = 500, message_every: int = 50) -> List[str]:
+    """
+    Creates a synthetic stream of presences from a fixed set of senders, with an occasional chat message
+    """
+
+    return [make_message(i) if message_every and i % message_every == message_every - 1 else make_presence(i, f"{i % senders:08d}-0000-0000-0000-000000000000") for i in range(stanzas)]
+
+
+def load_recording(path: str) -> List[str]:
+    """
+    Loads a recorded stream. The file contains the raw XMPP data received after authentication, and is split into stanzas at top-level tags
+    """
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = f.read()
+
+    return [stanza for stanza in re.split(r"(?=<(?:presence|message|iq)[\s>/])", data) if stanza.strip()]
+
+
+class XMPPReplayServer:
+    def __init__(self, stanzas: List[str], roster: Optional[str] = None, rate: Optional[float] = None, chunk_size: Optional[int] = None, random_split: bool = False, seed: int = 0, certificate_directory: Optional[str] = None, failure: Optional[str] = None, fail_after: int = 0, failures: int = 1):
+        """
+        Parameters:
+        stanzas (List[str]): The stanzas replayed after authentication
+        roster (str, optional, defaults to None): The answer to the roster query. If None, an empty roster is sent
+        rate (float, optional, defaults to None): The number of stanzas sent per second. If None, they are sent as fast as the client reads them
+        chunk_size (int, optional, defaults to None): The number of bytes per write. If None, every stanza is written separately
+        random_split (bool, defaults to False): If True, writes are split at random points between 1 and chunk_size bytes
+        seed (int, defaults to 0): The seed for random_split
+        certificate_directory (str, optional, defaults to None): Where the self-signed certificate is written. If None, a temporary directory is used
+        failure (str, optional, defaults to None): Simulates a broken connection after fail_after stanzas have been replayed. "disconnect" closes the connection and "stall" stops sending anything, including ping responses, while keeping it open
+        fail_after (int, defaults to 0): The number of stanzas replayed before the failure
+        failures (int, defaults to 1): The number of connections that fail. Later connections replay every stanza
+        """
+
+        if failure is not None and failure not in FAILURES:
+            raise ValueError(f"failure must be one of {FAILURES}, got {failure!r}")
+
+        self.stanzas = stanzas
+        self.roster = roster if roster is not None else make_roster(0)
+
+        self.rate = rate
+        self.chunk_size = chunk_size
+        self.random_split = random_split
+        self.random = random.Random(seed)
+
+        self.temporary_directory = tempfile.TemporaryDirectory() if certificate_directory is None else None
+        self.certificate_directory = certificate_directory if certificate_directory is not None else self.temporary_directory.name
+
+        self.port = 0
+        self.server: Optional[asyncio.AbstractServer] = None
+
+        self.failure = failure
+        self.fail_after = fail_after
+        self.failures = failures
+
+        self.connections = 0
+        self.replays_finished = 0
+        self.failures_simulated = 0
+        self.pings_answered = 0
+
+        # time.perf_counter() when the last failure was simulated
+        self.failed_at: Optional[float] = None
+        self.received = ""
+
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread: Optional[threading.Thread] = None
+
+    def create_ssl_context(self) -> ssl.SSLContext:
+        certificate_path, key_path = generate_certificate(self.certificate_directory)
+
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(certificate_path, key_path)
+
+        return context
+
+    async def start(self) -> int:
+        """
+        Starts listening on a free port on 127.0.0.1
+
+        Returns:
+        int: The port
+        """
+
+        self.server = await asyncio.start_server(self.handle_client, "127.0.0.1", 0, ssl=self.create_ssl_context())
+        self.port = self.server.sockets[0].getsockname()[1]
+
+        return self.port
+
+    async def stop(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    def start_in_thread(self) -> int:
+        """
+        Runs the server on an event loop in a background thread, so the client's CPU time can be measured separately
+
+        Returns:
+        int: The port
+        """
+
+        started = threading.Event()
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            self.loop.run_until_complete(self.start())
+            started.set()
+            self.loop.run_forever()
+
+            self.loop.run_until_complete(self.stop())
+            self.loop.close()
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        started.wait()
+
+        return self.port
+
+    def stop_thread(self) -> None:
+        if self.thread is None:
+            return
+
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.thread = None
+
+        if self.temporary_directory is not None:
+            self.temporary_directory.cleanup()
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        buffer = ""
+
+        async def expect(token: str) -> None:
+            nonlocal buffer
+
+            while token not in buffer:
+                data = await reader.read(65536)
+                if data == b"":
+                    raise ConnectionError("The client disconnected during authentication")
+
+                buffer += data.decode()
+                self.received += data.decode()
+
+            buffer = buffer[buffer.index(token) + len(token):]
+
+        try:
+            await expect("<stream:stream")
+            writer.write((STREAM_HEADER + "<stream:features><mechanisms xmlns='urn:ietf:params:xml:ns:xmpp-sasl'><mechanism>X-Riot-RSO-PAS</mechanism></mechanisms></stream:features>").encode())
+
+            await expect("</auth>")
+            writer.write(b"<success xmlns='urn:ietf:params:xml:ns:xmpp-sasl'/>")
+
+            await expect("<stream:stream")
+            writer.write((STREAM_HEADER + "<stream:features><bind xmlns='urn:ietf:params:xml:ns:xmpp-bind'/><session xmlns='urn:ietf:params:xml:ns:xmpp-session'/></stream:features>").encode())
+
+            await expect("_xmpp_bind1")
+            writer.write(b"<iq id='_xmpp_bind1' type='result'><bind xmlns='urn:ietf:params:xml:ns:xmpp-bind'><jid>self@eu1.pvp.net/RC-2</jid></bind></iq>")
+
+            await expect("_xmpp_session1")
+            writer.write(b"<iq id='_xmpp_session1' type='result'/>")
+
+            await expect("xmpp_entitlements_0")
+            writer.write(b"<iq id='xmpp_entitlements_0' type='result'/>")
+
+            await expect("jabber:iq:riotgames:roster")
+            await self.write(writer, self.roster)
+
+            failure = self.failure if self.failures_simulated < self.failures else None
+
+            if failure is None:
+                await self.replay(writer, self.stanzas)
+                self.replays_finished += 1
+            else:
+                await self.replay(writer, self.stanzas[:self.fail_after])
+                self.failures_simulated += 1
+                self.failed_at = time.perf_counter()
+
+                if failure == "disconnect":
+                    return
+
+            # keep the connection open until the client closes it, answering pings unless the connection is stalled
+            while True:
+                data = await reader.read(65536)
+                if data == b"":
+                    break
+
+                if failure == "stall":
+                    continue
+
+                for ping_id in PING_PATTERN.findall(data.decode()):
+                    writer.write(f"<iq type='result' id='{ping_id}'/>".encode())
+                    self.pings_answered += 1
+
+        except (ConnectionError, ssl.SSLError):
+            pass
+
+        finally:
+            writer.close()
+
+    def iter_chunks(self, data: str) -> Iterator[str]:
+        if self.chunk_size is None:
+            yield data
+            return
+
+        position = 0
+        while position < len(data):
+            size = self.random.randint(1, self.chunk_size) if self.random_split else self.chunk_size
+            yield data[position:position + size]
+            position += size
+
+    async def write(self, writer: asyncio.StreamWriter, data: str) -> None:
+        for chunk in self.iter_chunks(data):
+            writer.write(chunk.encode())
+            await writer.drain()
+
+    async def replay(self, writer: asyncio.StreamWriter, stanzas: List[str]) -> None:
+        started_at = time.perf_counter()
+        pending = ""
+
+        for index, stanza in enumerate(stanzas):
+            if self.rate is not None:
+                delay = started_at + index / self.rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            pending += stanza.replace(SENT_AT_PLACEHOLDER, str(time.perf_counter_ns()))
+
+            # without a rate or chunk size every stanza is its own write, otherwise stanzas are packed into writes of about chunk_size bytes
+            if self.rate is not None or self.chunk_size is None or len(pending) >= self.chunk_size:
+                await self.write(writer, pending)
+                pending = ""
+
+        if pending != "":
+            await self.write(writer, pending)
@@ -1 +1,2 @@
 from .session import Session
+from .asyncSession import AsyncSession
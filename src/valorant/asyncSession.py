@@ -0,0 +1,569 @@
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
+import json
+
+from . import utilities
+from .session import Session
+from .rateLimiter import RateLimitError
+
+# aiohttp is optional. without it, requests are sent from a worker pool with the blocking Session
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+if TYPE_CHECKING:
+    from .user.user import User
+    from .user.users import Users
+    from .user.localAccount import LocalAccount
+    from .rank import Rank
+    from .match.match import Match
+    from .store.storeFront import StoreFront
+
+
+class AsyncNameBatch:
+    def __init__(self):
+        """
+        A group of puuids whose names are looked up together by an AsyncSession
+        """
+
+        self.puuids: List[str] = []
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class AsyncSession:
+    def __init__(self, session: Optional[Session] = None, max_concurrency: int = 32, use_aiohttp: Optional[bool] = None):
+        """
+        Asyncio session for Valorant. Requests are sent with aiohttp on the running event loop and share the Session's authentication headers, CacheManager, RateLimiter and known names. If aiohttp is not installed, the blocking Session is run in a worker pool instead
+
+        Parameters:
+        session (Session, optional, defaults to None): The Session object to share state with. A new Session is created if None
+        max_concurrency (int, defaults to 32): The maximum number of requests that can be in flight at once
+        use_aiohttp (bool, optional, defaults to None): If True, aiohttp is required. If False, the worker pool is always used. If None, aiohttp is used if it is installed
+        """
+
+        if use_aiohttp and aiohttp is None:
+            raise ImportError("use_aiohttp requires aiohttp, which can be installed with: pip install valorant-wrapper[async]")
+
+        self.session: Session = session if session is not None else Session()
+        self.max_concurrency = max_concurrency
+
+        self.is_native = aiohttp is not None if use_aiohttp is None else use_aiohttp
+
+        # with aiohttp the pool only runs the rare blocking calls (ex. renewing the authentication headers)
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency if not self.is_native else 4, thread_name_prefix="valorant-async")
+
+        # created lazily so that they belong to the running event loop
+        self.client: Optional["aiohttp.ClientSession"] = None
+        self.semaphore: Optional[asyncio.Semaphore] = None
+
+        # identical requests that are already being sent, keyed by their cache key
+        self.in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.coalesced = 0
+
+        # name lookups are batched like the Session's NameResolver, and resolved names are stored in it
+        self.open_name_batch: Optional[AsyncNameBatch] = None
+        self.names_in_flight: Dict[str, AsyncNameBatch] = {}
+        self.name_requests_sent = 0
+
+    @staticmethod
+    async def create(max_concurrency: int = 32, *args, use_aiohttp: Optional[bool] = None, **kwargs) -> "AsyncSession":
+        """
+        Creates an AsyncSession without blocking the event loop while the Session reads the log file, fetches the authentication headers and gets the local account
+
+        Parameters:
+        max_concurrency (int, defaults to 32): The maximum number of requests that can be in flight at once
+        use_aiohttp (bool, optional, defaults to None): See AsyncSession
+        *args: additional arguments passed to the Session init function
+        **kwargs: additional keyword arguments passed to the Session init function
+
+        Returns:
+        AsyncSession: The created AsyncSession
+        """
+
+        def make_session() -> Session:
+            session = Session(*args, **kwargs)
+            session.warm_up()
+            return session
+
+        session = await asyncio.get_running_loop().run_in_executor(None, make_session)
+        return AsyncSession(session, max_concurrency=max_concurrency, use_aiohttp=use_aiohttp)
+
+    def get_client(self) -> "aiohttp.ClientSession":
+        if self.client is None or self.client.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+            self.client = aiohttp.ClientSession(connector=connector)
+
+        return self.client
+
+    def get_semaphore(self) -> asyncio.Semaphore:
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        return self.semaphore
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Runs a blocking function in the worker pool, limited by max_concurrency
+
+        Parameters:
+        func (Callable[..., Any]): The function to run
+        *args: additional arguments passed to func
+        **kwargs: additional keyword arguments passed to func
+
+        Returns:
+        Any: The output of func
+        """
+
+        async with self.get_semaphore():
+            return await self.run_in_worker(func, *args, **kwargs)
+
+    async def run_in_worker(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    async def request(self, method: str, url: str, headers: Optional[dict] = None, verify: bool = True, **kwargs) -> Tuple[int, Any, Any, int]:
+        """
+        Sends a request with aiohttp, limited by max_concurrency
+
+        Parameters:
+        method (str): The method the request will be sent with
+        url (str): The url of the request
+        headers (dict, optional, defaults to None): The headers of the request
+        verify (bool, defaults to True): If False, the server's certificate is not verified (used for the Riot Client's self-signed certificate)
+        **kwargs: additional keyword arguments passed to aiohttp (ex. params, json, data)
+
+        Returns:
+        Tuple[int, Any, Any, int]: The status code, the response headers, the JSON response and the length of the response body. The JSON response is None if the status code is 429
+        """
+
+        if not verify:
+            kwargs["ssl"] = False
+
+        async with self.get_semaphore():
+            async with self.get_client().request(method, url, headers=headers, **kwargs) as r:
+                if r.status == 429:
+                    return r.status, r.headers, None, 0
+
+                # read as bytes so the length of the body can be used as the size of the cached response. an empty body is None, like aiohttp's json()
+                body = await r.read()
+                return r.status, r.headers, json.loads(body) if body.strip() else None, len(body)
+
+    async def coalesce(self, cache_key: Hashable, send_request: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Awaits send_request, unless an identical request is already being sent, in which case its response is returned instead
+
+        Parameters:
+        cache_key (Hashable): The cache key of the request
+        send_request (Callable[[], Awaitable[Any]]): Sends the request
+
+        Returns:
+        Any: The response of the request
+        """
+
+        task = self.in_flight.get(cache_key)
+
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        # the request is sent in its own task, so cancelling the caller that started it does not cancel the others waiting for it
+        task = asyncio.ensure_future(send_request())
+        self.in_flight[cache_key] = task
+
+        def finish(task: asyncio.Future) -> None:
+            del self.in_flight[cache_key]
+
+            # the exception is raised to the callers, so it does not matter if all of them were cancelled
+            if not task.cancelled():
+                task.exception()
+
+        task.add_done_callback(finish)
+
+        return await asyncio.shield(task)
+
+    async def get_auth_headers(self) -> dict:
+        auth = self.session.auth
+
+        if auth.auth_headers is not None and not auth.token_manager.is_expiring("access", "entitlement", margin_seconds=0):
+            return auth.auth_headers
+
+        return await self.run_in_worker(auth.get_auth_headers)
+
+    def renew_auth_headers(self, stale_headers: Optional[dict]) -> dict:
+        """
+        Rereads the lockfile and renews the authentication headers. Blocking, so it is run in the worker pool
+
+        Parameters:
+        stale_headers (dict, optional): The headers that were rejected
+
+        Returns:
+        dict: The new headers
+        """
+
+        self.session.auth.get_lockfile_contents(force_reread=True)
+        return self.session.auth.renew_auth_headers(stale_headers)
+
+    async def fetch(self, url: str, method: str = "GET", use_cache: bool = True, use_auth_headers: bool = True, set_cache_time_seconds: Optional[int] = None, *, persist: bool = False, rate_limit_mode: Optional[str] = None, rate_limit_deadline: Optional[float] = None, **kwargs) -> Optional[dict]:
+        """
+        Awaitable version of Session.fetch. Additional keyword arguments (ex. params, json, data) are passed to aiohttp, or to requests if aiohttp is not used
+
+        Returns:
+        dict: The JSON response from the url
+        """
+
+        if not self.is_native:
+            return await self.run(self.session.fetch, url, method, use_cache, use_auth_headers, set_cache_time_seconds, persist=persist, rate_limit_mode=rate_limit_mode, rate_limit_deadline=rate_limit_deadline, **kwargs)
+
+        cache = self.session.cache
+        rate_limiter = self.session.rate_limiter
+
+        cache_key = utilities.build_request_key(method, url, (), kwargs)
+
+        # grab the item from the cache if it exists
+        if use_cache:
+            response = cache.get_from_cache(cache_key)
+
+            if response is not None:
+                return response
+
+        async def send_request(throttled_retries: int = 0, is_retry: bool = False) -> dict:
+            # wait for the endpoint's rate limit budget
+            await rate_limiter.acquire_async(url, rate_limit_mode, rate_limit_deadline)
+
+            headers = await self.get_auth_headers() if use_auth_headers else None
+            status, response_headers, data, size = await self.request(method, url, headers=headers, **kwargs)
+
+            if status == 429:
+                # pause the endpoint's bucket and queue the request again
+                retry_after = rate_limiter.pause(url, response_headers.get('Retry-After'))
+
+                if (rate_limit_mode or rate_limiter.mode) == "fail_fast" or throttled_retries >= rate_limiter.max_throttled_retries:
+                    raise RateLimitError(f"Too many requests. Retry in {retry_after:.0f} seconds.")
+
+                return await send_request(throttled_retries + 1, is_retry)
+
+            if method.upper() == "POST":
+                return data
+
+            # renew the tokens and try once more. requests that hit the same stale tokens share one renewal
+            if "errorCode" in data and data["errorCode"] == "BAD_CLAIMS":
+                if is_retry:
+                    raise RuntimeError(f"Request to {url} was rejected with BAD_CLAIMS after renewing the authentication headers.")
+
+                await self.run_in_worker(self.renew_auth_headers, headers if headers is not None else self.session.auth.auth_headers)
+                return await send_request(throttled_retries, True)
+
+            if cache.read_only_responses:
+                data = utilities.freeze(data)
+
+            cache.add_to_cache(cache_key, data, set_cache_time_seconds, persist=persist, size=size)
+
+            return data
+
+        if Session.should_coalesce(method, use_cache):
+            return await self.coalesce(cache_key, send_request)
+
+        return await send_request()
+
+    async def fetch_local(self, path: str, method: str = "GET", use_cache: bool = True, set_cache_time_seconds: Optional[int] = None, *, persist: bool = False, **kwargs) -> dict:
+        """
+        Awaitable version of Session.fetch_local. Additional keyword arguments (ex. params, json, data) are passed to aiohttp, or to requests if aiohttp is not used
+
+        Returns:
+        dict: The JSON response from the given path
+        """
+
+        if not self.is_native:
+            return await self.run(self.session.fetch_local, path, method, use_cache, set_cache_time_seconds, persist=persist, **kwargs)
+
+        auth = self.session.auth
+        cache = self.session.cache
+
+        # only stats the lockfile, which is reparsed if the Riot Client has rewritten it
+        auth.get_lockfile_contents()
+
+        cache_key = utilities.build_request_key(method, f"local:///{path}", (), kwargs)
+
+        # grab the item from the cache if it exists
+        if use_cache:
+            response = cache.get_from_cache(cache_key)
+
+            if response is not None:
+                return response
+
+        async def send_request(is_retry: bool = False, is_failover: bool = False) -> dict:
+            stale_headers = auth.auth_headers
+            lockfile_generation = auth.lockfile_generation
+            lockfile_contents = auth.lockfile_contents
+
+            try:
+                _, _, data, size = await self.request(method, f"{lockfile_contents['protocol']}://127.0.0.1:{lockfile_contents['port']}/{path}", headers=auth.local_auth_headers, verify=False, **kwargs)
+
+            except aiohttp.ClientConnectionError:
+                # the Riot Client may have restarted on a new port, so wait for it to write a new lockfile and try again
+                if is_failover or not await self.run_in_worker(auth.wait_for_lockfile_change, lockfile_generation, auth.lockfile_failover_seconds):
+                    raise
+
+                return await send_request(is_retry, True)
+
+            # renew the tokens and try once more
+            if "errorCode" in data and data["errorCode"] == "BAD_CLAIMS":
+                if is_retry:
+                    raise RuntimeError(f"Request to local/{path} was rejected with BAD_CLAIMS after renewing the authentication headers.")
+
+                await self.run_in_worker(self.renew_auth_headers, stale_headers)
+                return await send_request(True, is_failover)
+
+            if cache.read_only_responses:
+                data = utilities.freeze(data)
+
+            cache.add_to_cache(cache_key, data, set_cache_time_seconds, persist=persist, size=size)
+
+            return data
+
+        if Session.should_coalesce(method, use_cache):
+            return await self.coalesce(cache_key, send_request)
+
+        return await send_request()
+
+    async def resolve_names(self, puuids: Iterable[str], batch_window_seconds: Optional[float] = None) -> Dict[str, Tuple[str, str]]:
+        """
+        Awaitable version of NameResolver.resolve. Lookups made within the batch window of each other are sent together, and the names are stored in the Session's NameResolver
+
+        Parameters:
+        puuids (Iterable[str]): The puuids to resolve
+        batch_window_seconds (float, optional, defaults to None): The amount of time to collect lookups for before sending them. Defaults to the NameResolver's batch window
+
+        Returns:
+        Dict[str, Tuple[str, str]]: The game name and tag line of each puuid, keyed by puuid. Puuids that name-service did not return are left out
+        """
+
+        names = self.session.names
+
+        puuids = list(dict.fromkeys(puuids))
+        waiting_on: List[AsyncNameBatch] = []
+
+        for puuid in puuids:
+            if names.get_cached(puuid) is not None:
+                continue
+
+            # another lookup is already sending this puuid
+            if puuid in self.names_in_flight:
+                if self.names_in_flight[puuid] not in waiting_on:
+                    waiting_on.append(self.names_in_flight[puuid])
+
+                continue
+
+            # the batch is sent by a task, so it is still sent if the lookup that opened it is cancelled
+            if self.open_name_batch is None:
+                self.open_name_batch = AsyncNameBatch()
+                asyncio.ensure_future(self.flush_names(self.open_name_batch, batch_window_seconds if batch_window_seconds is not None else names.batch_window_seconds))
+
+            if self.open_name_batch not in waiting_on:
+                waiting_on.append(self.open_name_batch)
+
+            self.open_name_batch.puuids.append(puuid)
+            self.names_in_flight[puuid] = self.open_name_batch
+
+        for batch in waiting_on:
+            await asyncio.shield(batch.future)
+
+        resolved: Dict[str, Tuple[str, str]] = {}
+        for puuid in puuids:
+            name = names.get_cached(puuid)
+
+            if name is not None:
+                resolved[puuid] = name
+
+        return resolved
+
+    async def flush_names(self, batch: AsyncNameBatch, batch_window_seconds: float) -> None:
+        """
+        Waits for the batch window to pass, then sends the batch in chunks of the NameResolver's max_batch_size
+
+        Parameters:
+        batch (AsyncNameBatch): The batch to send
+        batch_window_seconds (float): The amount of time to collect lookups for
+        """
+
+        names = self.session.names
+
+        if batch_window_seconds > 0:
+            await asyncio.sleep(batch_window_seconds)
+
+        # stop adding to the batch
+        if self.open_name_batch is batch:
+            self.open_name_batch = None
+
+        try:
+            for i in range(0, len(batch.puuids), names.max_batch_size):
+                chunk = batch.puuids[i:i + names.max_batch_size]
+                content = await self.fetch(f"{self.session.pd_url}/name-service/v2/players", method="PUT", use_cache=False, json=chunk)
+
+                self.name_requests_sent += 1
+
+                for data in content:
+                    names.remember(data["Subject"], data["GameName"], data["TagLine"])
+
+        except BaseException as e:
+            batch.future.set_exception(e)
+
+            # lookups that were cancelled while waiting never retrieve the exception
+            batch.future.exception()
+
+        else:
+            batch.future.set_result(None)
+
+        finally:
+            for puuid in batch.puuids:
+                if self.names_in_flight.get(puuid) is batch:
+                    del self.names_in_flight[puuid]
+
+    async def get_local_account(self) -> "LocalAccount":
+        if self.session.local_account is not None:
+            return self.session.local_account
+
+        return await self.run_in_worker(self.session.get_local_account)
+
+    async def get_name(self, user: "User") -> str:
+        """
+        Awaitable version of User.get_name
+
+        Parameters:
+        user (User): The user to get the name of
+
+        Returns:
+        str: The display name of the player
+        """
+
+        # names that are already known do not need a request
+        if user.incognito or not (user.game_name is None or user.game_tag is None):
+            return user.get_name()
+
+        if not self.is_native:
+            return await self.run(user.get_name)
+
+        name = (await self.resolve_names([user.puuid])).get(user.puuid)
+        if name is None:
+            raise RuntimeError(f"Unable to find the name of the user with the puuid {user.puuid}.")
+
+        user.game_name, user.game_tag = name
+
+        return user.game_name + "#" + user.game_tag
+
+    async def get_names(self, users: "Users") -> List[str]:
+        """
+        Awaitable version of Users.get_names
+
+        Parameters:
+        users (Users): The users to get the names of
+
+        Returns:
+        List[str]: A list of strings representing the username and tagline of each player. Does not include incognito players
+        """
+
+        if not self.is_native:
+            return await self.run(users.get_names)
+
+        filtered = users.filter_for_incognito()
+
+        # only look up the users whose names we do not already have
+        unnamed_users = [u for u in filtered.visible_users if u.game_name is None or u.game_tag is None]
+        names = await self.resolve_names(u.puuid for u in unnamed_users)
+
+        for user in unnamed_users:
+            if user.puuid in names:
+                user.game_name, user.game_tag = names[user.puuid]
+
+        return [u.game_name + "#" + u.game_tag for u in filtered.visible_users if not (u.game_name is None or u.game_tag is None)]
+
+    async def get_rank(self, user: "User", use_cache: bool = False) -> "Rank":
+        """
+        Awaitable version of User.get_rank
+
+        Parameters:
+        user (User): The user to get the rank of
+        use_cache (bool, defaults to False): Should the request use the cache if available?
+
+        Returns:
+        Rank: An object representing the rank of the user
+        """
+
+        if user.rank is not None:
+            return user.rank
+
+        if not self.is_native:
+            return await self.run(user.get_rank, use_cache=use_cache)
+
+        from .rank import Rank
+
+        data = await self.fetch(f"{self.session.pd_url}/mmr/v1/players/{user.puuid}/competitiveupdates?startIndex=0&endIndex=1&queue=competitive", use_cache=use_cache)
+
+        if len(data["Matches"]) == 0:
+            return Rank(0, None)
+
+        return Rank(data["Matches"][0]["TierAfterUpdate"], data["Matches"][0]["RankedRatingAfterUpdate"])
+
+    async def get_current_game(self) -> Optional["Match"]:
+        """
+        Awaitable version of LocalAccount.get_current_game
+
+        Returns:
+        Optional[Match]: A Match or None object that contains data relating to the current game
+        """
+
+        local_account = await self.get_local_account()
+
+        if not self.is_native:
+            return await self.run(local_account.get_current_game)
+
+        from .match.match import Match
+
+        content = await self.fetch(f"{self.session.glz_url}/core-game/v1/players/{local_account.puuid}", use_cache=False)
+
+        if "httpStatus" in content and content["httpStatus"] == 404:
+            return None
+
+        current_game = await self.fetch(f"{self.session.glz_url}/core-game/v1/matches/{content['MatchID']}", use_cache=False)
+
+        match = Match.from_json(self.session, current_game, fetch_names=False)
+        await self.get_names(match.players)
+
+        return match
+
+    async def get_storefront(self) -> "StoreFront":
+        """
+        Awaitable version of StoreManager.get_storefront
+
+        Returns:
+        StoreFront: A StoreFront object containing data relating to the current storefront of the local user
+        """
+
+        if not self.is_native:
+            return await self.run(self.session.store.get_storefront)
+
+        from .store.storeFront import StoreFront
+
+        local_account = await self.get_local_account()
+        data = await self.fetch(f"{self.session.pd_url}/store/v2/storefront/{local_account.puuid}")
+
+        return StoreFront.from_json(self.session, data)
+
+    async def close(self) -> None:
+        """
+        Closes the aiohttp connections and shuts down the worker pool
+        """
+
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
+
+        self.executor.shutdown(wait=False)
+
+    async def __aenter__(self) -> "AsyncSession":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
@@ -1,55 +1,151 @@
-from typing import List, TYPE_CHECKING
+from typing import List, TYPE_CHECKING, Optional, Tuple
 
 import os
-import requests
+import threading
+import time
 import base64
-import json
 
-from . import utilities
+from .tokenManager import TokenManager, decode_jwt
 
 if TYPE_CHECKING:
     from .session import Session
 
 
 class AuthorizationManager:
-    def __init__(self, session: "Session"):
+    def __init__(self, session: "Session", lockfile_path: Optional[str] = None):
         """
         Manages getting authentication information from local endpoints and from the lockfile
 
         Parameters:
         session (Session): The Session object
+        lockfile_path (str, optional, defaults to None): The path to the Riot Client's lockfile. Defaults to the lockfile in %LOCALAPPDATA%
         """
 
         self.session = session
 
-        self.lockfile_path = os.path.join(os.getenv('LOCALAPPDATA'), R'Riot Games\Riot Client\Config\lockfile')
+        self.lockfile_path = lockfile_path if lockfile_path is not None else os.path.join(os.getenv('LOCALAPPDATA'), R'Riot Games\Riot Client\Config\lockfile')
         self.lockfile_contents = None
 
+        # (mtime, size, inode) of the lockfile when it was last parsed
+        self.lockfile_signature: Optional[Tuple[int, int, int]] = None
+
+        # increases every time the port, password or protocol in the lockfile changes, and notifies waiters
+        self.lockfile_generation = 0
+        self.lockfile_changed = threading.Condition()
+
+        # how long fetch_local waits for the Riot Client to come back on a new port after a connection error
+        self.lockfile_failover_seconds = 5.0
+
         self.local_auth_headers = None
         self.auth_headers = None
 
         self.parsed_pas_token = None
         self.pas_token = None
 
-    def get_lockfile_contents(self) -> dict:
+        # makes sure only one thread fetches the authentication headers at a time
+        self.lock = threading.RLock()
+        self.pas_lock = threading.Lock()
+
+        # refreshes the tokens in the background shortly before they expire, so requests do not have to
+        self.token_manager = TokenManager(self)
+        self.auto_refresh_tokens = True
+
+    def get_lockfile_signature(self) -> Tuple[int, int, int]:
         """
-        Gets the current lockfile contents
+        Gets the modification time, size and inode of the lockfile
+
+        Returns:
+        Tuple[int, int, int]: The signature of the lockfile
+        """
+
+        stat = os.stat(self.lockfile_path)
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def get_lockfile_contents(self, force_reread: bool = False) -> dict:
+        """
+        Gets the current lockfile contents. The lockfile is only reparsed if it has changed since it was last read
+
+        Parameters:
+        force_reread (bool, defaults to False): If True, the lockfile is reparsed even if it has not changed
 
         Returns:
         dict: The lockfile contents as a dictionary
         """
 
-        f = open(self.lockfile_path, "r")
-        content = f.read().split(":")
-        f.close()
+        signature = self.get_lockfile_signature()
 
-        self.lockfile_contents = dict(zip(['name', 'PID', 'port', 'password', 'protocol'], content))
+        with self.lockfile_changed:
+            if self.lockfile_contents is not None and signature == self.lockfile_signature and not force_reread:
+                return self.lockfile_contents
 
-        self.local_auth_headers = {
-            'Authorization': 'Basic ' + base64.b64encode(('riot:' + self.lockfile_contents['password']).encode()).decode()
-        }
+            f = open(self.lockfile_path, "r")
+            content = f.read().split(":")
+            f.close()
+
+            lockfile_contents = dict(zip(['name', 'PID', 'port', 'password', 'protocol'], content))
+            previous_contents = self.lockfile_contents
+
+            self.local_auth_headers = {
+                'Authorization': 'Basic ' + base64.b64encode(('riot:' + lockfile_contents['password']).encode()).decode()
+            }
+
+            self.lockfile_contents = lockfile_contents
+            self.lockfile_signature = signature
+
+            # the Riot Client restarted, so connections to the old port are useless
+            if previous_contents is not None and any(previous_contents.get(key) != lockfile_contents.get(key) for key in ('port', 'password', 'protocol')):
+                self.session.transport.reset_pool("local")
+
+                self.lockfile_generation += 1
+                self.lockfile_changed.notify_all()
+
+            return self.lockfile_contents
+
+    def check_lockfile(self) -> bool:
+        """
+        Rereads the lockfile if it has changed
+
+        Returns:
+        bool: True if the port, password or protocol changed
+        """
+
+        generation = self.lockfile_generation
+        self.get_lockfile_contents()
+
+        return generation != self.lockfile_generation
+
+    def wait_for_lockfile_change(self, generation: int, timeout_seconds: float, poll_interval_seconds: float = 0.25) -> bool:
+        """
+        Waits for the Riot Client to write a lockfile with a different port, password or protocol
 
-        return self.lockfile_contents
+        Parameters:
+        generation (int): The value of self.lockfile_generation that the caller last saw
+        timeout_seconds (float): The maximum amount of time to wait
+        poll_interval_seconds (float, defaults to 0.25): The amount of time between checks of the lockfile
+
+        Returns:
+        bool: True if the lockfile changed, False if the timeout was reached
+        """
+
+        deadline = time.monotonic() + timeout_seconds
+
+        while True:
+            try:
+                self.get_lockfile_contents()
+            except OSError:
+                # the lockfile is removed while the Riot Client restarts
+                pass
+
+            with self.lockfile_changed:
+                if self.lockfile_generation != generation:
+                    return True
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+
+                # another thread reading the lockfile will wake us up early
+                self.lockfile_changed.wait(min(poll_interval_seconds, remaining))
 
     def get_auth_headers(self, force_renew: bool = False) -> dict:
         """
@@ -62,9 +158,39 @@ class AuthorizationManager:
         dict: The headers as a dictionary
         """
 
-        if self.auth_headers is not None and not force_renew:
+        if self.auth_headers is not None and not force_renew and not self.token_manager.is_expiring("access", "entitlement", margin_seconds=0):
             return self.auth_headers
 
+        # captured before waiting for the lock, so the threads that were all missing headers share one fetch
+        return self.renew_auth_headers(self.auth_headers, force_renew)
+
+    def renew_auth_headers(self, stale_headers: Optional[dict], force: bool = False) -> dict:
+        """
+        Fetches new authentication headers to replace stale ones. If another thread has already replaced them, its headers are returned instead of fetching again
+
+        Parameters:
+        stale_headers (dict, optional): The headers that are known to be stale, or None if there were no headers yet
+        force (bool, defaults to False): If True, new headers are always fetched
+
+        Returns:
+        dict: The headers as a dictionary
+        """
+
+        with self.lock:
+            # another thread may have fetched new headers while we were waiting
+            if not force and self.auth_headers is not None and self.auth_headers is not stale_headers:
+                return self.auth_headers
+
+            return self._fetch_auth_headers()
+
+    def _fetch_auth_headers(self) -> dict:
+        """
+        Fetches new authentication headers. Expects self.lock to be held
+
+        Returns:
+        dict: The headers as a dictionary
+        """
+
         if self.lockfile_contents is None:
             self.get_lockfile_contents()
 
@@ -80,6 +206,12 @@ class AuthorizationManager:
             "User-Agent": "ShooterGame/13 Windows/10.0.19043.1.256.64bit"
         }
 
+        self.token_manager.track("access", data['accessToken'])
+        self.token_manager.track("entitlement", data['token'])
+
+        if self.auto_refresh_tokens:
+            self.token_manager.start()
+
         return self.auth_headers
 
     def get_pas_token(self, force_renew: bool = False) -> dict:
@@ -93,18 +225,23 @@ class AuthorizationManager:
         dict: The parsed PAS token containing the header, payload and signature
         """
 
-        if self.pas_token is not None and not force_renew:
+        if self.pas_token is not None and not force_renew and not self.token_manager.is_expiring("pas", margin_seconds=0):
             return self.parsed_pas_token
 
-        r = requests.get("https://riot-geo.pas.si.riotgames.com/pas/v1/service/chat", headers=self.get_auth_headers())
+        with self.pas_lock:
+            # another thread may have renewed the token while we were waiting
+            if self.pas_token is not None and not force_renew and not self.token_manager.is_expiring("pas", margin_seconds=0):
+                return self.parsed_pas_token
+
+            r = self.session.transport.get(f"{self.session.pas_url}/pas/v1/service/chat", headers=self.get_auth_headers())
+            pas_token = r.content.decode()
 
-        JWT_TOKEN = r.content.decode().split(".")
+            parsed_pas_token = decode_jwt(pas_token)
+            parsed_pas_token["expires"] = parsed_pas_token["payload"]['exp']
 
-        HEADER = json.loads(utilities.base64_url_decode(JWT_TOKEN[0]).decode("utf-8"))
-        PAYLOAD = json.loads(utilities.base64_url_decode(JWT_TOKEN[1]).decode("utf-8"))
-        SIGNATURE = JWT_TOKEN[2]
+            self.parsed_pas_token = parsed_pas_token
+            self.pas_token = pas_token
 
-        self.parsed_pas_token = {"header": HEADER, "payload": PAYLOAD, "signature": SIGNATURE, "expires": PAYLOAD['exp']}
-        self.pas_token = r.content.decode()
+            self.token_manager.track("pas", pas_token)
 
         return self.parsed_pas_token
@@ -1,111 +1,296 @@
-from typing import TYPE_CHECKING, Any, Dict, Optional
+from typing import TYPE_CHECKING, Any, Dict, Hashable, List, Optional, Tuple
+from collections import OrderedDict
 from time import time
+import heapq
+import sys
+import threading
+
+from . import utilities
 
 if TYPE_CHECKING:
     from .session import Session
+    from .persistentCache import PersistentCache
+
+
+def estimate_size(data: Any) -> int:
+    """
+    Estimates the number of bytes used by data whose serialized size is unknown. Only the outermost object is measured so that this takes constant time, which undercounts nested dicts and lists
+
+    Parameters:
+    data (Any): The data to estimate the size of
+
+    Returns:
+    int: The estimated size in bytes
+    """
+
+    return sys.getsizeof(data)
 
 
 class CacheData:
-    def __init__(self, cache_data: Any, expires_at: int):
+    def __init__(self, cache_data: Any, expires_at: int, size: int = 0):
         """
         Represents data stored using the CacheManager. Contains the expiration date for the cached item
 
         Parameters:
         cache_data (Any): The data to store
         expires_at (int): The unix timestamp that this item expires at
+        size (int, defaults to 0): The size of cache_data in bytes
         """
 
         self.cache_data = cache_data
         self.expires_at = expires_at
+        self.size = size
 
 
 class CacheManager:
-    def __init__(self, session: "Session", default_caching_seconds: int = 10800):
+    def __init__(self, session: "Session", default_caching_seconds: int = 10800, max_entries: Optional[int] = 4096, max_size_bytes: Optional[int] = 64 * 1024 * 1024, read_only_responses: bool = False):
         """
-        Stores cached keys and values for the specified amount of time
+        Stores cached keys and values for the specified amount of time. Evicts the least recently used items once the cache is full
 
         Parameters:
         session (Session): The Session object
         default_caching_seconds (int): The default amount of time, in seconds, that an item will stay in the cache
+        max_entries (int, optional, defaults to 4096): The maximum number of items in the cache. If None, the number of items is not limited
+        max_size_bytes (int, optional, defaults to 64 MiB): The maximum size of all items in the cache, measured by the length of the responses they were decoded from. If None, the size is not limited
+        read_only_responses (bool, defaults to False): If True, Session.fetch and Session.fetch_local store and return read-only responses (see utilities.freeze) so one cached object can be shared safely between callers
         """
 
         self.session = session
-        self.cache: Dict[str, CacheData] = {}
         self.default_caching_seconds = default_caching_seconds
 
-    def add_to_cache(self, cache_key: str, cache_data: Any, cache_seconds: Optional[int] = None) -> None:
+        self.max_entries = max_entries
+        self.max_size_bytes = max_size_bytes
+        self.read_only_responses = read_only_responses
+
+        # optional second tier which keeps items between processes (see Session.enable_persistent_cache)
+        self.persistent_cache: Optional["PersistentCache"] = None
+
+        # ordered from least to most recently used
+        self.cache: "OrderedDict[Hashable, CacheData]" = OrderedDict()
+        self.size_bytes = 0
+
+        # min-heap of (expires_at, sequence, key). entries are removed lazily, so a key may appear more than once
+        self.expiry_heap: List[Tuple[float, int, Hashable]] = []
+        self.sequence = 0
+
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        self.lock = threading.RLock()
+
+    def add_to_cache(self, cache_key: Hashable, cache_data: Any, cache_seconds: Optional[int] = None, persist: bool = False, size: Optional[int] = None) -> None:
         """
         Adds a key and value to the cache for the specified amount of time
 
         Parameters:
-        cache_key (str): The key that the cache_data will be stored under
+        cache_key (Hashable): The key that the cache_data will be stored under
         cache_data (Any): The data that will be stored under the cache_key
         cache_seconds (int, optional, defaults to None): The amount of time, in seconds, that the data will be stored for. Defaults to self.default_caching_seconds. If value is -1 the key will not expire
+        persist (bool, defaults to False): If True, the data is also written to self.persistent_cache (if there is one). The key must be a string and the data must be JSON serializable
+        size (int, optional, defaults to None): The size of the data in bytes, usually the length of the response body it was decoded from. Defaults to estimate_size(cache_data)
         """
 
         if cache_seconds is None:
             cache_seconds = self.default_caching_seconds
 
-        self.cache[cache_key] = CacheData(cache_data, (time()+cache_seconds) if cache_seconds != -1 else -1)
+        now = time()
+        expires_at = (now+cache_seconds) if cache_seconds != -1 else -1
 
-    def remove_from_cache(self, cache_key: str) -> None:
+        # the persistent cache can be replaced by another thread (see Session.apply_log_scan), so it is only read once
+        persistent_cache = self.persistent_cache
+        if persist and persistent_cache is not None:
+            persistent_cache.set(cache_key, cache_data, expires_at)
+
+        self._add(cache_key, cache_data, expires_at, now, size)
+
+    def _add(self, cache_key: Hashable, cache_data: Any, expires_at: float, now: float, size: Optional[int] = None) -> None:
+        """
+        Adds a key and value to the in-memory cache
+
+        Parameters:
+        cache_key (Hashable): The key that the cache_data will be stored under
+        cache_data (Any): The data that will be stored under the cache_key
+        expires_at (float): The unix timestamp that the data expires at. If -1 the key will not expire
+        now (float): The current unix timestamp
+        size (int, optional, defaults to None): The size of the data in bytes. Defaults to estimate_size(cache_data)
+        """
+
+        if size is None:
+            size = estimate_size(cache_data)
+
+        with self.lock:
+            if cache_key in self.cache:
+                self._remove(cache_key)
+
+            self.cache[cache_key] = CacheData(cache_data, expires_at, size)
+            self.size_bytes += size
+
+            if expires_at != -1:
+                self.sequence += 1
+                heapq.heappush(self.expiry_heap, (expires_at, self.sequence, cache_key))
+
+            self._expire(now)
+            self._evict_overflow()
+
+    def remove_from_cache(self, cache_key: Hashable) -> None:
         """
         Removes an item from the cache
 
         Parameters:
-        cache_key (str): The cache key to be removed
+        cache_key (Hashable): The cache key to be removed
         """
 
-        del self.cache[cache_key]
+        with self.lock:
+            self._remove(cache_key)
+
+        persistent_cache = self.persistent_cache
+        if persistent_cache is not None and isinstance(cache_key, str):
+            persistent_cache.remove(cache_key)
+
+    def _remove(self, cache_key: Hashable) -> CacheData:
+        """
+        Removes an item from the cache. Expects self.lock to be held
 
-    def get_from_cache(self, cache_key: str) -> Any:
+        Parameters:
+        cache_key (Hashable): The cache key to be removed
+
+        Returns:
+        CacheData: The removed item
+        """
+
+        data = self.cache.pop(cache_key)
+        self.size_bytes -= data.size
+
+        return data
+
+    def _evict_overflow(self) -> None:
+        """
+        Removes the least recently used items until the cache is within max_entries and max_size_bytes. Expects self.lock to be held
+        """
+
+        # never evict the item that was just added, even if it is larger than max_size_bytes on its own
+        while len(self.cache) > 1:
+            too_many = self.max_entries is not None and len(self.cache) > self.max_entries
+            too_large = self.max_size_bytes is not None and self.size_bytes > self.max_size_bytes
+
+            if not (too_many or too_large):
+                break
+
+            self.size_bytes -= self.cache.popitem(last=False)[1].size
+            self.evictions += 1
+
+    def get_from_cache(self, cache_key: Hashable) -> Any:
         """
         Grabs an item from the cache by the key
 
         Parameters:
-        cache_key (str): The key to grab from the cache
+        cache_key (Hashable): The key to grab from the cache
 
         Returns:
         Any: The data stored under the given key
         """
 
-        # check to see if the key exists in the cache
-        if cache_key not in self.cache:
-            return None
+        with self.lock:
+            data = self.cache.get(cache_key)
+
+            # remove the item from the cache if it has expired
+            if data is not None and data.expires_at != -1 and time() > data.expires_at:
+                self._remove(cache_key)
+                self.expirations += 1
+                data = None
+
+            if data is not None:
+                self.cache.move_to_end(cache_key)
+                self.hits += 1
+
+                return data.cache_data
+
+        # fall back to the disk and keep what we find in memory
+        persistent_cache = self.persistent_cache
+        if persistent_cache is not None and isinstance(cache_key, str):
+            stored = persistent_cache.get(cache_key)
+
+            if stored is not None:
+                cache_data, expires_at, size = stored
+                if self.read_only_responses:
+                    cache_data = utilities.freeze(cache_data)
 
-        # grab the data
-        data = self.cache[cache_key]
+                self._add(cache_key, cache_data, expires_at, time(), size)
 
-        # remove the item from the cache if it has expired
-        if time() > data.expires_at and data.expires_at != -1:
-            self.remove_from_cache(cache_key)
-            return None
+                with self.lock:
+                    self.persistent_hits += 1
 
-        return data.cache_data
+                return cache_data
+
+        with self.lock:
+            self.misses += 1
+
+        return None
 
     def clean_cache(self):
         """
-        Goes through the cache and removes any items that have expired
+        Removes any items that have expired. Only looks at the items that have expired
+        """
+
+        with self.lock:
+            self._expire(time())
+
+    def _expire(self, now: float) -> None:
+        """
+        Pops expired items off of the expiry heap. Expects self.lock to be held
+
+        Parameters:
+        now (float): The current unix timestamp
         """
 
-        # a list with the keys that need to be removed
-        to_remove = []
+        while self.expiry_heap and self.expiry_heap[0][0] < now:
+            expires_at, _, key = heapq.heappop(self.expiry_heap)
 
-        # go through the items and add them to to_remove if they have expired
-        for key, value in self.cache.items():
-            # skip items with an expiration date of -1
-            if time() < value.expires_at or value.expires_at == -1:
+            # skip heap entries for keys that have since been removed or replaced
+            data = self.cache.get(key)
+            if data is None or data.expires_at != expires_at:
                 continue
 
-            to_remove.append(key)
+            self._remove(key)
+            self.expirations += 1
 
-        # actually remove the data from the cache
-        for key in to_remove:
-            self.remove_from_cache(key)
+        # stale heap entries pile up when keys are replaced or evicted, so rebuild the heap once they dominate it
+        if len(self.expiry_heap) > 2 * len(self.cache) + 64:
+            self.expiry_heap = [entry for entry in self.expiry_heap if entry[2] in self.cache and self.cache[entry[2]].expires_at == entry[0]]
+            heapq.heapify(self.expiry_heap)
 
     def clear_cache(self):
         """
         Removes all items from the cache
         """
 
-        self.cache.clear()
+        with self.lock:
+            self.cache.clear()
+            self.expiry_heap.clear()
+            self.size_bytes = 0
+
+        persistent_cache = self.persistent_cache
+        if persistent_cache is not None:
+            persistent_cache.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Gets the cache's counters
+
+        Returns:
+        Dict[str, int]: The number of entries, size, hits, hits from the persistent cache, misses, evictions and expirations of the cache
+        """
+
+        with self.lock:
+            return {
+                "entries": len(self.cache),
+                "size_bytes": self.size_bytes,
+                "hits": self.hits,
+                "persistent_hits": self.persistent_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
@@ -0,0 +1,119 @@
+from typing import Optional
+import os
+import re
+
+
+GLZ_URL_PATTERN = re.compile(rb"https://glz-([^\s/]+?)-1\.([^\s/]+?)\.a\.pvp\.net")
+VERSION_MARKER = b"CI server version: "
+
+
+class LogScanResult:
+    def __init__(self, shard: Optional[str] = None, region: Optional[str] = None, version: Optional[str] = None):
+        """
+        The values found in the Valorant logging file. Values that were not found are None
+
+        Parameters:
+        shard (str, optional, defaults to None): The shard from the most recent glz url
+        region (str, optional, defaults to None): The region from the most recent glz url
+        version (str, optional, defaults to None): The most recent CI server version, as it appears in the log
+        """
+
+        self.shard = shard
+        self.region = region
+        self.version = version
+
+    @property
+    def found_region(self) -> bool:
+        return not (self.shard is None or self.region is None)
+
+    @property
+    def found_version(self) -> bool:
+        return self.version is not None
+
+
+class LogScanner:
+    def __init__(self, path: str, block_size: int = 1024 * 1024, head_size: int = 64 * 1024):
+        """
+        Finds the region and game version in the Valorant logging file by reading it in blocks from the end, so large logs do not have to be read completely
+
+        Parameters:
+        path (str): The path to the logging file
+        block_size (int, defaults to 1 MiB): The number of bytes read at a time
+        head_size (int, defaults to 64 KiB): The number of bytes at the start of the file that are checked for the game version first, since the client logs it on startup
+        """
+
+        self.path = path
+        self.block_size = block_size
+        self.head_size = head_size
+
+    @staticmethod
+    def find_glz_url(data: bytes, result: LogScanResult) -> None:
+        match = None
+        for match in GLZ_URL_PATTERN.finditer(data):
+            pass
+
+        if match is not None:
+            result.shard = match.group(1).decode("utf-8", "replace")
+            result.region = match.group(2).decode("utf-8", "replace")
+
+    @staticmethod
+    def find_version(data: bytes, result: LogScanResult) -> None:
+        index = data.rfind(VERSION_MARKER)
+        if index == -1:
+            return
+
+        start = index + len(VERSION_MARKER)
+        end = data.find(b"\n", start)
+
+        result.version = data[start:end if end != -1 else len(data)].decode("utf-8", "replace").strip()
+
+    def scan(self) -> LogScanResult:
+        """
+        Finds the most recent glz url and CI server version in a single pass from the end of the file
+
+        Returns:
+        LogScanResult: The values that were found
+        """
+
+        result = LogScanResult()
+
+        with open(self.path, "rb") as f:
+            size = f.seek(0, os.SEEK_END)
+
+            # the version is logged on startup, so it is usually within the first few kilobytes
+            f.seek(0)
+            head = f.read(min(self.head_size, size))
+            head = head[:head.rfind(b"\n") + 1] if size > self.head_size else head
+            self.find_version(head, result)
+
+            position = size
+            carry = b""
+
+            while position > 0 and not (result.found_region and result.found_version):
+                read_size = min(self.block_size, position)
+                position -= read_size
+
+                f.seek(position)
+                data = f.read(read_size) + carry
+
+                # the start of the block may be part of a line that continues in the previous block, so keep it for the next read
+                if position > 0:
+                    newline = data.find(b"\n")
+
+                    if newline == -1:
+                        carry = data
+                        continue
+
+                    carry = data[:newline]
+                    data = data[newline + 1:]
+
+                else:
+                    carry = b""
+
+                if not result.found_region:
+                    self.find_glz_url(data, result)
+
+                if not result.found_version:
+                    self.find_version(data, result)
+
+        return result
@@ -0,0 +1,187 @@
+from typing import TYPE_CHECKING, Any, Callable, List, Optional
+import os
+import threading
+
+from .logScanner import LogScanner, LogScanResult
+
+if TYPE_CHECKING:
+    from .session import Session
+
+
+class LogChange:
+    def __init__(self, shard: str, region: str, game_version: str, previous_shard: Optional[str], previous_region: Optional[str], previous_game_version: Optional[str]):
+        """
+        Describes a change of region or game version that was found in the Valorant logging file
+
+        Parameters:
+        shard (str): The new shard
+        region (str): The new region
+        game_version (str): The new game version
+        previous_shard (str, optional): The shard before the change
+        previous_region (str, optional): The region before the change
+        previous_game_version (str, optional): The game version before the change
+        """
+
+        self.shard = shard
+        self.region = region
+        self.game_version = game_version
+
+        self.previous_shard = previous_shard
+        self.previous_region = previous_region
+        self.previous_game_version = previous_game_version
+
+    @property
+    def region_changed(self) -> bool:
+        return (self.shard, self.region) != (self.previous_shard, self.previous_region)
+
+    @property
+    def game_version_changed(self) -> bool:
+        return self.game_version != self.previous_game_version
+
+
+class LogTailer:
+    def __init__(self, session: "Session", poll_interval_seconds: float = 1.0):
+        """
+        Follows the Valorant logging file in the background and updates the Session when the client switches shard or patches. Only newly appended lines are read
+
+        Parameters:
+        session (Session): The Session object
+        poll_interval_seconds (float, defaults to 1.0): The amount of time between checks of the logging file
+        """
+
+        self.session = session
+        self.poll_interval_seconds = poll_interval_seconds
+
+        self.offset = 0
+        self.inode: Optional[int] = None
+        self.partial_line = b""
+
+        self.callbacks: List[Callable[[LogChange], Any]] = []
+
+        # failures are recorded instead of raised, so that one bad callback or poll does not stop the tailer
+        self.failed_polls = 0
+        self.last_poll_error: Optional[BaseException] = None
+        self.callback_errors = 0
+        self.last_callback_error: Optional[BaseException] = None
+
+        self.thread: Optional[threading.Thread] = None
+        self.stop_flag = threading.Event()
+
+    def add_callback(self, callback: Callable[[LogChange], Any]) -> None:
+        """
+        Add a callback to be called when the region or game version changes. Exceptions raised by the callback are recorded in callback_errors and last_callback_error instead of stopping the tailer
+
+        Parameters:
+        callback (Callable[[LogChange], Any]): The callback to be called
+        """
+
+        self.callbacks.append(callback)
+
+    def remove_callback(self, callback: Callable[[LogChange], Any]) -> None:
+        """
+        Removes the given callback
+
+        Parameters:
+        callback (Callable[[LogChange], Any]): The callback to remove
+        """
+
+        self.callbacks.remove(callback)
+
+    def start(self) -> None:
+        """
+        Starts following the logging file from its current end
+        """
+
+        if self.thread is not None:
+            return
+
+        stat = os.stat(self.session.valorant_logging_file)
+        self.offset = stat.st_size
+        self.inode = stat.st_ino
+        self.partial_line = b""
+
+        self.stop_flag.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops following the logging file
+        """
+
+        if self.thread is None:
+            return
+
+        self.stop_flag.set()
+        self.thread.join()
+        self.thread = None
+
+    def run(self) -> None:
+        while not self.stop_flag.wait(self.poll_interval_seconds):
+            try:
+                self.poll()
+            except OSError:
+                # the file can briefly disappear while the client rotates its logs
+                continue
+            except Exception as e:
+                self.failed_polls += 1
+                self.last_poll_error = e
+
+    def poll(self) -> Optional[LogChange]:
+        """
+        Reads the lines appended since the last poll and applies any new region or game version to the Session
+
+        Returns:
+        Optional[LogChange]: The change that was applied, or None if nothing changed
+        """
+
+        stat = os.stat(self.session.valorant_logging_file)
+
+        # the client started a new log, so read it from the start
+        if stat.st_ino != self.inode or stat.st_size < self.offset:
+            self.inode = stat.st_ino
+            self.offset = 0
+            self.partial_line = b""
+
+        if stat.st_size == self.offset:
+            return None
+
+        with open(self.session.valorant_logging_file, "rb") as f:
+            f.seek(self.offset)
+            data = self.partial_line + f.read(stat.st_size - self.offset)
+
+        self.offset = stat.st_size
+
+        # only parse complete lines, and keep the rest for the next poll
+        newline = data.rfind(b"\n")
+        self.partial_line = data[newline + 1:]
+        data = data[:newline + 1]
+
+        result = LogScanResult()
+        LogScanner.find_glz_url(data, result)
+        LogScanner.find_version(data, result)
+
+        if not (result.found_region or result.found_version):
+            return None
+
+        change = self.session.apply_log_scan(result)
+        if change is None:
+            return None
+
+        # the change has already been applied, so every callback is called even if an earlier one fails
+        for callback in list(self.callbacks):
+            try:
+                callback(change)
+            except Exception as e:
+                self.callback_errors += 1
+                self.last_callback_error = e
+
+        return change
+
+    def get_stats(self) -> dict:
+        return {
+            "failed_polls": self.failed_polls,
+            "last_poll_error": repr(self.last_poll_error) if self.last_poll_error is not None else None,
+            "callback_errors": self.callback_errors,
+            "last_callback_error": repr(self.last_callback_error) if self.last_callback_error is not None else None
+        }
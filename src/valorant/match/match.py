@@ -29,7 +29,7 @@ class Match:
         self.session.fetch(f"{self.session.glz_url}/core-game/v1/players/{self.session.get_local_account().puuid}/disassociate/{self.match_ID}", method="POST")
 
     @staticmethod
-    def from_json(session: "Session", data: dict) -> "Match":
+    def from_json(session: "Session", data: dict, fetch_names: bool = True) -> "Match":
         from ..user.player import Player, Players
 
         players = Players(session)
@@ -49,6 +49,8 @@ class Match:
 
             players.users.append(p)
 
-        players.get_names()
+        # AsyncSession fetches the names itself so that the event loop is not blocked
+        if fetch_names:
+            players.get_names()
 
         return Match(session, data["MatchID"], map_ID=data["MapID"], mode_ID=data["ModeID"], players=players)
@@ -0,0 +1,74 @@
+from typing import TYPE_CHECKING, Dict, Generator, Iterable, Optional, Set, Tuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, Future, wait
+
+if TYPE_CHECKING:
+    from ..session import Session
+    from ..user.user import User
+    from .previousMatch import PreviousMatch
+
+
+class MatchDetailsFetcher:
+    def __init__(self, session: "Session", max_workers: int = 8):
+        """
+        Fetches the match details of many matches concurrently
+
+        Parameters:
+        session (Session): The Session object
+        max_workers (int, defaults to 8): The maximum number of requests that are sent at once
+        """
+
+        self.session = session
+        self.max_workers = max_workers
+
+    def iter_match_details(self, users: Iterable["User"], start: int = 0, end: int = 20, queue_ID: Optional[str] = None) -> Generator[Tuple["PreviousMatch", dict], None, None]:
+        """
+        Fetches the match history of every user and the details of every match in the histories. The details of a history's matches are fetched as soon as it arrives, while the other histories are still being fetched. Matches that appear in more than one history are only fetched once
+
+        Parameters:
+        users (Iterable[User]): The users to fetch the match details for
+        start (int, defaults to 0): The starting index of each match history
+        end (int, defaults to 20): The ending index of each match history
+        queue_ID (str, optional): The queue ID to get the history for (ex. "competitive")
+
+        Returns:
+        Generator[Tuple[PreviousMatch, dict], None, None]: Yields each match and its raw match details as soon as they are fetched
+        """
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="valorant-match-details")
+
+        history_futures: Set[Future] = {executor.submit(user.get_match_history, start=start, end=end, queue_ID=queue_ID) for user in users}
+        details_futures: Dict[Future, "PreviousMatch"] = {}
+        seen_match_IDs: Set[str] = set()
+
+        # histories and match details are waited on together, so details are yielded while other histories are still being fetched
+        pending: Set[Future] = set(history_futures)
+
+        try:
+            while len(pending) != 0:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    if future in details_futures:
+                        yield details_futures[future], future.result()
+                        continue
+
+                    # queue the match details as soon as each history arrives
+                    for match in future.result():
+                        if match.match_ID in seen_match_IDs:
+                            continue
+
+                        seen_match_IDs.add(match.match_ID)
+
+                        details_future = executor.submit(match.get_match_data_raw)
+                        details_futures[details_future] = match
+                        pending.add(details_future)
+
+        finally:
+            # stop sending requests if the caller stops early
+            for future in history_futures:
+                future.cancel()
+
+            for future in details_futures:
+                future.cancel()
+
+            executor.shutdown(wait=False)
@@ -9,7 +9,7 @@ if TYPE_CHECKING:
 
 class PreviousMatch(Match):
     def __init__(self, session: "Session", match_ID: str, mode_ID: str, game_start_time: int, map_ID: Optional[str] = None, players: Optional["Players"] = None, shard: str = "na", region: str = "na"):
-        super().__init__(session, match_ID, map_ID=map_ID, mode_ID=mode_ID, players=players, shard=shard, region=region)
+        super().__init__(session, match_ID, map_ID=map_ID, mode_ID=mode_ID, players=players)
 
         self.game_start_time = game_start_time
 
@@ -21,4 +21,5 @@ class PreviousMatch(Match):
         dict: The JSON data which represents this Match's data
         """
 
-        return self.session.fetch(f"{self.session.pd_url}/match-details/v1/matches/{self.match_ID}")
+        # match details never change, so they are cached without an expiry
+        return self.session.fetch(f"{self.session.pd_url}/match-details/v1/matches/{self.match_ID}", set_cache_time_seconds=-1, persist=True)
@@ -0,0 +1,109 @@
+from typing import Any, Optional, Tuple
+from time import time
+import json
+import os
+import sqlite3
+import threading
+
+
+class PersistentCache:
+    def __init__(self, path: str, shard: str, game_version: str):
+        """
+        An on-disk cache tier backed by SQLite. Items are stored under the shard and game version, so items from before a patch are never returned
+
+        Parameters:
+        path (str): The path to the SQLite database file. It is created if it does not exist
+        shard (str): The shard that items are read from and written to
+        game_version (str): The game version that items are read from and written to
+        """
+
+        self.path = path
+        self.shard = shard
+        self.game_version = game_version
+        self.namespace = f"{shard}/{game_version}"
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        # write-ahead logging allows other processes to read while we write
+        self.connection = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS cache (namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL NOT NULL, PRIMARY KEY (namespace, key))")
+
+        self.lock = threading.Lock()
+
+        self.prune()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float, int]]:
+        """
+        Gets an item from the disk
+
+        Parameters:
+        key (str): The key of the item
+
+        Returns:
+        Optional[Tuple[Any, float, int]]: The item, the unix timestamp it expires at (-1 if it does not expire) and the length of its JSON, or None if it is missing or expired
+        """
+
+        with self.lock:
+            row = self.connection.execute("SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key)).fetchone()
+
+        if row is None:
+            return None
+
+        value, expires_at = row
+        if expires_at != -1 and time() > expires_at:
+            return None
+
+        return json.loads(value), expires_at, len(value)
+
+    def set(self, key: str, value: Any, expires_at: float) -> None:
+        """
+        Writes an item to the disk
+
+        Parameters:
+        key (str): The key of the item
+        value (Any): The item. Must be JSON serializable
+        expires_at (float): The unix timestamp that the item expires at. If -1 the item will not expire
+        """
+
+        serialized = json.dumps(value, separators=(",", ":"))
+
+        with self.lock:
+            self.connection.execute("INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)", (self.namespace, key, serialized, expires_at))
+
+    def remove(self, key: str) -> None:
+        """
+        Removes an item from the disk
+
+        Parameters:
+        key (str): The key of the item
+        """
+
+        with self.lock:
+            self.connection.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+
+    def prune(self) -> None:
+        """
+        Removes expired items and items from other game versions of the current shard
+        """
+
+        with self.lock:
+            self.connection.execute("DELETE FROM cache WHERE (namespace LIKE ? AND namespace != ?) OR (expires_at != -1 AND expires_at < ?)", (f"{self.shard}/%", self.namespace, time()))
+
+    def clear(self) -> None:
+        """
+        Removes every item in the current namespace
+        """
+
+        with self.lock:
+            self.connection.execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+
+    def close(self) -> None:
+        """
+        Closes the database connection
+        """
+
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,356 @@
+from typing import Dict, Optional, Tuple
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from time import monotonic, sleep, time
+import threading
+import asyncio
+
+from . import utilities
+
+
+# recommended (capacity, tokens refilled per second) for every endpoint family. RateLimiter only uses them if they are passed as its budgets
+DEFAULT_BUDGETS: Dict[str, Tuple[float, float]] = {
+    "match-history": (10, 2),
+    "match-details": (10, 2),
+    "mmr": (10, 2),
+    "name-service": (10, 5),
+    "store": (10, 5),
+    "pd": (20, 10),
+    "glz": (20, 10),
+    "shared": (10, 5),
+    "default": (20, 10)
+}
+
+ENDPOINT_FAMILIES = tuple(DEFAULT_BUDGETS)
+
+RATE_LIMIT_MODES = ("block", "deadline", "fail_fast")
+
+
+class RateLimitError(RuntimeError):
+    """
+    Raised when a request can not be sent within its rate limit budget
+    """
+
+
+class TokenBucket:
+    def __init__(self, family: str, capacity: Optional[float], refill_rate: Optional[float]):
+        """
+        A token bucket which limits the requests sent to an endpoint family
+
+        Parameters:
+        family (str): The endpoint family that this bucket limits
+        capacity (float, optional): The maximum number of tokens (requests that can be sent in a burst). If None, requests are not limited and the bucket is only paused after a 429
+        refill_rate (float, optional): The number of tokens that are refilled every second. Ignored if capacity is None
+        """
+
+        if capacity is not None:
+            if capacity < 1:
+                raise ValueError(f"The capacity of the {family} bucket must be at least 1, got {capacity}")
+
+            if refill_rate is None or refill_rate <= 0:
+                raise ValueError(f"The refill rate of the {family} bucket must be greater than 0, got {refill_rate}")
+
+        self.family = family
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+
+        self.tokens = capacity
+        self.last_refill = monotonic()
+        self.paused_until = 0.0
+
+        self.waiting = 0
+        self.acquired = 0
+        self.waits = 0
+        self.total_wait_seconds = 0.0
+        self.rejected = 0
+        self.throttled = 0
+
+    @property
+    def is_limited(self) -> bool:
+        return self.capacity is not None
+
+    def refill(self, now: float) -> None:
+        if not self.is_limited:
+            self.last_refill = now
+            return
+
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.refill_rate)
+        self.last_refill = now
+
+    def try_acquire(self, now: float) -> float:
+        """
+        Takes a token from the bucket if one is available
+
+        Parameters:
+        now (float): The current monotonic time
+
+        Returns:
+        float: 0 if a token was taken, otherwise the number of seconds until one will be available
+        """
+
+        if now < self.paused_until:
+            return self.paused_until - now
+
+        if not self.is_limited:
+            self.acquired += 1
+            return 0
+
+        self.refill(now)
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            self.acquired += 1
+            return 0
+
+        return (1 - self.tokens) / self.refill_rate
+
+    def to_dict(self) -> dict:
+        now = monotonic()
+        self.refill(now)
+
+        return {
+            "capacity": self.capacity,
+            "refill_rate": self.refill_rate,
+            "tokens": self.tokens,
+            "paused_for": max(self.paused_until - now, 0),
+            "waiting": self.waiting,
+            "acquired": self.acquired,
+            "waits": self.waits,
+            "total_wait_seconds": self.total_wait_seconds,
+            "rejected": self.rejected,
+            "throttled": self.throttled
+        }
+
+
+class RateLimiter:
+    def __init__(self, budgets: Optional[Dict[str, Tuple[float, float]]] = None, mode: str = "block", deadline_seconds: float = 10, max_throttled_retries: int = 5):
+        """
+        Pauses an endpoint family when the server responds with 429 until its Retry-After has passed. Requests are only limited on the client for the endpoint families that are given a budget, so by default requests are sent as fast as the server allows
+
+        Parameters:
+        budgets (Dict[str, Tuple[float, float]], optional, defaults to None): The (capacity, tokens per second) of the endpoint families to limit on the client. Pass DEFAULT_BUDGETS for the recommended budgets. If None, no family is limited
+        mode (str, defaults to "block"): What happens when a bucket is empty. "block" waits for a token, "deadline" waits for at most deadline_seconds and "fail_fast" raises a RateLimitError immediately
+        deadline_seconds (float, defaults to 10): The maximum amount of time a request will wait in "deadline" mode
+        max_throttled_retries (int, defaults to 5): The number of times a request is retried after receiving a 429 before a RateLimitError is raised
+        """
+
+        if mode not in RATE_LIMIT_MODES:
+            raise ValueError(f"Invalid rate limit mode {mode!r}. Expected one of {RATE_LIMIT_MODES}")
+
+        self.mode = mode
+        self.deadline_seconds = deadline_seconds
+        self.max_throttled_retries = max_throttled_retries
+
+        self.budgets = dict(budgets) if budgets is not None else {}
+
+        # families without a budget still get a bucket, so that they can be paused
+        self.buckets: Dict[str, TokenBucket] = {family: TokenBucket(family, None, None) for family in ENDPOINT_FAMILIES}
+        for family, (capacity, rate) in self.budgets.items():
+            self.buckets[family] = TokenBucket(family, capacity, rate)
+
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def get_endpoint_family(url: str) -> Optional[str]:
+        """
+        Finds the endpoint family of a url
+
+        Parameters:
+        url (str): The url to categorize
+
+        Returns:
+        Optional[str]: The endpoint family, or None if the url is not rate limited (local client requests)
+        """
+
+        split_url = urlsplit(url)
+        host = (split_url.hostname or "").lower()
+        path = split_url.path
+
+        # requests to a local stand-in server are limited like the service they emulate
+        service = None
+
+        if host in ("127.0.0.1", "localhost"):
+            service = utilities.get_stand_in_service(url)
+
+            if service is None:
+                return None
+
+        for family in ("match-history", "match-details", "mmr", "name-service", "store"):
+            if f"/{family}/" in path:
+                return family
+
+        if service in ("pd", "glz", "shared"):
+            return service
+
+        if host.startswith("pd."):
+            return "pd"
+
+        if host.startswith("glz-"):
+            return "glz"
+
+        if host.startswith("shared."):
+            return "shared"
+
+        return "default"
+
+    def get_bucket(self, url: str) -> Optional[TokenBucket]:
+        family = self.get_endpoint_family(url)
+        if family is None:
+            return None
+
+        return self.buckets.get(family, self.buckets["default"])
+
+    def acquire(self, url: str, mode: Optional[str] = None, deadline_seconds: Optional[float] = None) -> None:
+        """
+        Waits until a request to the url can be sent
+
+        Parameters:
+        url (str): The url the request will be sent to
+        mode (str, optional, defaults to None): Overrides self.mode for this request
+        deadline_seconds (float, optional, defaults to None): Overrides self.deadline_seconds for this request
+        """
+
+        bucket = self.get_bucket(url)
+        if bucket is None:
+            return
+
+        mode = mode if mode is not None else self.mode
+        deadline_seconds = deadline_seconds if deadline_seconds is not None else self.deadline_seconds
+
+        started_at = monotonic()
+        is_waiting = False
+
+        try:
+            while True:
+                wait = self.poll_bucket(bucket, mode, deadline_seconds, started_at, is_waiting)
+                if wait == 0:
+                    return
+
+                is_waiting = True
+                sleep(wait)
+
+        finally:
+            if is_waiting:
+                with self.lock:
+                    bucket.waiting -= 1
+
+    async def acquire_async(self, url: str, mode: Optional[str] = None, deadline_seconds: Optional[float] = None) -> None:
+        """
+        Awaitable version of acquire, which waits for a token without blocking the event loop
+
+        Parameters:
+        url (str): The url the request will be sent to
+        mode (str, optional, defaults to None): Overrides self.mode for this request
+        deadline_seconds (float, optional, defaults to None): Overrides self.deadline_seconds for this request
+        """
+
+        bucket = self.get_bucket(url)
+        if bucket is None:
+            return
+
+        mode = mode if mode is not None else self.mode
+        deadline_seconds = deadline_seconds if deadline_seconds is not None else self.deadline_seconds
+
+        started_at = monotonic()
+        is_waiting = False
+
+        try:
+            while True:
+                wait = self.poll_bucket(bucket, mode, deadline_seconds, started_at, is_waiting)
+                if wait == 0:
+                    return
+
+                is_waiting = True
+                await asyncio.sleep(wait)
+
+        finally:
+            if is_waiting:
+                with self.lock:
+                    bucket.waiting -= 1
+
+    def poll_bucket(self, bucket: TokenBucket, mode: str, deadline_seconds: float, started_at: float, is_waiting: bool) -> float:
+        """
+        Takes a token from a bucket for acquire and acquire_async, or raises a RateLimitError if the request can not wait long enough for one
+
+        Parameters:
+        bucket (TokenBucket): The bucket of the request's endpoint family
+        mode (str): The rate limit mode of the request
+        deadline_seconds (float): The maximum amount of time the request can wait in "deadline" mode
+        started_at (float): The monotonic time the request started waiting at
+        is_waiting (bool): True if the request has already waited for a token
+
+        Returns:
+        float: 0 if a token was taken, otherwise the number of seconds to wait before polling again
+        """
+
+        with self.lock:
+            now = monotonic()
+            wait = bucket.try_acquire(now)
+
+            if wait == 0:
+                if is_waiting:
+                    bucket.total_wait_seconds += now - started_at
+
+                return 0
+
+            remaining = deadline_seconds - (now - started_at)
+            if mode == "fail_fast" or (mode == "deadline" and remaining < wait):
+                bucket.rejected += 1
+                raise RateLimitError(f"Rate limit for {bucket.family} requests reached. Retry in {wait:.2f} seconds.")
+
+            if not is_waiting:
+                bucket.waiting += 1
+                bucket.waits += 1
+
+            return wait
+
+    def pause(self, url: str, retry_after: Optional[str]) -> float:
+        """
+        Pauses the bucket of a url after the server responded with 429
+
+        Parameters:
+        url (str): The url that was throttled
+        retry_after (str, optional): The Retry-After header of the response, in seconds or as an HTTP date. Defaults to one second if None
+
+        Returns:
+        float: The number of seconds the bucket is paused for
+        """
+
+        seconds = self.parse_retry_after(retry_after)
+
+        bucket = self.get_bucket(url)
+        if bucket is None:
+            return seconds
+
+        with self.lock:
+            bucket.throttled += 1
+            bucket.tokens = 0
+            bucket.paused_until = max(bucket.paused_until, monotonic() + seconds)
+
+        return seconds
+
+    @staticmethod
+    def parse_retry_after(retry_after: Optional[str]) -> float:
+        if retry_after is None:
+            return 1.0
+
+        try:
+            return max(float(retry_after), 0.0)
+        except ValueError:
+            pass
+
+        try:
+            return max(parsedate_to_datetime(retry_after).timestamp() - time(), 0.0)
+        except (TypeError, ValueError):
+            return 1.0
+
+    def get_stats(self) -> Dict[str, dict]:
+        """
+        Gets the occupancy and wait time of every bucket
+
+        Returns:
+        Dict[str, dict]: The stats of each bucket, keyed by the endpoint family
+        """
+
+        with self.lock:
+            return {family: bucket.to_dict() for family, bucket in self.buckets.items()}
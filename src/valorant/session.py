@@ -1,44 +1,166 @@
 from typing import Optional
-import requests
 import os
-import re
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
 
+from . import utilities
 from .authorization import AuthorizationManager
 from .cacheManager import CacheManager
 from .user.localAccount import LocalAccount
+from .user.nameResolver import NameResolver
 from .chat.conversationsManager import ConversationsManager
 from .store.storeManager import StoreManager
 from .social.socialManager import SocialManager
+from .transportManager import TransportManager
+from .persistentCache import PersistentCache
+from .logScanner import LogScanner, LogScanResult
+from .logTailer import LogTailer, LogChange
+from .singleFlight import SingleFlight
+from .rateLimiter import RateLimiter, RateLimitError
 
 import urllib3
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 
 class Session:
-    def __init__(self):
+    def __init__(self, transport: Optional[TransportManager] = None, persistent_cache_path: Optional[str] = None, rate_limiter: Optional[RateLimiter] = None, lazy: bool = False, base_url: Optional[str] = None, lockfile_path: Optional[str] = None, log_path: Optional[str] = None):
         """
         Session Manager for Valorant
+
+        Parameters:
+        transport (TransportManager, optional, defaults to None): The transport used to send HTTP requests. Defaults to a TransportManager with keep-alive connection pools
+        persistent_cache_path (str, optional, defaults to None): If set, slowly changing responses are also cached in a SQLite database at this path, once the shard and game version are known (see enable_persistent_cache)
+        rate_limiter (RateLimiter, optional, defaults to None): Limits the requests sent to Riot's servers. Defaults to a RateLimiter without client-side budgets, which only pauses an endpoint family after a 429 for as long as its Retry-After asks. Use RateLimiter(DEFAULT_BUDGETS) to also limit requests before they are sent
+        lazy (bool, defaults to False): If True, the logging file, lockfile and authentication headers are not read until they are first needed (see warm_up)
+        base_url (str, optional, defaults to None): If set, requests to Riot's servers are sent to this local stand-in server instead, with the service as the first part of the path (ex. "http://127.0.0.1:8080" sends pd requests to "http://127.0.0.1:8080/pd/...")
+        lockfile_path (str, optional, defaults to None): The path to the Riot Client's lockfile. Defaults to the lockfile in %LOCALAPPDATA%
+        log_path (str, optional, defaults to None): The path to Valorant's logging file. Defaults to ShooterGame.log in %LOCALAPPDATA%
         """
 
-        self.auth = AuthorizationManager(self)
+        self.base_url = base_url.rstrip("/") if base_url is not None else None
+
+        # the servers that do not depend on the shard
+        self.auth_url = self.get_stand_in_url("auth") or "https://auth.riotgames.com"
+        self.pas_url = self.get_stand_in_url("pas") or "https://riot-geo.pas.si.riotgames.com"
+        self.clientconfig_url = self.get_stand_in_url("clientconfig") or "https://clientconfig.rpg.riotgames.com"
+
+        self.transport = transport if transport is not None else TransportManager()
+        self.transport.session = self
+
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+
+        self.auth = AuthorizationManager(self, lockfile_path)
         self.store = StoreManager(self)
         self.conversations = ConversationsManager(self)
         self.social = SocialManager(self)
         self.cache = CacheManager(self)
+        self.in_flight = SingleFlight()
+        self.names = NameResolver(self)
 
         self.shard = None
         self.region = None
+        self.game_version = None
         self.local_account = None
 
-        self.valorant_logging_file = os.path.join(os.getenv('LOCALAPPDATA'), R'VALORANT\Saved\Logs\ShooterGame.log')
+        self._pd_url = None
+        self._glz_url = None
+        self._shared_url = None
+
+        # guards the values that come from the logging file, which the LogTailer can change at any time
+        self.lock = threading.RLock()
+
+        # kept separate from self.lock since creating the local account sends requests
+        self.local_account_lock = threading.Lock()
+
+        self.valorant_logging_file = log_path if log_path is not None else os.path.join(os.getenv('LOCALAPPDATA'), R'VALORANT\Saved\Logs\ShooterGame.log')
+        self.log_tailer = LogTailer(self)
+
+        self.persistent_cache_path = persistent_cache_path
+
+        if not lazy:
+            self.get_region()
+            self.auth.get_auth_headers()
+
+    @property
+    def pd_url(self) -> str:
+        if self._pd_url is None:
+            self.get_region()
+
+        return self._pd_url
+
+    @pd_url.setter
+    def pd_url(self, pd_url: str) -> None:
+        self._pd_url = pd_url
+
+    @property
+    def glz_url(self) -> str:
+        if self._glz_url is None:
+            self.get_region()
+
+        return self._glz_url
+
+    @glz_url.setter
+    def glz_url(self, glz_url: str) -> None:
+        self._glz_url = glz_url
+
+    @property
+    def shared_url(self) -> str:
+        if self._shared_url is None:
+            self.get_region()
+
+        return self._shared_url
+
+    @shared_url.setter
+    def shared_url(self, shared_url: str) -> None:
+        self._shared_url = shared_url
+
+    def get_stand_in_url(self, service: str) -> Optional[str]:
+        """
+        Gets the url that a service is reached at on the local stand-in server
+
+        Parameters:
+        service (str): The service (see utilities.STAND_IN_SERVICES)
+
+        Returns:
+        Optional[str]: The url, or None if this Session does not use a stand-in server
+        """
+
+        return f"{self.base_url}/{service}" if self.base_url is not None else None
+
+    def warm_up(self) -> None:
+        """
+        Resolves the region, game version, authentication headers and local account in parallel. Useful for lazy sessions that should be ready before their first request
+        """
 
-        self.get_region()
-        self.auth.get_auth_headers()
+        with ThreadPoolExecutor(max_workers=3, thread_name_prefix="valorant-warm-up") as executor:
+            futures = [
+                executor.submit(self.get_region),
+                executor.submit(self.auth.get_auth_headers),
+                executor.submit(self.get_local_account)
+            ]
 
-        self.pd_url = f"https://pd.{self.shard}.a.pvp.net"
-        self.glz_url = f"https://glz-{self.shard}-1.{self.region}.a.pvp.net"
+        # raise the first error, if there was one
+        for future in futures:
+            future.result()
 
-    def fetch_local(self, path: str, method: str = "GET", use_cache: bool = True, set_cache_time_seconds: Optional[int] = None, *args, **kwargs) -> dict:
+    def enable_persistent_cache(self, path: str) -> PersistentCache:
+        """
+        Adds an on-disk tier to the CacheManager. Requests made with persist=True are kept between processes until the shard or game version changes
+
+        Parameters:
+        path (str): The path to the SQLite database file
+
+        Returns:
+        PersistentCache: The on-disk cache tier
+        """
+
+        shard, _ = self.get_region()
+
+        self.cache.persistent_cache = PersistentCache(path, shard, self.get_game_version())
+        return self.cache.persistent_cache
+
+    def fetch_local(self, path: str, method: str = "GET", use_cache: bool = True, set_cache_time_seconds: Optional[int] = None, *args, persist: bool = False, **kwargs) -> dict:
         """
         Fetches the given path at the local url using the given method
 
@@ -47,38 +169,67 @@ class Session:
         method (str, defaults to "GET"): The method the request will be sent with
         use_cache (bool, defaults to True): Determines if this request will use the CacheManager
         set_cache_time_seconds (int, optional, defaults to None): The amount of time a request's response will be stored in the cache for
+        persist (bool, defaults to False): If True, the response is also stored in the CacheManager's persistent cache, if it has one
 
         Returns:
         dict: The JSON response from the given path
         """
 
-        # get the lockfile contents if they do not exist
-        if self.auth.lockfile_contents is None:
-            self.auth.get_lockfile_contents()
+        # get the lockfile contents. the lockfile is only reparsed if the Riot Client has rewritten it
+        self.auth.get_lockfile_contents()
+
+        cache_key = utilities.build_request_key(method, f"local:///{path}", args, kwargs)
 
         # grab the item from the cache if it exists
         if use_cache:
-            response = self.cache.get_from_cache(f"{method}_local/{path}-{args}-{kwargs}")
+            response = self.cache.get_from_cache(cache_key)
 
             if response is not None:
                 return response
 
-        # get the actual data
-        r = requests.request(method, f"{self.auth.lockfile_contents['protocol']}://127.0.0.1:{self.auth.lockfile_contents['port']}/{path}", headers=self.auth.local_auth_headers, verify=False, *args, **kwargs)
-        data = r.json()
+        def send_request(is_retry: bool = False, is_failover: bool = False) -> dict:
+            stale_headers = self.auth.auth_headers
+            lockfile_generation = self.auth.lockfile_generation
+            lockfile_contents = self.auth.lockfile_contents
+
+            # get the actual data
+            try:
+                r = self.transport.request(method, f"{lockfile_contents['protocol']}://127.0.0.1:{lockfile_contents['port']}/{path}", headers=self.auth.local_auth_headers, verify=False, *args, **kwargs)
+
+            except requests.exceptions.ConnectionError:
+                # the Riot Client may have restarted on a new port, so wait for it to write a new lockfile and try again
+                if is_failover or not self.auth.wait_for_lockfile_change(lockfile_generation, self.auth.lockfile_failover_seconds):
+                    raise
+
+                return send_request(is_retry, True)
+
+            data = r.json()
 
-        if "errorCode" in data and data["errorCode"] == "BAD_CLAIMS":
-            self.auth.lockfile_contents = None
-            self.auth.get_auth_headers(force_renew=True)
-            return self.fetch_local(path, method, use_cache, set_cache_time_seconds, *args, **kwargs)
+            # renew the tokens and try once more
+            if "errorCode" in data and data["errorCode"] == "BAD_CLAIMS":
+                if is_retry:
+                    raise RuntimeError(f"Request to local/{path} was rejected with BAD_CLAIMS after renewing the authentication headers.")
 
-        # add the data to the cache
-        self.cache.add_to_cache(f"{method}_local/{path}-{args}-{kwargs}", data, set_cache_time_seconds)
+                self.auth.get_lockfile_contents(force_reread=True)
+                self.auth.renew_auth_headers(stale_headers)
+                return send_request(True, is_failover)
 
-        # return the JSON data
-        return data
+            if self.cache.read_only_responses:
+                data = utilities.freeze(data)
 
-    def fetch(self, url: str, method: str = "GET", use_cache: bool = True, use_auth_headers: bool = True, set_cache_time_seconds: Optional[int] = None, *args, **kwargs) -> Optional[dict]:
+            # add the data to the cache
+            self.cache.add_to_cache(cache_key, data, set_cache_time_seconds, persist=persist, size=len(r.content))
+
+            # return the JSON data
+            return data
+
+        # identical requests that are already being sent are waited on instead of being sent again
+        if self.should_coalesce(method, use_cache):
+            return self.in_flight.do(cache_key, send_request)
+
+        return send_request()
+
+    def fetch(self, url: str, method: str = "GET", use_cache: bool = True, use_auth_headers: bool = True, set_cache_time_seconds: Optional[int] = None, *args, persist: bool = False, rate_limit_mode: Optional[str] = None, rate_limit_deadline: Optional[float] = None, **kwargs) -> Optional[dict]:
         """
         Fetches the given url using the given method
 
@@ -88,42 +239,173 @@ class Session:
         use_cache (bool, defaults to True): Determines if this request will use the CacheManager
         use_auth_headers (bool, defaults to True): Determines if this request should use standard Valorant authentication headers
         set_cache_time_seconds (int, optional, defaults to None): The amount of time a request's response will be stored in the cache for
+        persist (bool, defaults to False): If True, the response is also stored in the CacheManager's persistent cache, if it has one
+        rate_limit_mode (str, optional, defaults to None): Overrides the RateLimiter's mode for this request ("block", "deadline" or "fail_fast")
+        rate_limit_deadline (float, optional, defaults to None): Overrides the RateLimiter's deadline for this request, in seconds
 
         Returns:
         dict: The JSON response from the url
         """
 
+        cache_key = utilities.build_request_key(method, url, args, kwargs)
+
         # grab the item from the cache if it exists
         if use_cache:
-            response = self.cache.get_from_cache(f"{method}_{url}-{args}-{kwargs}")
+            response = self.cache.get_from_cache(cache_key)
 
             if response is not None:
                 return response
 
-        # send the request
-        r = requests.request(method, url, headers=(self.auth.get_auth_headers() if use_auth_headers else None), *args, **kwargs)
+        def send_request(throttled_retries: int = 0, is_retry: bool = False) -> dict:
+            # wait for the endpoint's rate limit budget
+            self.rate_limiter.acquire(url, rate_limit_mode, rate_limit_deadline)
+
+            # send the request
+            headers = self.auth.get_auth_headers() if use_auth_headers else None
+            r = self.transport.request(method, url, headers=headers, *args, **kwargs)
 
-        if r.status_code == 429:
-            m = "Too many requests."
-            if 'Retry-After' in r.headers: m += f" Retry in {r.headers['Retry-After']} seconds."
+            if r.status_code == 429:
+                # pause the endpoint's bucket and queue the request again
+                retry_after = self.rate_limiter.pause(url, r.headers.get('Retry-After'))
 
-            raise RuntimeError(m)
+                if (rate_limit_mode or self.rate_limiter.mode) == "fail_fast" or throttled_retries >= self.rate_limiter.max_throttled_retries:
+                    raise RateLimitError(f"Too many requests. Retry in {retry_after:.0f} seconds.")
 
-        data = r.json()
+                return send_request(throttled_retries + 1, is_retry)
 
-        if method.upper() == "POST":
+            data = r.json()
+
+            if method.upper() == "POST":
+                return data
+
+            # renew the tokens and try once more. other threads that hit the same stale tokens share one renewal
+            if "errorCode" in data and data["errorCode"] == "BAD_CLAIMS":
+                if is_retry:
+                    raise RuntimeError(f"Request to {url} was rejected with BAD_CLAIMS after renewing the authentication headers.")
+
+                self.auth.get_lockfile_contents(force_reread=True)
+                self.auth.renew_auth_headers(headers if headers is not None else self.auth.auth_headers)
+                return send_request(throttled_retries, True)
+
+            if self.cache.read_only_responses:
+                data = utilities.freeze(data)
+
+            # add the request's response to the cache
+            self.cache.add_to_cache(cache_key, data, set_cache_time_seconds, persist=persist, size=len(r.content))
+
+            # return the request's JSON data
             return data
 
-        if "errorCode" in data and data["errorCode"] == "BAD_CLAIMS":
-            self.auth.lockfile_contents = None
-            self.auth.get_auth_headers(force_renew=True)
-            return self.fetch(url, method, use_cache, set_cache_time_seconds, *args, **kwargs)
+        # identical requests that are already being sent are waited on instead of being sent again
+        if self.should_coalesce(method, use_cache):
+            return self.in_flight.do(cache_key, send_request)
+
+        return send_request()
+
+    @staticmethod
+    def should_coalesce(method: str, use_cache: bool) -> bool:
+        """
+        Determines if concurrent identical requests can share one response. POST requests are never shared since they usually have side effects
+
+        Parameters:
+        method (str): The method the request will be sent with
+        use_cache (bool): Determines if the request uses the CacheManager
+
+        Returns:
+        bool: True if the request can share a response with identical requests that are already being sent
+        """
+
+        method = method.upper()
+        return method != "POST" and (use_cache or method == "GET")
+
+    def scan_log(self) -> LogScanResult:
+        """
+        Finds the region and game version in the Valorant logging file in a single pass from the end of the file. Sets the self.shard, self.region and self.game_version variables for the values that were found
+
+        Returns:
+        LogScanResult: The values that were found
+        """
+
+        result = LogScanner(self.valorant_logging_file).scan()
+        self.apply_log_scan(result)
+
+        return result
+
+    def apply_log_scan(self, result: LogScanResult) -> Optional[LogChange]:
+        """
+        Updates the shard, region, server urls and game version (including the X-Riot-ClientVersion authentication header) together, using the values that were found in the logging file
+
+        Parameters:
+        result (LogScanResult): The values found in the logging file. Values that are None are left unchanged
+
+        Returns:
+        Optional[LogChange]: The change that was made, or None if nothing changed
+        """
 
-        # add the request's response to the cache
-        self.cache.add_to_cache(f"{method}_{url}-{args}-{kwargs}", data, set_cache_time_seconds)
+        game_version = self.game_version
+        if result.found_version:
+            # following code is a modified form of code in the
+            # https://github.com/molenzwiebel/Deceive repo
+            version = result.version.split("-")
+            version.insert(2, "shipping")
+            game_version = "-".join(version)
 
-        # return the request's JSON data
-        return data
+        with self.lock:
+            shard = result.shard if result.found_region else self.shard
+            region = result.region if result.found_region else self.region
+
+            if (shard, region, game_version) == (self.shard, self.region, self.game_version):
+                return None
+
+            change = LogChange(shard, region, game_version, self.shard, self.region, self.game_version)
+
+            self.shard = shard
+            self.region = region
+            self.game_version = game_version
+
+            if shard is not None and region is not None:
+                self.pd_url = self.get_stand_in_url("pd") or f"https://pd.{shard}.a.pvp.net"
+                self.glz_url = self.get_stand_in_url("glz") or f"https://glz-{shard}-1.{region}.a.pvp.net"
+                self.shared_url = self.get_stand_in_url("shared") or f"https://shared.{shard}.a.pvp.net"
+
+            # swap in new headers instead of changing the dict that other threads may be reading
+            if change.game_version_changed and self.auth.auth_headers is not None:
+                self.auth.auth_headers = {**self.auth.auth_headers, 'X-Riot-ClientVersion': game_version}
+
+            # items in the persistent cache belong to a shard and game version, so the tier of persistent_cache_path is only added once both are known. lazy sessions first learn them here
+            persistent_cache = self.cache.persistent_cache
+            if persistent_cache is None and self.persistent_cache_path is not None and shard is not None and game_version is not None:
+                self.cache.persistent_cache = PersistentCache(self.persistent_cache_path, shard, game_version)
+
+            elif persistent_cache is not None and shard is not None and game_version is not None and (shard, game_version) != (persistent_cache.shard, persistent_cache.game_version):
+                self.cache.persistent_cache = PersistentCache(persistent_cache.path, shard, game_version)
+
+                # the old cache is not closed, since other threads may still be using it. its connection is closed once the last of them drops it
+
+        return change
+
+    def start_log_tailer(self, poll_interval_seconds: float = 1.0) -> LogTailer:
+        """
+        Starts following the logging file in the background, so that changes of shard, region or game version are applied to this Session without rereading the whole file
+
+        Parameters:
+        poll_interval_seconds (float, defaults to 1.0): The amount of time between checks of the logging file
+
+        Returns:
+        LogTailer: The LogTailer, which callbacks can be added to
+        """
+
+        self.log_tailer.poll_interval_seconds = poll_interval_seconds
+        self.log_tailer.start()
+
+        return self.log_tailer
+
+    def stop_log_tailer(self) -> None:
+        """
+        Stops following the logging file
+        """
+
+        self.log_tailer.stop()
 
     def get_game_version(self) -> str:
         """
@@ -133,21 +415,19 @@ class Session:
         str: The current game version
         """
 
-        f = open(self.valorant_logging_file, "r", encoding="utf-8")
+        if self.game_version is not None:
+            return self.game_version
 
-        # following code is a modified form of code in the
-        # https://github.com/molenzwiebel/Deceive repo
-        while True:
-            line = f.readline()
-            if 'CI server version:' in line:
-                version_without_shipping = line.split('CI server version: ')[1].strip()
-                version = version_without_shipping.split("-")
-                version.insert(2, "shipping")
-                version = "-".join(version)
+        with self.lock:
+            # another thread may have scanned the log while we were waiting
+            if self.game_version is None:
+                self.scan_log()
 
-                f.close()
+        # Raise an error if we are unable to find the version in the logging file
+        if self.game_version is None:
+            raise RuntimeError("Unable to find the game version in Valorant's log file. This can be solved by running Valorant and allowing for the client to log the version.")
 
-                return version
+        return self.game_version
 
     def get_current_season(self, include_acts: bool = True, include_episodes: bool = True):
         if not (include_acts or include_episodes):
@@ -182,26 +462,17 @@ class Session:
         if not (self.shard is None or self.region is None):
             return (self.shard, self.region)
 
-        # opens the Valorant logging file and gets the contents
-        f = open(self.valorant_logging_file, "r")
-        content = f.read()
-        f.close()
-
-        # gets the region using regex
-        output = re.search("https://glz-(.+?)-1.(.+?).a.pvp.net", content)
+        # finds the most recent region in the logging file, unless another thread did while we were waiting
+        with self.lock:
+            if self.shard is None or self.region is None:
+                self.scan_log()
 
         # Raise an error if we are unable to find the region in the logging file
-        if output is None:
+        if self.shard is None or self.region is None:
             raise RuntimeError("Unable to find region data in Valorant's log file. This can be solved by running Valorant and allowing for the client to log the region data.")
 
-        output = output.groups()
-
-        # get the shard and region
-        self.shard = output[0]
-        self.region = output[1]
-
         # return the shard and region
-        return output
+        return (self.shard, self.region)
 
     def get_local_account(self) -> LocalAccount:
         """
@@ -216,7 +487,10 @@ class Session:
             return self.local_account
 
         # make the local account variable from the class and return it
-        self.local_account = LocalAccount(self)
+        with self.local_account_lock:
+            if self.local_account is None:
+                self.local_account = LocalAccount(self)
+
         return self.local_account
 
     def get_seasons_acts_events_raw(self) -> dict:
@@ -227,12 +501,8 @@ class Session:
         dict: The JSON output
         """
 
-        # get the current region if we do not have the shard
-        if self.shard is None:
-            self.get_region()
-
         # get all seasons, acts, and events and return them as JSON
-        return self.fetch(f"https://shared.{self.shard}.a.pvp.net/content-service/v3/content")
+        return self.fetch(f"{self.shared_url}/content-service/v3/content", persist=True)
 
     def get_help_raw(self) -> dict:
         """
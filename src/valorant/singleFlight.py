@@ -0,0 +1,81 @@
+from typing import Any, Callable, Dict, Hashable, Optional
+import threading
+
+
+class InFlightCall:
+    def __init__(self):
+        """
+        Represents a call that is currently running. Waiters block on the event until the result or exception is set
+        """
+
+        self.event = threading.Event()
+        self.thread_ID = threading.get_ident()
+
+        self.result: Any = None
+        self.exception: Optional[BaseException] = None
+
+
+class SingleFlight:
+    def __init__(self):
+        """
+        Deduplicates concurrent calls. The first caller for a key runs the call and concurrent callers with the same key wait for its result
+        """
+
+        self.calls: Dict[Hashable, InFlightCall] = {}
+        self.lock = threading.Lock()
+
+        self.coalesced = 0
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """
+        Runs func, unless a call with the same key is already running, in which case its result is returned instead
+
+        Parameters:
+        key (Hashable): The key identifying the call
+        func (Callable[[], Any]): The function to call
+
+        Returns:
+        Any: The output of func
+        """
+
+        with self.lock:
+            call = self.calls.get(key)
+
+            # a thread that is already running this call has to run it again itself, otherwise it would wait on itself
+            if call is not None and call.thread_ID == threading.get_ident():
+                call = None
+                is_leader = None
+
+            elif call is None:
+                call = InFlightCall()
+                self.calls[key] = call
+                is_leader = True
+
+            else:
+                self.coalesced += 1
+                is_leader = False
+
+        if is_leader is None:
+            return func()
+
+        if not is_leader:
+            call.event.wait()
+
+            if call.exception is not None:
+                raise call.exception
+
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+
+        except BaseException as e:
+            call.exception = e
+            raise
+
+        finally:
+            with self.lock:
+                del self.calls[key]
+
+            call.event.set()
@@ -0,0 +1,300 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from concurrent.futures import Executor, ThreadPoolExecutor
+from collections import deque
+import xml.etree.ElementTree as ET
+import threading
+import asyncio
+import time
+
+
+DISPATCH_MODES = ("inline", "loop", "thread")
+
+
+class ListenerStats:
+    def __init__(self):
+        """
+        Keeps track of how long a listener's callback takes and how many events are waiting for it
+        """
+
+        self.calls = 0
+        self.errors = 0
+        self.last_error: Optional[BaseException] = None
+
+        # time spent inside the callback
+        self.total_latency_seconds = 0.0
+        self.max_latency_seconds = 0.0
+
+        # time between an event being dispatched and the callback being called with it
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "last_error": repr(self.last_error) if self.last_error is not None else None,
+            "average_latency_seconds": self.total_latency_seconds / self.calls if self.calls != 0 else 0.0,
+            "max_latency_seconds": self.max_latency_seconds,
+            "average_wait_seconds": self.total_wait_seconds / self.calls if self.calls != 0 else 0.0,
+            "max_wait_seconds": self.max_wait_seconds,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth
+        }
+
+
+class Listener:
+    def __init__(self, callback: Callable[[ET.Element], Any], message_type: Optional[str] = None):
+        """
+        A callback and the tag that it listens for
+
+        Parameters:
+        callback (Callable[[ET.Element], Any]): The callback to be called
+        message_type (str, optional, defaults to None): The tag to listen for. If None, the callback is called for every tag
+        """
+
+        self.callback = callback
+        self.message_type = message_type
+        self.tag = EventDispatcher.normalize_tag(message_type) if message_type is not None else None
+
+        # events waiting to be passed to the callback, in the order they were dispatched
+        self.queue: deque = deque()
+        self.is_scheduled = False
+        self.lock = threading.Lock()
+
+        self.stats = ListenerStats()
+
+
+class EventDispatcher:
+    def __init__(self, mode: str = "inline", max_workers: int = 4, executor: Optional[Executor] = None):
+        """
+        Passes events to the listeners of their tag. Each listener receives its events in order, even when callbacks run on a thread pool
+
+        Parameters:
+        mode (str, defaults to "inline"): Where callbacks run. "inline" calls them straight away on the reader, "loop" schedules them on the event loop and "thread" runs them on a thread pool
+        max_workers (int, defaults to 4): The number of threads in the thread pool that is created for the "thread" mode
+        executor (Executor, optional, defaults to None): The executor used for the "thread" mode instead of creating a thread pool
+        """
+
+        if mode not in DISPATCH_MODES:
+            raise ValueError(f"mode must be one of {DISPATCH_MODES}, got {mode!r}")
+
+        self.mode = mode
+        self.max_workers = max_workers
+
+        self.executor = executor
+        self.owns_executor = executor is None
+
+        # listeners are stored in tuples that are replaced rather than modified, so dispatching does not need the lock
+        self.listeners_by_tag: Dict[str, Tuple[Listener, ...]] = {}
+        self.wildcard_listeners: Tuple[Listener, ...] = ()
+
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def normalize_tag(tag: str) -> str:
+        return tag.lower()
+
+    def add_listener(self, callback: Callable[[ET.Element], Any], message_type: Optional[str] = None) -> Listener:
+        """
+        Adds a listener
+
+        Parameters:
+        callback (Callable[[ET.Element], Any]): The callback to be called
+        message_type (str, optional, defaults to None): The tag to listen for. If None, the callback is called for every tag
+
+        Returns:
+        Listener: The new listener
+        """
+
+        listener = Listener(callback, message_type)
+
+        with self.lock:
+            if listener.tag is None:
+                self.wildcard_listeners += (listener,)
+            else:
+                self.listeners_by_tag[listener.tag] = self.listeners_by_tag.get(listener.tag, ()) + (listener,)
+
+        return listener
+
+    def remove_listener(self, callback: Callable[[ET.Element], Any]) -> Listener:
+        """
+        Removes the first listener with the given callback
+
+        Parameters:
+        callback (Callable[[ET.Element], Any]): The callback to remove
+
+        Returns:
+        Listener: The removed listener
+        """
+
+        with self.lock:
+            for listener in self.get_all_listeners():
+                if listener.callback is not callback:
+                    continue
+
+                if listener.tag is None:
+                    self.wildcard_listeners = tuple(other for other in self.wildcard_listeners if other is not listener)
+                    return listener
+
+                remaining = tuple(other for other in self.listeners_by_tag[listener.tag] if other is not listener)
+
+                if len(remaining) == 0:
+                    del self.listeners_by_tag[listener.tag]
+                else:
+                    self.listeners_by_tag[listener.tag] = remaining
+
+                return listener
+
+        raise ValueError("Callback not in listeners")
+
+    def get_all_listeners(self) -> List[Listener]:
+        listeners = list(self.wildcard_listeners)
+
+        for tag_listeners in list(self.listeners_by_tag.values()):
+            listeners.extend(tag_listeners)
+
+        return listeners
+
+    def get_listeners(self, tag: str) -> Tuple[Listener, ...]:
+        """
+        Gets the listeners that an event with the given tag is passed to
+
+        Parameters:
+        tag (str): The tag of the event, without its namespace
+
+        Returns:
+        Tuple[Listener, ...]: The listeners for the tag, followed by the wildcard listeners
+        """
+
+        tag_listeners = self.listeners_by_tag.get(self.normalize_tag(tag))
+
+        if tag_listeners is None:
+            return self.wildcard_listeners
+
+        return tag_listeners + self.wildcard_listeners
+
+    def dispatch(self, listeners: Tuple[Listener, ...], data: Any) -> None:
+        """
+        Passes an event to the given listeners
+
+        Parameters:
+        listeners (Tuple[Listener, ...]): The listeners, usually from self.get_listeners
+        data (Any): The event
+        """
+
+        loop = None
+
+        if self.mode == "loop":
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                pass
+
+        for listener in listeners:
+            if self.mode == "inline" or (self.mode == "loop" and loop is None):
+                self.run_callback(listener, data, time.perf_counter())
+                continue
+
+            with listener.lock:
+                listener.queue.append((data, time.perf_counter()))
+
+                listener.stats.queue_depth = len(listener.queue)
+                listener.stats.max_queue_depth = max(listener.stats.max_queue_depth, listener.stats.queue_depth)
+
+                # the listener is already draining its queue, so it will reach this event in order
+                if listener.is_scheduled:
+                    continue
+
+                listener.is_scheduled = True
+
+            if loop is not None:
+                loop.call_soon(self.drain, listener)
+            else:
+                self.get_executor().submit(self.drain, listener)
+
+    def get_executor(self) -> Executor:
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="valorant-callbacks")
+
+            return self.executor
+
+    def drain(self, listener: Listener) -> None:
+        """
+        Calls the listener's callback with every event in its queue. Only one drain runs per listener at a time
+        """
+
+        while True:
+            with listener.lock:
+                if len(listener.queue) == 0:
+                    listener.is_scheduled = False
+                    return
+
+                data, dispatched_at = listener.queue.popleft()
+                listener.stats.queue_depth = len(listener.queue)
+
+            self.run_callback(listener, data, dispatched_at)
+
+    def run_callback(self, listener: Listener, data: Any, dispatched_at: float) -> None:
+        """
+        Calls the listener's callback and records how long it took. Exceptions from the callback are counted in the listener's stats instead of raised, in every mode, so one failing listener does not stop the others
+
+        Parameters:
+        listener (Listener): The listener
+        data (Any): The event
+        dispatched_at (float): The time.perf_counter() value when the event was dispatched
+        """
+
+        started_at = time.perf_counter()
+
+        try:
+            listener.callback(data)
+        except Exception as e:
+            listener.stats.errors += 1
+            listener.stats.last_error = e
+        finally:
+            finished_at = time.perf_counter()
+            stats = listener.stats
+
+            stats.calls += 1
+            stats.total_latency_seconds += finished_at - started_at
+            stats.max_latency_seconds = max(stats.max_latency_seconds, finished_at - started_at)
+            stats.total_wait_seconds += started_at - dispatched_at
+            stats.max_wait_seconds = max(stats.max_wait_seconds, started_at - dispatched_at)
+
+    def get_stats(self) -> List[dict]:
+        """
+        Gets the latency and queue depth of every listener
+
+        Returns:
+        List[dict]: The stats of each listener, including the callback's name and the tag it listens for
+        """
+
+        return [
+            {
+                "callback": getattr(listener.callback, "__qualname__", repr(listener.callback)),
+                "message_type": listener.message_type,
+                **listener.stats.to_dict()
+            }
+            for listener in self.get_all_listeners()
+        ]
+
+    def close(self, wait: bool = True) -> None:
+        """
+        Shuts down the thread pool, if this dispatcher created it
+
+        Parameters:
+        wait (bool, defaults to True): If True, waits for the queued callbacks to finish
+        """
+
+        if not self.owns_executor:
+            return
+
+        with self.lock:
+            executor, self.executor = self.executor, None
+
+        if executor is not None:
+            executor.shutdown(wait=wait)
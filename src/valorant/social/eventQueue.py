@@ -0,0 +1,217 @@
+from typing import Deque, Hashable, List, Optional, Union
+from collections import OrderedDict, deque
+import xml.etree.ElementTree as ET
+import asyncio
+import itertools
+
+
+OVERFLOW_POLICIES = ("block", "drop_oldest", "coalesce")
+
+
+class EventQueueStats:
+    def __init__(self):
+        """
+        Keeps track of the stanzas that passed through an EventQueue
+        """
+
+        self.received = 0
+        self.dispatched = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+        # the number of times the reader had to wait for the queue to have space, and for how long
+        self.blocked = 0
+        self.blocked_seconds = 0.0
+
+        self.max_depth = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "received": self.received,
+            "dispatched": self.dispatched,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "blocked": self.blocked,
+            "blocked_seconds": self.blocked_seconds,
+            "max_depth": self.max_depth
+        }
+
+
+class EventQueue:
+    def __init__(self, maxsize: int = 1024, overflow_policy: str = "block"):
+        """
+        A bounded queue between the XMPP reader and the dispatcher. The reader puts stanzas as they are parsed, and the dispatcher takes everything that is waiting at once. Must be used on a single event loop
+
+        Parameters:
+        maxsize (int, defaults to 1024): The maximum number of stanzas that can be waiting
+        overflow_policy (str, defaults to "block"): What happens when the queue is full. "block" makes the reader wait for space, "drop_oldest" drops the stanza that has waited the longest, and "coalesce" replaces a waiting presence from the same user with the newer one (and waits like "block" if the queue is still full)
+        """
+
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow_policy must be one of {OVERFLOW_POLICIES}, got {overflow_policy!r}")
+
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be at least 1, got {maxsize}")
+
+        self.maxsize = maxsize
+        self.overflow_policy = overflow_policy
+
+        # coalescing needs the waiting stanzas keyed by the puuid of their sender (or by a counter if they can not be coalesced), the other policies only need their order
+        self.items: Union[Deque[ET.Element], "OrderedDict[Hashable, ET.Element]"]
+        if overflow_policy == "coalesce":
+            self.items = OrderedDict()
+        else:
+            self.items = deque(maxlen=maxsize if overflow_policy == "drop_oldest" else None)
+
+        self.counter = itertools.count()
+
+        self.not_empty = asyncio.Event()
+        self.not_full = asyncio.Event()
+        self.not_full.set()
+
+        self.is_closed = False
+
+        self.stats = EventQueueStats()
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    @staticmethod
+    def get_coalesce_key(stanza: ET.Element) -> Optional[str]:
+        """
+        Gets the key that a stanza is coalesced by. Only presences that say what a user is doing are coalesced, other presence types (ex. subscriptions) are kept
+
+        Parameters:
+        stanza (ET.Element): The stanza
+
+        Returns:
+        Optional[str]: The puuid of the sender, or None if the stanza can not be coalesced
+        """
+
+        if stanza.tag != "presence" and not stanza.tag.endswith("}presence"):
+            return None
+
+        if stanza.attrib.get("type") not in (None, "unavailable"):
+            return None
+
+        sender = stanza.attrib.get("from")
+        return sender.split("@")[0] if sender is not None else None
+
+    async def put(self, stanzas: List[ET.Element]) -> None:
+        """
+        Adds stanzas to the queue, applying the overflow policy when it is full. Stanzas put on a closed queue are discarded
+
+        Parameters:
+        stanzas (List[ET.Element]): The stanzas in the order they were received
+        """
+
+        if self.is_closed:
+            return
+
+        self.stats.received += len(stanzas)
+
+        if self.overflow_policy == "coalesce":
+            await self.put_coalescing(stanzas)
+
+        elif self.overflow_policy == "drop_oldest":
+            # the deque's maxlen drops the oldest stanzas
+            overflow = len(self.items) + len(stanzas) - self.maxsize
+            if overflow > 0:
+                self.stats.dropped += overflow
+
+            self.items.extend(stanzas)
+            self.on_added()
+
+        else:
+            position = 0
+            while position < len(stanzas):
+                if len(self.items) >= self.maxsize:
+                    await self.wait_for_space()
+
+                    if self.is_closed:
+                        return
+
+                space = self.maxsize - len(self.items)
+                self.items.extend(stanzas[position:position + space])
+                position += space
+
+                self.on_added()
+
+    async def put_coalescing(self, stanzas: List[ET.Element]) -> None:
+        for stanza in stanzas:
+            key = self.get_coalesce_key(stanza)
+
+            # the waiting presence keeps its place in the queue, but is replaced with the newer one
+            if key is not None and key in self.items:
+                self.items[key] = stanza
+                self.stats.coalesced += 1
+                continue
+
+            if len(self.items) >= self.maxsize:
+                await self.wait_for_space()
+
+                if self.is_closed:
+                    return
+
+                # a presence from the same user may have been taken while waiting, so the key is checked again
+                if key is not None and key in self.items:
+                    self.items[key] = stanza
+                    self.stats.coalesced += 1
+                    continue
+
+            self.items[key if key is not None else next(self.counter)] = stanza
+            self.on_added()
+
+    def on_added(self) -> None:
+        if len(self.items) > self.stats.max_depth:
+            self.stats.max_depth = len(self.items)
+
+        self.not_empty.set()
+
+        if len(self.items) >= self.maxsize:
+            self.not_full.clear()
+
+    async def wait_for_space(self) -> None:
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+
+        self.stats.blocked += 1
+
+        while len(self.items) >= self.maxsize and not self.is_closed:
+            await self.not_full.wait()
+
+        self.stats.blocked_seconds += loop.time() - started_at
+
+    async def get(self) -> Optional[List[ET.Element]]:
+        """
+        Waits for stanzas and takes all of them
+
+        Returns:
+        Optional[List[ET.Element]]: The stanzas in the order they were received, or None if the queue was closed
+        """
+
+        while len(self.items) == 0:
+            if self.is_closed:
+                return None
+
+            await self.not_empty.wait()
+
+        stanzas = list(self.items.values()) if isinstance(self.items, OrderedDict) else list(self.items)
+        self.items.clear()
+
+        self.not_empty.clear()
+        self.not_full.set()
+
+        self.stats.dispatched += len(stanzas)
+
+        return stanzas
+
+    def close(self) -> None:
+        """
+        Closes the queue. Waiting stanzas can still be taken, after which get returns None
+        """
+
+        self.is_closed = True
+
+        self.not_empty.set()
+        self.not_full.set()
@@ -0,0 +1,332 @@
+from typing import TYPE_CHECKING, Any, Dict, FrozenSet, Iterator, List, Optional, Set
+import xml.etree.ElementTree as ET
+import threading
+import time
+
+if TYPE_CHECKING:
+    from .updateTypes.presenceUpdate import PresenceUpdate
+
+
+# the fields that can be looked up without scanning every user
+INDEXED_FIELDS = ("session_loop_state", "party_ID", "queue_ID", "map")
+
+# the store's fields and the keys of the presence payload they are read from
+PRESENCE_FIELDS = {
+    "is_idle": "isIdle",
+    "session_loop_state": "sessionLoopState",
+    "party_ID": "partyId",
+    "queue_ID": "queueId",
+    "map": "matchMap",
+    "competitive_tier": "competitiveTier",
+    "account_level": "accountLevel",
+    "party_size": "partySize",
+    "max_party_size": "maxPartySize",
+    "ally_team_score": "partyOwnerMatchScoreAllyTeam",
+    "enemy_team_score": "partyOwnerMatchScoreEnemyTeam",
+    "team": "partyOwnerMatchCurrentTeam"
+}
+
+ROSTER_QUERY_TAG = "{jabber:iq:riotgames:roster}query"
+
+
+def matches_tag(element: ET.Element, name: str) -> bool:
+    return element.tag == name or element.tag.endswith("}" + name)
+
+
+class PresenceState:
+    def __init__(self, puuid: str):
+        """
+        The latest known presence of a user. Fields that have not been received are None
+
+        Parameters:
+        puuid (str): The puuid of the user
+        """
+
+        self.puuid = puuid
+
+        self.game_name: Optional[str] = None
+        self.game_tag: Optional[str] = None
+        self.in_roster = False
+
+        self.is_online = False
+        self.is_idle: Optional[bool] = None
+
+        self.session_loop_state: Optional[str] = None
+        self.party_ID: Optional[str] = None
+        self.queue_ID: Optional[str] = None
+        self.map: Optional[str] = None
+
+        self.competitive_tier: Optional[int] = None
+        self.account_level: Optional[int] = None
+
+        self.party_size: Optional[int] = None
+        self.max_party_size: Optional[int] = None
+
+        self.ally_team_score: Optional[int] = None
+        self.enemy_team_score: Optional[int] = None
+        self.team: Optional[str] = None
+
+        # unix timestamp of the last presence or roster update that changed this user
+        self.updated_at = 0.0
+
+    def copy(self) -> "PresenceState":
+        state = PresenceState.__new__(PresenceState)
+        state.__dict__.update(self.__dict__)
+
+        return state
+
+    def to_dict(self) -> dict:
+        return dict(self.__dict__)
+
+
+class PresenceStore:
+    def __init__(self):
+        """
+        Keeps the latest presence of every user seen on the XMPP connection, keyed by puuid. Updates are applied as deltas, and the indexes on session loop state, party, queue and map allow lookups without scanning every user
+        """
+
+        self.states: Dict[str, PresenceState] = {}
+
+        # field -> value -> puuids of the users whose field has that value
+        self.indexes: Dict[str, Dict[Any, Set[str]]] = {field: {} for field in INDEXED_FIELDS}
+
+        self.updates_applied = 0
+        self.lock = threading.RLock()
+
+    def _get_or_create(self, puuid: str) -> PresenceState:
+        state = self.states.get(puuid)
+
+        if state is None:
+            state = PresenceState(puuid)
+            self.states[puuid] = state
+
+        return state
+
+    def _set_field(self, state: PresenceState, field: str, value: Any) -> bool:
+        """
+        Sets a field of a state, moving the user between index entries if the field is indexed. Expects self.lock to be held
+
+        Returns:
+        bool: True if the value changed
+        """
+
+        previous = getattr(state, field)
+        if previous == value:
+            return False
+
+        setattr(state, field, value)
+
+        index = self.indexes.get(field)
+        if index is None:
+            return True
+
+        if previous is not None:
+            puuids = index.get(previous)
+
+            if puuids is not None:
+                puuids.discard(state.puuid)
+
+                if len(puuids) == 0:
+                    del index[previous]
+
+        if value is not None:
+            index.setdefault(value, set()).add(state.puuid)
+
+        return True
+
+    def apply_presence(self, update: "PresenceUpdate") -> bool:
+        """
+        Applies a presence update
+
+        Parameters:
+        update (PresenceUpdate): The presence update
+
+        Returns:
+        bool: True if the user's state changed
+        """
+
+        # presences without Valorant data (ex. from the Riot Client) do not say anything about the game
+        if update.invalid and not update.is_unavailable:
+            return False
+
+        with self.lock:
+            state = self._get_or_create(update.from_puuid)
+            changed = self._set_field(state, "is_online", not update.is_unavailable)
+
+            payload = None if update.is_unavailable else update.presence_data
+
+            for field, key in PRESENCE_FIELDS.items():
+                value = payload.get(key) if payload is not None else None
+
+                # empty strings (ex. the map while in the menus) mean there is no value
+                if value == "":
+                    value = None
+
+                changed = self._set_field(state, field, value) or changed
+
+            if changed:
+                state.updated_at = time.time()
+                self.updates_applied += 1
+
+            return changed
+
+    def apply_roster(self, stanza: ET.Element) -> List[str]:
+        """
+        Applies the roster (friends list) from a roster query result or push. Stanzas that do not contain a roster are ignored
+
+        Parameters:
+        stanza (ET.Element): The iq stanza
+
+        Returns:
+        List[str]: The puuids of the users that were added, renamed or removed
+        """
+
+        query = stanza.find(ROSTER_QUERY_TAG)
+        if query is None:
+            return []
+
+        changed_puuids = []
+
+        with self.lock:
+            for item in query:
+                if not matches_tag(item, "item") or "jid" not in item.attrib:
+                    continue
+
+                state = self._get_or_create(item.attrib.get("puuid", item.attrib["jid"].split("@")[0]))
+                changed = self._set_field(state, "in_roster", item.attrib.get("subscription") != "remove")
+
+                riot_id = next((child for child in item if matches_tag(child, "id")), None)
+                if riot_id is not None:
+                    changed = self._set_field(state, "game_name", riot_id.attrib.get("name") or None) or changed
+                    changed = self._set_field(state, "game_tag", riot_id.attrib.get("tagline") or None) or changed
+
+                if changed:
+                    state.updated_at = time.time()
+                    changed_puuids.append(state.puuid)
+
+        return changed_puuids
+
+    def get(self, puuid: str) -> Optional[PresenceState]:
+        """
+        Gets the presence of a user
+
+        Parameters:
+        puuid (str): The puuid of the user
+
+        Returns:
+        Optional[PresenceState]: A copy of the user's state, or None if nothing is known about the user
+        """
+
+        with self.lock:
+            state = self.states.get(puuid)
+            return state.copy() if state is not None else None
+
+    def get_puuids(self, field: str, value: Any) -> FrozenSet[str]:
+        """
+        Gets the puuids of the users whose indexed field has the given value
+
+        Parameters:
+        field (str): One of INDEXED_FIELDS
+        value (Any): The value to look for
+
+        Returns:
+        FrozenSet[str]: The puuids
+        """
+
+        if field not in self.indexes:
+            raise ValueError(f"field must be one of {INDEXED_FIELDS}, got {field!r}")
+
+        with self.lock:
+            return frozenset(self.indexes[field].get(value, ()))
+
+    def find(self, field: str, value: Any) -> List[PresenceState]:
+        """
+        Gets the users whose indexed field has the given value
+
+        Parameters:
+        field (str): One of INDEXED_FIELDS
+        value (Any): The value to look for
+
+        Returns:
+        List[PresenceState]: Copies of the users' states
+        """
+
+        with self.lock:
+            return [self.states[puuid].copy() for puuid in self.get_puuids(field, value)]
+
+    def get_in_state(self, session_loop_state: str) -> List[PresenceState]:
+        """
+        Gets the users in the given session loop state ("MENUS", "PREGAME" or "INGAME")
+        """
+
+        return self.find("session_loop_state", session_loop_state)
+
+    def get_party_members(self, party_ID: str) -> List[PresenceState]:
+        return self.find("party_ID", party_ID)
+
+    def get_in_queue(self, queue_ID: str) -> List[PresenceState]:
+        return self.find("queue_ID", queue_ID)
+
+    def get_on_map(self, map: str) -> List[PresenceState]:
+        return self.find("map", map)
+
+    def get_roster(self) -> List[PresenceState]:
+        """
+        Gets the users in the roster (friends list)
+        """
+
+        with self.lock:
+            return [state.copy() for state in self.states.values() if state.in_roster]
+
+    def snapshot(self) -> Dict[str, PresenceState]:
+        """
+        Gets a consistent copy of every user's state
+
+        Returns:
+        Dict[str, PresenceState]: The states, keyed by puuid
+        """
+
+        with self.lock:
+            return {puuid: state.copy() for puuid, state in self.states.items()}
+
+    def remove(self, puuid: str) -> None:
+        with self.lock:
+            state = self.states.get(puuid)
+            if state is None:
+                return
+
+            for field in INDEXED_FIELDS:
+                self._set_field(state, field, None)
+
+            del self.states[puuid]
+
+    def mark_all_offline(self) -> None:
+        """
+        Marks every user as offline, keeping their names and roster membership. Used when the connection is lost, since the server only sends the presences of the users that are online after reconnecting
+        """
+
+        with self.lock:
+            for state in self.states.values():
+                changed = self._set_field(state, "is_online", False)
+
+                for field in PRESENCE_FIELDS:
+                    changed = self._set_field(state, field, None) or changed
+
+                if changed:
+                    state.updated_at = time.time()
+
+    def clear(self) -> None:
+        with self.lock:
+            self.states.clear()
+
+            for index in self.indexes.values():
+                index.clear()
+
+    def __iter__(self) -> Iterator[PresenceState]:
+        return iter(self.snapshot().values())
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    def __contains__(self, puuid: str) -> bool:
+        return puuid in self.states
@@ -1,23 +1,34 @@
-from typing import Callable, List, TYPE_CHECKING, Any, Optional, Generator, AsyncGenerator
+from typing import Callable, Dict, Iterable, List, TYPE_CHECKING, Any, Optional, Generator, AsyncGenerator, Union, Tuple
 import threading
-import socket
+import codecs
+import random
 import ssl
 import time
 import xml.etree.ElementTree as ET
 import asyncio
 
 from .xmlParser import XMLParser
+from .eventDispatcher import EventDispatcher, Listener
+from .eventQueue import EventQueue, OVERFLOW_POLICIES
+from .presenceStore import PresenceStore
+from .subscription import Subscription
 
 from .updateTypes.presenceUpdate import PresenceUpdate
+from .updateTypes.resyncEvent import ResyncEvent, RESYNC_TAG
 
 if TYPE_CHECKING:
     from ..session import Session
 
 
-class Listener:
-    def __init__(self, callback: Callable[[ET.Element], Any], message_type: Optional[str] = None):
-        self.callback = callback
-        self.message_type = message_type
+# the ids of XMPP pings, whose responses are not passed to listeners
+PING_ID_PREFIX = "ping_"
+
+# a connection that stayed up for this long resets the reconnect backoff
+STABLE_CONNECTION_SECONDS = 10
+
+
+class XMPPAuthenticationError(RuntimeError):
+    pass
 
 
 class ServerDetails:
@@ -28,65 +39,205 @@ class ServerDetails:
 
 
 class SocialManager:
-    def __init__(self, session: "Session"):
+    def __init__(self, session: "Session", ssl_context: Optional[ssl.SSLContext] = None, read_size: int = 64 * 1024, dispatch_mode: str = "inline", callback_workers: int = 4, queue_size: int = 1024, overflow_policy: str = "block", auto_reconnect: bool = True, reconnect_initial_delay: float = 0.1, reconnect_max_delay: float = 30, ping_interval: float = 20, ping_timeout: Optional[float] = 10, connect_timeout: float = 10):
         """
         Helps to manage the XML data that that comes from the presence/social XMPP connection
 
         Parameters:
         session (Session): The Session object
+        ssl_context (ssl.SSLContext, optional, defaults to None): The context used for the TLS connection. If None, the server's certificate is not verified, as before
+        read_size (int, defaults to 64 KiB): The maximum number of bytes read from the connection at a time
+        dispatch_mode (str, defaults to "inline"): Where callbacks run, see EventDispatcher. Use "thread" so slow callbacks do not hold up the connection
+        callback_workers (int, defaults to 4): The number of threads that run callbacks when dispatch_mode is "thread"
+        queue_size (int, defaults to 1024): The maximum number of stanzas waiting between the reader and the dispatcher
+        overflow_policy (str, defaults to "block"): What happens when the queue is full, see EventQueue. "coalesce" only keeps the newest waiting presence of every user, so bursts of presences do not pile up
+        auto_reconnect (bool, defaults to True): If True, the connection is reopened when it is lost, and a ResyncEvent is sent to the "resync" listeners once it is back
+        reconnect_initial_delay (float, defaults to 0.1): The delay before the first reconnect attempt, in seconds. It doubles after every failed attempt, with jitter
+        reconnect_max_delay (float, defaults to 30): The maximum delay between reconnect attempts, in seconds
+        ping_interval (float, defaults to 20): The time between pings, in seconds
+        ping_timeout (float, optional, defaults to 10): If the server sends nothing within this many seconds of a ping, the connection is treated as lost. If None, whitespace pings are sent and never time out
+        connect_timeout (float, defaults to 10): The maximum time a reconnect attempt can take, in seconds
         """
 
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow_policy must be one of {OVERFLOW_POLICIES}, got {overflow_policy!r}")
+
         self.session: "Session" = session
 
-        self.listeners: List[Listener] = []
+        self.dispatcher = EventDispatcher(dispatch_mode, callback_workers)
+
+        # like the dispatcher's listeners, subscriptions are stored in tuples that are replaced rather than modified
+        self.subscriptions_by_tag: Dict[str, Tuple[Subscription, ...]] = {}
+        self.wildcard_subscriptions: Tuple[Subscription, ...] = ()
+        self.subscriptions_lock = threading.Lock()
+
+        # only kept when enabled, since it means decoding every presence
+        self.presence_store: Optional[PresenceStore] = None
         self.is_listening: bool = False
 
+        # only used by the threaded start_listening facade
         self.listening_thread: Optional[threading.Thread] = None
         self.listening_thread_flag = threading.Event()
-        self.exit_flag = asyncio.Event()
+        self.listening_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.listening_error: Optional[BaseException] = None
 
         self.ping_task: Optional[asyncio.Task] = None
         self.get_messages_task: Optional[asyncio.Task] = None
+        self.dispatch_task: Optional[asyncio.Task] = None
+        self.supervisor_task: Optional[asyncio.Task] = None
+
+        self.auto_reconnect = auto_reconnect
+        self.reconnect_initial_delay = reconnect_initial_delay
+        self.reconnect_max_delay = reconnect_max_delay
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.connect_timeout = connect_timeout
+
+        # reused when reconnecting, so clientconfig and the PAS token are not fetched again
+        self.server_details: Optional[ServerDetails] = None
+
+        # the server details and tokens passed to start, which are used instead of fetching them
+        self.given_server_details: Optional[ServerDetails] = None
+        self.given_tokens: Optional[Tuple[str, str, str]] = None
+
+        self.ping_count = 0
+        self.last_received_at = 0.0
+        self.reconnect_attempt = 0
+        self.reconnect_count = 0
+        self.last_reconnect_error: Optional[BaseException] = None
+
+        # stanzas that could not be converted or delivered are counted and skipped, so one bad stanza does not stop the dispatcher
+        self.event_errors = 0
+        self.last_event_error: Optional[BaseException] = None
+
+        # the number of times the supervisor had to start a new dispatcher because the old one stopped
+        self.dispatcher_restarts = 0
+
+        # created for every connection, since it belongs to the event loop that the connection runs on
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        self.event_queue: Optional[EventQueue] = None
 
         self.xml_parser: XMLParser = XMLParser()
 
-        self.tls_socket: ssl.SSLSocket = None
+        # stanzas that were received while waiting for a specific response, which are dispatched once listening starts
+        self.pending_stanzas: List[ET.Element] = []
+
+        self.ssl_context = ssl_context if ssl_context is not None else self.create_ssl_context()
+        self.read_size = read_size
+
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+        # a multi-byte character can be split between two reads
+        self.decoder = codecs.getincrementaldecoder("utf-8")("replace")
 
         self.tag_to_class = {
-            "presence": PresenceUpdate
+            "presence": PresenceUpdate,
+            RESYNC_TAG: ResyncEvent
         }
 
+    def enable_presence_store(self) -> PresenceStore:
+        """
+        Starts keeping the latest presence of every user in a PresenceStore. Should be called before connecting, so the roster and the initial presences are included
+
+        Returns:
+        PresenceStore: The store
+        """
+
+        if self.presence_store is None:
+            self.presence_store = PresenceStore()
+
+        return self.presence_store
+
+    @property
+    def listeners(self) -> List[Listener]:
+        return self.dispatcher.get_all_listeners()
+
+    @staticmethod
+    def create_ssl_context() -> ssl.SSLContext:
+        """
+        Creates the default context for the XMPP connection. Like ssl.wrap_socket, which was used before, it does not verify the server's certificate
+
+        Returns:
+        ssl.SSLContext: The context
+        """
+
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+
+        return context
+
+    @staticmethod
+    def get_tag_name(element: ET.Element) -> str:
+        """
+        Gets the tag of an element without its namespace
+        """
+
+        return element.tag.split('}')[1] if '}' in element.tag else element.tag
+
     async def send_message(self, content: str) -> None:
         """
-        Send a message with self.tls_socket
+        Send a message over the XMPP connection. Waits while the connection's write buffer is full
 
         Parameters:
         content (str): The content of the message
         """
 
-        if not self.is_listening or self.tls_socket is None:
-            raise RuntimeError("Unable to send message. self.is_listening is False or self.tls_socket is None.")
+        if not self.is_listening or self.writer is None:
+            raise RuntimeError("Unable to send message. self.is_listening is False or self.writer is None.")
 
-        await asyncio.to_thread(self.tls_socket.sendall, content.encode())
+        self.writer.write(content.encode())
+        await self.writer.drain()
 
     async def receive_message(self) -> str:
         """
-        Receives a message with self.tls_socket
+        Receives the data that is available on the XMPP connection, up to self.read_size bytes
+
+        Returns:
+        str: The received data, or an empty string if the connection was closed
+        """
+
+        if not self.is_listening or self.reader is None:
+            raise RuntimeError("Unable to receive message. self.is_listening is False or self.reader is None.")
+
+        while True:
+            data = await self.reader.read(self.read_size)
+
+            if data == b"":
+                return ""
+
+            self.last_received_at = time.monotonic()
+            response = self.decoder.decode(data)
+
+            # the read only contained the start of a multi-byte character
+            if response != "":
+                return response
+
+    async def receive_stanza(self, *tags: str, stanza_id: Optional[str] = None) -> ET.Element:
         """
+        Waits for a stanza with one of the given tags. Other stanzas that are received in the meantime are kept in self.pending_stanzas
 
-        if not self.is_listening or self.tls_socket is None:
-            raise RuntimeError("Unable to receive message. self.is_listening is False or self.tls_socket is None.")
+        Parameters:
+        *tags (str): The tags to wait for, without their namespaces
+        stanza_id (str, optional, defaults to None): If not None, the id attribute that the stanza must have
 
-        response: str = ""
+        Returns:
+        ET.Element: The stanza
+        """
 
         while True:
-            chunk = (await asyncio.to_thread(self.tls_socket.recv, 1024)).decode("utf-8")
-            response += chunk
+            for index, stanza in enumerate(self.pending_stanzas):
+                if self.get_tag_name(stanza) in tags and (stanza_id is None or stanza.attrib.get("id") == stanza_id):
+                    return self.pending_stanzas.pop(index)
 
-            if len(chunk) < 1024:
-                break
+            data = await self.receive_message()
+
+            if data == "":
+                raise ConnectionError("The XMPP server closed the connection")
 
-        return response
+            self.pending_stanzas.extend(self.xml_parser.parse_xml(data))
 
     def get_server_details(self) -> ServerDetails:
         """
@@ -98,7 +249,7 @@ class SocialManager:
 
         region_affinity = self.session.auth.get_pas_token()["payload"]["affinity"]
 
-        riot_client_config = self.session.fetch(f"https://clientconfig.rpg.riotgames.com/api/v1/config/player?os=windows&region={region_affinity}&app=Riot%20Client")
+        riot_client_config = self.session.fetch(f"{self.session.clientconfig_url}/api/v1/config/player?os=windows&region={region_affinity}&app=Riot%20Client", persist=True)
 
         server = riot_client_config["chat.affinities"][region_affinity]
         port = riot_client_config["chat.port"]
@@ -108,21 +259,42 @@ class SocialManager:
 
     async def send_ping(self):
         """
-        Sends a ping to the server every 20 seconds
+        Sends a ping to the server every self.ping_interval seconds. Returns if the server sends nothing within self.ping_timeout seconds of a ping
         """
 
         while True:
             try:
-                await asyncio.sleep(20)
-                await self.send_message(" ")
+                await asyncio.sleep(self.ping_interval)
+
+                if self.ping_timeout is None:
+                    await self.send_message(" ")
+                    continue
+
+                self.ping_count += 1
+                sent_at = time.monotonic()
+
+                await self.send_message(f'<iq type="get" id="{PING_ID_PREFIX}{self.ping_count}"><ping xmlns="urn:xmpp:ping"/></iq>')
+                await asyncio.sleep(self.ping_timeout)
+
+                # any data counts as a response, since the answer can be queued behind other stanzas
+                if self.last_received_at < sent_at:
+                    return
+
             except asyncio.CancelledError:
                 break
 
     async def receive_messages(self):
         """
-        Begins the process of receiving messages from the server
+        Begins the process of receiving messages from the server and putting them on self.event_queue
         """
 
+        event_queue = self.event_queue
+
+        # queue the stanzas that arrived while authenticating
+        if len(self.pending_stanzas) != 0:
+            pending_stanzas, self.pending_stanzas = self.pending_stanzas, []
+            await event_queue.put(pending_stanzas)
+
         async def gen():
             while True:
                 try:
@@ -130,11 +302,30 @@ class SocialManager:
                 except asyncio.CancelledError:
                     break
 
-        await self.xml_parser.parse_stream(gen(), self.send_event)
+        await self.xml_parser.parse_stream(gen(), event_queue.put)
+
+    async def dispatch_events(self):
+        """
+        Takes the stanzas waiting on self.event_queue and sends them to the callbacks, until the queue is closed
+        """
+
+        event_queue = self.event_queue
+
+        try:
+            while True:
+                stanzas = await event_queue.get()
+
+                if stanzas is None:
+                    break
+
+                self.send_event(stanzas)
+        finally:
+            # the reader should not wait for space that will never be made
+            event_queue.close()
 
     async def send_auth_messages(self, server_details: ServerDetails, PAS_token: str, RSO_token: str, entitlement: str):
         """
-        Sends authentication messages via the XMPP connection
+        Sends authentication messages via the XMPP connection, waiting for the server's response to each one
 
         Parameters:
         server_details (ServerDetails): The server details
@@ -143,43 +334,75 @@ class SocialManager:
         entitlement (str): The entitlement token to do authentication with
         """
 
-        auth_messages = [
-            {"content": f'<?xml version="1.0" encoding="UTF-8"?><stream:stream to="{server_details.xmppRegion}.pvp.net" xml:lang="en" version="1.0" xmlns="jabber:client" xmlns:stream="http://etherx.jabber.org/streams">"', "receiveAfter": 2},
-            {"content": f'<auth mechanism="X-Riot-RSO-PAS" xmlns="urn:ietf:params:xml:ns:xmpp-sasl"><rso_token>{RSO_token}</rso_token><pas_token>{PAS_token}</pas_token></auth>', "receiveAfter": 1},
-            {"content": f'<?xml version="1.0"?><stream:stream to="{server_details.xmppRegion}.pvp.net" version="1.0" xmlns:stream="http://etherx.jabber.org/streams">', "receiveAfter": 2},
-            {"content": '<iq id="_xmpp_bind1" type="set"><bind xmlns="urn:ietf:params:xml:ns:xmpp-bind"></bind></iq>', "receiveAfter": 1},
-            {"content": '<iq id="_xmpp_session1" type="set"><session xmlns="urn:ietf:params:xml:ns:xmpp-session"/></iq>', "receiveAfter": 1},
-            {"content": f'<iq id="xmpp_entitlements_0" type="set"><entitlements xmlns="urn:riotgames:entitlements"><token xmlns="">{entitlement}</token></entitlements></iq>', "receiveAfter": 1},
+        auth_messages: List[Tuple[str, Tuple[str, ...], Optional[str]]] = [
+            (f'<?xml version="1.0" encoding="UTF-8"?><stream:stream to="{server_details.xmppRegion}.pvp.net" xml:lang="en" version="1.0" xmlns="jabber:client" xmlns:stream="http://etherx.jabber.org/streams">', ("features",), None),
+            (f'<auth mechanism="X-Riot-RSO-PAS" xmlns="urn:ietf:params:xml:ns:xmpp-sasl"><rso_token>{RSO_token}</rso_token><pas_token>{PAS_token}</pas_token></auth>', ("success", "failure"), None),
+            (f'<?xml version="1.0"?><stream:stream to="{server_details.xmppRegion}.pvp.net" version="1.0" xmlns:stream="http://etherx.jabber.org/streams">', ("features",), None),
+            ('<iq id="_xmpp_bind1" type="set"><bind xmlns="urn:ietf:params:xml:ns:xmpp-bind"></bind></iq>', ("iq",), "_xmpp_bind1"),
+            ('<iq id="_xmpp_session1" type="set"><session xmlns="urn:ietf:params:xml:ns:xmpp-session"/></iq>', ("iq",), "_xmpp_session1"),
+            (f'<iq id="xmpp_entitlements_0" type="set"><entitlements xmlns="urn:riotgames:entitlements"><token xmlns="">{entitlement}</token></entitlements></iq>', ("iq",), "xmpp_entitlements_0"),
         ]
 
-        for message in auth_messages:
-            await self.send_message(message["content"])
+        for content, response_tags, response_id in auth_messages:
+            # the server answers a stream header with a new XML document
+            if content.startswith("<?xml"):
+                self.xml_parser.reset()
+
+            await self.send_message(content)
+
+            response = await self.receive_stanza(*response_tags, stanza_id=response_id)
+
+            if self.get_tag_name(response) == "failure":
+                raise XMPPAuthenticationError("The XMPP server rejected the authentication tokens")
+
+    def get_tokens(self, force_renew: bool = False) -> Tuple[str, str, str]:
+        """
+        Fetches the tokens needed to authenticate with the XMPP server. Tokens that have not expired are reused
 
-            for _ in range(message["receiveAfter"]):
-                await self.receive_message()
+        Parameters:
+        force_renew (bool, defaults to False): If True, new tokens are fetched even if the current ones have not expired
 
-    async def _start_listening(self):
+        Returns:
+        Tuple[str, str, str]: The PAS token, the RSO (access) token and the entitlement token
         """
-        Internal method to connect to the XMPP server
+
+        self.session.auth.get_pas_token(force_renew)
+        auth_headers = self.session.auth.get_auth_headers(force_renew)
+
+        return self.session.auth.pas_token, auth_headers['Authorization'][len("Bearer "):], auth_headers["X-Riot-Entitlements-JWT"]
+
+    async def connect(self, server_details: Optional[ServerDetails] = None, tokens: Optional[Tuple[str, str, str]] = None) -> None:
         """
+        Opens the TLS connection to the XMPP server and authenticates
 
-        self.exit_flag.clear()
+        Parameters:
+        server_details (ServerDetails, optional, defaults to None): The server to connect to. If None, the server from the last connection is used, or it is fetched with self.get_server_details
+        tokens (Tuple[str, str, str], optional, defaults to None): The PAS, RSO and entitlement tokens. If None, they are fetched with self.get_tokens
+        """
 
-        # Create a regular socket and wrap it with TLS
-        raw_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.tls_socket = ssl.wrap_socket(raw_socket)
+        if server_details is None:
+            server_details = self.server_details
 
-        # get server details
-        server_details = self.get_server_details()
+        # the REST requests are blocking, so they are made off the event loop
+        if server_details is None:
+            server_details = await asyncio.to_thread(self.get_server_details)
 
-        # get various tokens and entitlement details
-        self.session.auth.get_pas_token()
-        PAS_token = self.session.auth.pas_token
-        RSO_token = self.session.auth.get_auth_headers()['Authorization'][len("Bearer "):]
-        entitlement = self.session.auth.get_auth_headers()["X-Riot-Entitlements-JWT"]
+        self.server_details = server_details
+
+        if tokens is None:
+            tokens = await asyncio.to_thread(self.get_tokens)
+
+        PAS_token, RSO_token, entitlement = tokens
 
         # actually connect to the server
-        self.tls_socket.connect((server_details.server, server_details.port))
+        self.reader, self.writer = await asyncio.open_connection(
+            server_details.server, server_details.port,
+            ssl=self.ssl_context, server_hostname=server_details.server, limit=self.read_size
+        )
+
+        self.xml_parser.reset()
+        self.decoder.reset()
+        self.pending_stanzas = []
 
         # send auth messages
         await self.send_auth_messages(server_details, PAS_token, RSO_token, entitlement)
@@ -188,30 +411,249 @@ class SocialManager:
         await self.send_message("<presence/>")
         await self.send_message('<iq type="get" id="2"><query xmlns="jabber:iq:riotgames:roster" last_state="true" /></iq>')
 
-        # init the pinging task and receive_messages task
-        self.ping_task = asyncio.create_task(self.send_ping())
-        self.get_messages_task = asyncio.create_task(self.receive_messages())
+    async def start(self, server_details: Optional[ServerDetails] = None, tokens: Optional[Tuple[str, str, str]] = None) -> None:
+        """
+        Connect to the presence and social XMPP server and begin calling callbacks from self.add_callback. Runs on the caller's event loop, so no thread is needed
 
-        # allow for the main thread to continue
-        self.listening_thread_flag.set()
+        Parameters:
+        server_details (ServerDetails, optional, defaults to None): The server to connect to. If None, the server from the last connection is used, or it is fetched from the Riot Client config
+        tokens (Tuple[str, str, str], optional, defaults to None): The PAS, RSO and entitlement tokens. If None, they are fetched from the Riot Client, and fetched again when reconnecting only if they have expired
+        """
 
-        # wait until the exit flag is set
-        await self.exit_flag.wait()
+        if self.is_listening:
+            return
 
-    def start_listening(self):
+        self.is_listening = True
+        self.event_queue = EventQueue(self.queue_size, self.overflow_policy)
+
+        self.given_server_details = server_details
+        self.given_tokens = tokens
+        self.reconnect_attempt = 0
+
+        try:
+            await self.connect(server_details, tokens)
+        except BaseException:
+            await self.close_connection()
+            self.is_listening = False
+            raise
+
+        # the supervisor runs the pinging and receive_messages tasks of every connection
+        self.dispatch_task = asyncio.create_task(self.dispatch_events())
+        self.supervisor_task = asyncio.create_task(self.supervise())
+
+    async def supervise(self) -> None:
         """
-        Connect to the presence and social XMPP server and begin calling callbacks from self.add_callback
+        Runs the reader and the pings of the current connection, and reconnects when the connection is lost, if self.auto_reconnect is True. The dispatcher is watched too, since the reader can not make progress without it
         """
 
-        if self.is_listening:
+        try:
+            while self.is_listening:
+                connected_at = time.monotonic()
+
+                self.get_messages_task = asyncio.create_task(self.receive_messages())
+                self.ping_task = asyncio.create_task(self.send_ping())
+
+                await asyncio.wait((self.get_messages_task, self.ping_task, self.dispatch_task), return_when=asyncio.FIRST_COMPLETED)
+
+                disconnected_at = time.monotonic()
+                reason = self.get_disconnect_reason()
+
+                await self.cancel_connection_tasks()
+                await self.close_connection()
+
+                if not self.is_listening or not self.auto_reconnect:
+                    break
+
+                # the dispatcher closed its queue when it stopped, so the stanzas after it would be thrown away. a new one is started with a new queue, and the resync event tells listeners that events were missed
+                if self.dispatch_task.done():
+                    self.restart_dispatcher()
+
+                # the server will send the presences of the users that are still online once reconnected
+                if self.presence_store is not None:
+                    self.presence_store.mark_all_offline()
+
+                # a connection that keeps dropping straight away keeps backing off
+                if disconnected_at - connected_at >= STABLE_CONNECTION_SECONDS:
+                    self.reconnect_attempt = 0
+
+                attempts = await self.reconnect()
+                self.reconnect_count += 1
+
+                # queued before the reader starts, so the roster and presences that are requested again come after it
+                await self.event_queue.put([ResyncEvent.make_element(reason, attempts, time.monotonic() - disconnected_at)])
+
+        finally:
+            # lets the dispatcher finish the stanzas that are still waiting
+            self.event_queue.close()
+
+            # the connection was lost and is not reopened, so stop reports that nothing is listening anymore
+            self.is_listening = False
+
+    def restart_dispatcher(self) -> None:
+        """
+        Starts a new dispatcher with a new queue after the old dispatcher stopped
+        """
+
+        self.dispatcher_restarts += 1
+
+        self.event_queue = EventQueue(self.queue_size, self.overflow_policy)
+        self.dispatch_task = asyncio.create_task(self.dispatch_events())
+
+    def get_disconnect_reason(self) -> str:
+        """
+        Gets why the connection's tasks finished. Expects at least one of them to be done
+
+        Returns:
+        str: The reason
+        """
+
+        for task in (self.dispatch_task, self.get_messages_task, self.ping_task):
+            if task is None or not task.done() or task.cancelled():
+                continue
+
+            if task is self.dispatch_task:
+                return f"dispatcher stopped: {task.exception()!r}" if task.exception() is not None else "dispatcher stopped"
+
+            if task.exception() is not None:
+                return repr(task.exception())
+
+            return "ping timeout" if task is self.ping_task else "closed by the server"
+
+        return "unknown"
+
+    async def cancel_connection_tasks(self) -> None:
+        tasks = [task for task in (self.get_messages_task, self.ping_task) if task is not None]
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        self.get_messages_task = None
+        self.ping_task = None
+
+    def get_reconnect_delay(self, attempt: int) -> float:
+        """
+        Gets the delay before a reconnect attempt. The delay doubles with every attempt up to self.reconnect_max_delay, and is randomly shortened by up to half so that many clients do not reconnect at the same time
+
+        Parameters:
+        attempt (int): The number of attempts that have already failed
+
+        Returns:
+        float: The delay in seconds
+        """
+
+        delay = min(self.reconnect_max_delay, self.reconnect_initial_delay * 2 ** min(attempt, 32))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    async def reconnect(self) -> int:
+        """
+        Connects again until it succeeds or self.stop is called, waiting longer after every failed attempt. The cached server details and tokens are reused, unless the server rejects the tokens or keeps refusing connections
+
+        Returns:
+        int: The number of attempts it took
+        """
+
+        attempts = 0
+        force_token_renewal = False
+
+        while self.is_listening:
+            await asyncio.sleep(self.get_reconnect_delay(self.reconnect_attempt))
+
+            self.reconnect_attempt += 1
+            attempts += 1
+
+            try:
+                tokens = self.given_tokens
+                if tokens is None and force_token_renewal:
+                    tokens = await asyncio.to_thread(self.get_tokens, True)
+
+                await asyncio.wait_for(self.connect(self.given_server_details, tokens), self.connect_timeout)
+                return attempts
+
+            # any failure is retried, since the supervisor is what keeps the connection alive
+            except Exception as e:
+                self.last_reconnect_error = e
+                await self.close_connection()
+
+                force_token_renewal = isinstance(e, XMPPAuthenticationError)
+
+                # the chat server may have moved, so fetch its details again every few attempts
+                if self.given_server_details is None and attempts % 3 == 0:
+                    self.server_details = None
+
+        return attempts
+
+    async def close_connection(self) -> None:
+        """
+        Closes the TLS connection, if there is one
+        """
+
+        writer, self.writer, self.reader = self.writer, None, None
+
+        if writer is None:
+            return
+
+        writer.close()
+
+        # the TLS shutdown can fail or time out if the server is already gone
+        try:
+            await writer.wait_closed()
+        except (OSError, asyncio.TimeoutError):
+            pass
+
+    async def stop(self) -> None:
+        """
+        Disconnect from the XMPP server and stop calling callbacks. Must be awaited on the event loop that self.start was awaited on
+        """
+
+        # the supervisor may have already stopped listening on its own, but its tasks still need to be cleaned up
+        if not self.is_listening and self.supervisor_task is None:
+            return
+
+        self.is_listening = False
+
+        tasks = [task for task in (self.supervisor_task, self.dispatch_task) if task is not None]
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.cancel_connection_tasks()
+
+        self.supervisor_task = None
+        self.dispatch_task = None
+
+        await self.close_connection()
+
+    def start_listening(self, server_details: Optional[ServerDetails] = None, tokens: Optional[Tuple[str, str, str]] = None):
+        """
+        Connect to the presence and social XMPP server and begin calling callbacks from self.add_callback. The connection runs on an event loop in a background thread
+
+        Parameters:
+        server_details (ServerDetails, optional, defaults to None): The server to connect to. If None, it is fetched from the Riot Client config
+        tokens (Tuple[str, str, str], optional, defaults to None): The PAS, RSO and entitlement tokens. If None, they are fetched from the Riot Client
+        """
+
+        if self.is_listening or self.listening_thread is not None:
             return
 
-        self.is_listening = True
         self.listening_thread_flag.clear()
+        self.listening_error = None
 
         def run_listening_thread():
             loop = asyncio.new_event_loop()
-            loop.run_until_complete(self._start_listening())
+            self.listening_loop = loop
+
+            try:
+                loop.run_until_complete(self.start(server_details, tokens))
+            except BaseException as e:
+                self.listening_error = e
+
+            # allow for the main thread to continue
+            self.listening_thread_flag.set()
+
+            if self.listening_error is None:
+                loop.run_forever()
+
             loop.close()
 
         # start the listening thread
@@ -221,55 +663,115 @@ class SocialManager:
         # wait for the listening thread to allow us to continue
         self.listening_thread_flag.wait()
 
+        if self.listening_error is not None:
+            self.listening_thread.join()
+            self.listening_thread = None
+            self.listening_loop = None
+
+            raise self.listening_error
+
     def stop_listening(self):
         """
-        Disconnect from the XMPP server and stop calling callbacks
+        Disconnect from the XMPP server and stop calling callbacks that were started with self.start_listening
         """
 
-        if not self.is_listening:
+        if self.listening_thread is None:
             return
 
-        self.is_listening = False
-        self.exit_flag.set()
+        asyncio.run_coroutine_threadsafe(self.stop(), self.listening_loop).result()
 
-        self.get_messages_task.cancel()
-        self.ping_task.cancel()
-        self.tls_socket.close()
+        self.listening_loop.call_soon_threadsafe(self.listening_loop.stop)
         self.listening_thread.join()
 
-        self.get_messages_task = None
-        self.ping_task = None
         self.listening_thread = None
-        self.tls_socket = None
+        self.listening_loop = None
 
     def convert_tag_to_class(self, tag_name: str):
         return self.tag_to_class[tag_name] if tag_name in self.tag_to_class else None
 
-    def send_event(self, event_data: str):
+    def send_event(self, event_data: List[Union[ET.Element, str]]):
         """
-        Sends an event to the callbacks added from self.add_callback
+        Sends an event to the callbacks added from self.add_callback and to the subscriptions from self.subscribe
 
         Parameters:
-        event_data (str): The data that will be sent to the callbacks
+        event_data (List[Union[ET.Element, str]]): The stanzas that will be sent to the callbacks. Stanzas that are strings are parsed first
         """
 
-        for xml in event_data:
-            data = ET.fromstring(xml)
+        # every subscription gets the events of a batch at once, so there is one hop to its loop per batch
+        deliveries: Dict[Subscription, List[Any]] = {}
 
-            tag = data.tag.split('}')[1] if '}' in data.tag else data.tag
-            tag_class = self.convert_tag_to_class(tag)
+        try:
+            for xml in event_data:
+                try:
+                    self.send_stanza(xml, deliveries)
+                except Exception as e:
+                    self.event_errors += 1
+                    self.last_event_error = e
 
-            if tag_class is not None:
-                data = tag_class(self.session, data)
+        finally:
+            for subscription, events in deliveries.items():
+                subscription.deliver(events)
 
-                if data.invalid:
-                    continue
+    def send_stanza(self, xml: Union[ET.Element, str], deliveries: Dict[Subscription, List[Any]]) -> None:
+        """
+        Converts a stanza and passes it to its listeners, and adds it to the deliveries of the subscriptions that want it
 
-            for listener in self.listeners:
-                if listener.message_type is not None and tag.lower() != listener.message_type.lower():
-                    continue
+        Parameters:
+        xml (Union[ET.Element, str]): The stanza. Strings are parsed first
+        deliveries (Dict[Subscription, List[Any]]): The events of the current batch for every subscription
+        """
+
+        data = ET.fromstring(xml) if isinstance(xml, str) else xml
+
+        tag = self.get_tag_name(data)
+
+        # responses to our own pings
+        if tag == "iq" and data.attrib.get("id", "").startswith(PING_ID_PREFIX):
+            return
 
-                listener.callback(data)
+        listeners = self.dispatcher.get_listeners(tag)
+        subscriptions = self.get_subscriptions(tag)
+        presence_store = self.presence_store
+
+        if presence_store is not None and tag == "iq":
+            self.apply_roster(presence_store, data)
+
+        # subscriptions are filtered by sender before the stanza is converted
+        if len(subscriptions) != 0:
+            subscriptions = [subscription for subscription in subscriptions if subscription.matches(data)]
+
+        # nobody needs this tag, so there is no need to convert it
+        if len(listeners) == 0 and len(subscriptions) == 0 and (presence_store is None or tag != "presence"):
+            return
+
+        tag_class = self.convert_tag_to_class(tag)
+
+        if tag_class is not None:
+            data = tag_class(self.session, data)
+
+            # unavailable presences are invalid for listeners, but still mean the user went offline
+            if presence_store is not None and isinstance(data, PresenceUpdate):
+                presence_store.apply_presence(data)
+
+            if data.invalid:
+                return
+
+        for subscription in subscriptions:
+            deliveries.setdefault(subscription, []).append(data)
+
+        if len(listeners) != 0:
+            self.dispatcher.dispatch(listeners, data)
+
+    def apply_roster(self, presence_store: PresenceStore, stanza: ET.Element) -> None:
+        """
+        Applies a roster stanza to the presence store, and lets the NameResolver know the names it contains
+        """
+
+        for puuid in presence_store.apply_roster(stanza):
+            state = presence_store.get(puuid)
+
+            if state is not None and state.game_name and state.game_tag:
+                self.session.names.remember(puuid, state.game_name, state.game_tag)
 
     def add_callback(self, callback: Callable[[ET.Element], Any], message_type: Optional[str] = None):
         """
@@ -280,7 +782,7 @@ class SocialManager:
         message_type (str, optional): The tag that the XML data from the XMPP server has to be in order for this callback to be called (see self.tag_to_class). If None, the callback will be called for every received message
         """
 
-        self.listeners.append(Listener(callback, message_type))
+        self.dispatcher.add_listener(callback, message_type)
 
     def remove_callback(self, callback: Callable[[ET.Element], Any]):
         """
@@ -290,9 +792,87 @@ class SocialManager:
         callback (Callable[[ET.Element], Any]): The callback to remove from self.listeners
         """
 
-        for listener in self.listeners:
-            if listener.callback is callback:
-                self.listeners.remove(listener)
+        self.dispatcher.remove_listener(callback)
+
+    def get_callback_stats(self) -> List[dict]:
+        """
+        Gets how long each callback takes and how many events are waiting for it
+
+        Returns:
+        List[dict]: The stats of each listener, see EventDispatcher.get_stats
+        """
+
+        return self.dispatcher.get_stats()
+
+    def subscribe(self, tag: Optional[str] = None, puuids: Optional[Iterable[str]] = None, maxsize: int = 1024) -> Subscription:
+        """
+        Subscribes to events on the running event loop. The events are the same as the ones passed to callbacks, and are buffered for each subscription, so a slow subscriber only drops its own oldest events
+
+        Example:
+        async with session.social.subscribe(tag="presence", puuids=[puuid]) as presences:
+            async for presence in presences:
+                ...
+
+        Parameters:
+        tag (str, optional, defaults to None): The tag to receive events for (see self.tag_to_class). If None, events for every tag are received
+        puuids (Iterable[str], optional, defaults to None): Only receive events sent by these users. If None, events from every user are received
+        maxsize (int, defaults to 1024): The maximum number of events that are buffered for the subscription
+
+        Returns:
+        Subscription: An async iterator over the events. Iteration stops after it is closed with Subscription.close or by leaving its async with block
+        """
+
+        subscription = Subscription(tag, puuids, maxsize, on_close=self.remove_subscription)
+
+        with self.subscriptions_lock:
+            if subscription.tag is None:
+                self.wildcard_subscriptions += (subscription,)
+            else:
+                self.subscriptions_by_tag[subscription.tag] = self.subscriptions_by_tag.get(subscription.tag, ()) + (subscription,)
+
+        return subscription
+
+    def remove_subscription(self, subscription: Subscription) -> None:
+        """
+        Stops sending events to a subscription. Called by Subscription.close
+        """
+
+        with self.subscriptions_lock:
+            if subscription.tag is None:
+                self.wildcard_subscriptions = tuple(other for other in self.wildcard_subscriptions if other is not subscription)
                 return
 
-        raise ValueError("Callback not in listeners")
+            remaining = tuple(other for other in self.subscriptions_by_tag.get(subscription.tag, ()) if other is not subscription)
+
+            if len(remaining) == 0:
+                self.subscriptions_by_tag.pop(subscription.tag, None)
+            else:
+                self.subscriptions_by_tag[subscription.tag] = remaining
+
+    def get_subscriptions(self, tag: str) -> Tuple[Subscription, ...]:
+        """
+        Gets the subscriptions that an event with the given tag is sent to
+
+        Parameters:
+        tag (str): The tag of the event, without its namespace
+
+        Returns:
+        Tuple[Subscription, ...]: The subscriptions for the tag, followed by the subscriptions to every tag
+        """
+
+        tag_subscriptions = self.subscriptions_by_tag.get(self.dispatcher.normalize_tag(tag))
+
+        if tag_subscriptions is None:
+            return self.wildcard_subscriptions
+
+        return tag_subscriptions + self.wildcard_subscriptions
+
+    def get_queue_stats(self) -> Optional[dict]:
+        """
+        Gets how many stanzas passed through the queue between the reader and the dispatcher, and how many were dropped or coalesced
+
+        Returns:
+        Optional[dict]: The stats of the current connection's queue, see EventQueueStats, or None if there has not been a connection
+        """
+
+        return self.event_queue.stats.to_dict() if self.event_queue is not None else None
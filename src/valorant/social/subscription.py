@@ -0,0 +1,167 @@
+from typing import Any, Callable, Deque, FrozenSet, Iterable, List, Optional
+from collections import deque
+import xml.etree.ElementTree as ET
+import threading
+import asyncio
+
+from .eventDispatcher import EventDispatcher
+
+
+class Subscription:
+    def __init__(self, tag: Optional[str] = None, puuids: Optional[Iterable[str]] = None, maxsize: int = 1024, loop: Optional[asyncio.AbstractEventLoop] = None, on_close: Optional[Callable[["Subscription"], Any]] = None):
+        """
+        An async iterator over social events. Events are buffered on the subscriber's event loop, so the XMPP reader never waits for a subscriber and the subscriber does not need any locking
+
+        Parameters:
+        tag (str, optional, defaults to None): The tag to receive events for (ex. "presence"). If None, events for every tag are received
+        puuids (Iterable[str], optional, defaults to None): Only receive events sent by these users. If None, events from every user are received
+        maxsize (int, defaults to 1024): The maximum number of events that are buffered. When the buffer is full, the oldest event is dropped
+        loop (asyncio.AbstractEventLoop, optional, defaults to None): The loop that iterates over the subscription. If None, the running loop is used
+        on_close (Callable[[Subscription], Any], optional, defaults to None): Called once when the subscription is closed
+        """
+
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be at least 1, got {maxsize}")
+
+        self.tag = EventDispatcher.normalize_tag(tag) if tag is not None else None
+        self.puuids: Optional[FrozenSet[str]] = frozenset(puuids) if puuids is not None else None
+        self.maxsize = maxsize
+
+        self.loop = loop if loop is not None else asyncio.get_running_loop()
+        self.on_close = on_close
+
+        # only used on self.loop
+        self.buffer: Deque[Any] = deque(maxlen=maxsize)
+        self.waiter: Optional[asyncio.Future] = None
+
+        self.is_closed = False
+        self.close_lock = threading.Lock()
+
+        self.received = 0
+        self.dropped = 0
+
+    def matches(self, stanza: ET.Element) -> bool:
+        """
+        Checks if the subscription wants a stanza, using only its attributes so that stanzas can be filtered before they are converted
+
+        Parameters:
+        stanza (ET.Element): The raw stanza
+
+        Returns:
+        bool: True if the stanza is from one of self.puuids, or if self.puuids is None
+        """
+
+        if self.puuids is None:
+            return True
+
+        sender = stanza.attrib.get("from")
+        return sender is not None and sender.split("@")[0] in self.puuids
+
+    def deliver(self, events: List[Any]) -> None:
+        """
+        Passes events to the subscription from any thread
+
+        Parameters:
+        events (List[Any]): The events in the order they were received
+        """
+
+        if self.is_closed:
+            return
+
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        if running_loop is self.loop:
+            self.add_events(events)
+            return
+
+        try:
+            self.loop.call_soon_threadsafe(self.add_events, events)
+
+        # the subscriber's loop was closed without unsubscribing
+        except RuntimeError:
+            self.close()
+
+    def add_events(self, events: List[Any]) -> None:
+        if self.is_closed:
+            return
+
+        overflow = len(self.buffer) + len(events) - self.maxsize
+        if overflow > 0:
+            self.dropped += overflow
+
+        self.received += len(events)
+        self.buffer.extend(events)
+
+        self.wake()
+
+    def wake(self) -> None:
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    def close(self) -> None:
+        """
+        Stops receiving events. Iterating over the subscription stops once the events that were already received have been returned. Can be called from any thread
+        """
+
+        with self.close_lock:
+            if self.is_closed:
+                return
+
+            self.is_closed = True
+
+        if self.on_close is not None:
+            self.on_close(self)
+
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        if running_loop is self.loop:
+            self.wake()
+            return
+
+        try:
+            self.loop.call_soon_threadsafe(self.wake)
+
+        # nothing can be waiting on a closed loop
+        except RuntimeError:
+            pass
+
+    def unsubscribe(self) -> None:
+        self.close()
+
+    def get_stats(self) -> dict:
+        return {
+            "tag": self.tag,
+            "received": self.received,
+            "dropped": self.dropped,
+            "buffered": len(self.buffer),
+            "is_closed": self.is_closed
+        }
+
+    def __aiter__(self) -> "Subscription":
+        return self
+
+    async def __anext__(self) -> Any:
+        while len(self.buffer) == 0:
+            if self.is_closed:
+                raise StopAsyncIteration
+
+            self.waiter = self.loop.create_future()
+
+            try:
+                await self.waiter
+            finally:
+                self.waiter = None
+
+        return self.buffer.popleft()
+
+    async def __aenter__(self) -> "Subscription":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        self.close()
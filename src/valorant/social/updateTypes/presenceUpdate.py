@@ -1,8 +1,9 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any, Optional
 
 import xml.etree.ElementTree as ET
 import json
 import base64
+import re
 from ...user.user import User
 from ...rank import Rank
 
@@ -11,51 +12,185 @@ if TYPE_CHECKING:
     from ...session import Session
 
 
+# marks a lazily computed attribute that has not been computed yet
+_UNSET = object()
+
+# lets the validity check look at the payload without parsing all of it
+IN_GAME_PATTERN = re.compile(rb'"sessionLoopState"\s*:\s*"INGAME"')
+NO_TEAM_PATTERN = re.compile(rb'"partyOwnerMatchCurrentTeam"\s*:\s*""')
+
+
 class PresenceUpdate:
+    __slots__ = ("session", "raw", "from_puuid", "to_puuid", "is_unavailable", "_presence_element", "_payload", "_presence_data", "_from_user", "_to_user")
+
     def __init__(self, session: "Session", XML_data: ET.Element):
         """
-        An object that represents a presence update
+        An object that represents a presence update. The presence payload and the User objects are only created when they are first accessed
 
         Parameters:
         session (Session): The Session object
         XML_data (ET.Element): The XML data from the XMPP server
         """
 
+        self.session = session
         self.raw = XML_data
 
-        self.from_user = User(session, XML_data.attrib['from'].split("@")[0])
-        self.to_user = User(session, XML_data.attrib['to'].split("@")[0])
-        self.is_self = self.from_user.puuid == self.to_user.puuid
+        self.from_puuid: str = XML_data.attrib['from'].split("@")[0]
+        self.to_puuid: str = XML_data.attrib['to'].split("@")[0]
+
+        self.is_unavailable: bool = XML_data.attrib.get("type") == "unavailable"
+
+        self._presence_element: Any = _UNSET
+        self._payload: Any = _UNSET
+        self._presence_data: Any = _UNSET
+        self._from_user: Optional[User] = None
+        self._to_user: Optional[User] = None
+
+    @staticmethod
+    def make_user(session: "Session", puuid: str) -> User:
+        """
+        Creates a User, filling in the name if the session's NameResolver already knows it
+
+        Parameters:
+        session (Session): The Session object
+        puuid (str): The puuid of the user
+
+        Returns:
+        User: The User object
+        """
+
+        name = session.names.get_cached(puuid)
+        if name is None:
+            return User(session, puuid)
+
+        return User(session, puuid, game_name=name[0], game_tag=name[1])
+
+    @property
+    def is_self(self) -> bool:
+        return self.from_puuid == self.to_puuid
+
+    @property
+    def presence_element(self) -> Optional[ET.Element]:
+        """
+        The <p> element that contains the base64 encoded presence payload, or None if the update does not have one
+        """
+
+        if self._presence_element is _UNSET:
+            self._presence_element = self.raw.find('.//p')
+
+        return self._presence_element
+
+    @property
+    def payload(self) -> Optional[bytes]:
+        """
+        The presence payload as JSON, or None if the user is unavailable or the update does not have one
+        """
+
+        if self._payload is _UNSET:
+            if self.is_unavailable or self.presence_element is None:
+                self._payload = None
+            else:
+                self._payload = base64.b64decode(self.presence_element.text)
+
+        return self._payload
+
+    @property
+    def presence_data(self) -> Optional[dict]:
+        """
+        The decoded presence payload, or None if the user is unavailable or the update does not have one
+        """
+
+        if self._presence_data is _UNSET:
+            payload = self.payload
+            self._presence_data = json.loads(payload.decode()) if payload is not None else None
+
+        return self._presence_data
+
+    @property
+    def invalid(self) -> bool:
+        if self.presence_element is None:
+            return True
+
+        if self.is_unavailable:
+            return False
+
+        # the client briefly reports being in game before it has joined a team
+        if self._presence_data is not _UNSET:
+            return self.current_state == "INGAME" and self.team == ""
+
+        payload = self.payload
+        return IN_GAME_PATTERN.search(payload) is not None and NO_TEAM_PATTERN.search(payload) is not None
 
-        self.presence_data = XML_data.find('.//p')
+    @property
+    def from_user(self) -> User:
+        if self._from_user is None:
+            user = self.make_user(self.session, self.from_puuid)
+
+            if self.presence_data is not None:
+                user.rank = Rank(self.presence_data["competitiveTier"], None)
+                user.account_level = self.presence_data["accountLevel"]
+
+            self._from_user = user
+
+        return self._from_user
+
+    @property
+    def to_user(self) -> User:
+        if self._to_user is None:
+            self._to_user = self.make_user(self.session, self.to_puuid)
+
+        return self._to_user
+
+    def get_field(self, key: str) -> Any:
+        """
+        Gets a value from the presence payload
+
+        Parameters:
+        key (str): The key in the payload
+
+        Returns:
+        Any: The value, or None if there is no payload
+        """
 
-        self.is_unavailable = "type" in XML_data.attrib and XML_data.attrib["type"] == "unavailable"
-        self.invalid = self.presence_data is None
+        data = self._presence_data if self._presence_data is not _UNSET else self.presence_data
+        return data[key] if data is not None else None
 
-        if self.is_unavailable or self.invalid:
-            return
+    @property
+    def is_idle(self) -> Optional[bool]:
+        return self.get_field("isIdle")
 
-        self.presence_data = json.loads(base64.b64decode(self.presence_data.text).decode())
+    @property
+    def queue_ID(self) -> Optional[str]:
+        return self.get_field("queueId")
 
-        self.from_user.rank = Rank(self.presence_data["competitiveTier"], None)
-        self.from_user.account_level = self.presence_data["accountLevel"]
+    @property
+    def current_state(self) -> Optional[str]:
+        return self.get_field("sessionLoopState")
 
-        self.is_idle = self.presence_data["isIdle"]
+    @property
+    def party_size(self) -> Optional[int]:
+        return self.get_field("partySize")
 
-        self.queue_ID = self.presence_data["queueId"]
-        self.current_state = self.presence_data["sessionLoopState"]
+    @property
+    def max_party_size(self) -> Optional[int]:
+        return self.get_field("maxPartySize")
 
-        self.party_size = self.presence_data["partySize"]
-        self.max_party_size = self.presence_data["maxPartySize"]
+    @property
+    def ally_team_score(self) -> Optional[int]:
+        return self.get_field("partyOwnerMatchScoreAllyTeam")
 
-        self.ally_team_score = self.presence_data["partyOwnerMatchScoreAllyTeam"]
-        self.enemy_team_score = self.presence_data["partyOwnerMatchScoreEnemyTeam"]
+    @property
+    def enemy_team_score(self) -> Optional[int]:
+        return self.get_field("partyOwnerMatchScoreEnemyTeam")
 
-        self.team = self.presence_data["partyOwnerMatchCurrentTeam"]
-        self.map = self.presence_data["matchMap"]
+    @property
+    def team(self) -> Optional[str]:
+        return self.get_field("partyOwnerMatchCurrentTeam")
 
-        self.party_ID = self.presence_data["partyId"]
+    @property
+    def map(self) -> Optional[str]:
+        return self.get_field("matchMap")
 
-        if self.current_state == "INGAME" and self.team == "":
-            self.invalid = True
-            return
+    @property
+    def party_ID(self) -> Optional[str]:
+        return self.get_field("partyId")
@@ -0,0 +1,48 @@
+from typing import TYPE_CHECKING
+
+import xml.etree.ElementTree as ET
+
+
+if TYPE_CHECKING:
+    from ...session import Session
+
+
+RESYNC_TAG = "resync"
+
+
+class ResyncEvent:
+    def __init__(self, session: "Session", XML_data: ET.Element):
+        """
+        Sent to the "resync" listeners after the XMPP connection was lost and has been reconnected. The roster and presences are requested again, so they follow this event
+
+        Parameters:
+        session (Session): The Session object
+        XML_data (ET.Element): The <resync> element created by SocialManager
+        """
+
+        self.session = session
+        self.raw = XML_data
+
+        self.reason: str = XML_data.attrib["reason"]
+        self.attempts: int = int(XML_data.attrib["attempts"])
+        self.downtime_seconds: float = float(XML_data.attrib["downtime_seconds"])
+
+    @staticmethod
+    def make_element(reason: str, attempts: int, downtime_seconds: float) -> ET.Element:
+        """
+        Creates the element that is queued with the received stanzas, so the event is dispatched in order with them
+
+        Parameters:
+        reason (str): Why the connection was lost
+        attempts (int): The number of connection attempts it took to reconnect
+        downtime_seconds (float): The time between the connection being lost and being reconnected
+
+        Returns:
+        ET.Element: The element
+        """
+
+        return ET.Element(RESYNC_TAG, {"reason": reason, "attempts": str(attempts), "downtime_seconds": repr(downtime_seconds)})
+
+    @property
+    def invalid(self) -> bool:
+        return False
@@ -1,85 +1,148 @@
-from typing import Generator, Callable, Any, AsyncGenerator
+from typing import Generator, Callable, Any, AsyncGenerator, List, Optional
+import xml.etree.ElementTree as ET
+import asyncio
 import re
 
 
+STREAM_TAG = "stream:stream"
+STREAM_NAMESPACE = "http://etherx.jabber.org/streams"
+
+# the opening tag of the stream, which is never closed until the connection ends
+STREAM_HEADER_PATTERN = re.compile(r"""<stream:stream(?:\s+[^\s=/>]+\s*=\s*(?:"[^"]*"|'[^']*'))*\s*>""")
+
+# fed to the pull parser instead of the server's stream header. it only declares the stream: prefix, so stanzas are not put in the stream's default namespace (jabber:client)
+STREAM_ROOT = f'<{STREAM_TAG} xmlns:stream="{STREAM_NAMESPACE}">'
+
+
 class XMLParser:
     def __init__(self):
-        self.buffer = ""
+        """
+        Incrementally parses the XMPP stream with an ElementTree pull parser, which reads every character once. Each stanza is returned as soon as its closing tag has been parsed
+        """
+
+        self.pull_parser: Optional[ET.XMLPullParser] = None
+
+        # the start of a stream, kept until the stream header has been received
+        self.header_buffer = ""
 
-    def custom_checks(self, xml_data: str) -> bool:
+        # the stream element, which every stanza is a child of
+        self.root: Optional[ET.Element] = None
+        self.depth = 0
+
+    def reset(self) -> None:
+        """
+        Clears the parser's state. Must be called when a new connection is made or the stream is restarted (ex. after authenticating), since the server starts a new XML document
         """
-        Does custom checks in the case that we need to force xml data to act as parsed
+
+        self.pull_parser = None
+        self.header_buffer = ""
+
+        self.root = None
+        self.depth = 0
+
+    def start_stream(self, xml_data: str) -> Optional[str]:
+        """
+        Skips the XML declaration and the stream header at the start of a stream, and starts the pull parser
 
         Parameters:
-        xml_data (str): The XML data to do the checks on
+        xml_data (str): Data received before the pull parser was started
 
         Returns:
-        bool: Did the custom checks pass?
+        Optional[str]: The data after the stream header, or None if the header has not been completely received
         """
 
-        return xml_data.startswith("<?xml") or xml_data.startswith("<stream:features>") or xml_data.startswith("<message")
+        buffer = (self.header_buffer + xml_data).lstrip()
+
+        while buffer.startswith("<?"):
+            end = buffer.find("?>")
 
-    def parse_xml(self, xml_data: str) -> list:
+            if end == -1:
+                self.header_buffer = buffer
+                return None
+
+            buffer = buffer[end + 2:].lstrip()
+
+        # wait until it is clear whether the stream starts with a header
+        if len(buffer) < len(STREAM_TAG) + 1 and ("<" + STREAM_TAG).startswith(buffer):
+            self.header_buffer = buffer
+            return None
+
+        if buffer.startswith("<" + STREAM_TAG):
+            match = STREAM_HEADER_PATTERN.match(buffer)
+
+            if match is None:
+                self.header_buffer = buffer
+                return None
+
+            buffer = buffer[match.end():]
+
+        self.header_buffer = ""
+
+        self.pull_parser = ET.XMLPullParser(events=("start", "end"))
+        self.pull_parser.feed(STREAM_ROOT)
+
+        return buffer
+
+    def parse_xml(self, xml_data: str) -> List[ET.Element]:
         """
-        Parses the XML data from a stream. Returns a list of the parsed XML data once it has been completely been received
+        Parses the XML data from a stream. Returns a list of the stanzas that have been completely received. Raises ET.ParseError if the stream is not well-formed, since the rest of the stream can not be parsed either
 
         Parameters:
         xml_data (str): The XML data to parse
 
         Returns:
-        list: A list of parsed XMl data
+        List[ET.Element]: A list of the parsed stanzas
         """
 
-        # add the buffer to the new data, then clear the buffer
-        xml_data = self.buffer + xml_data
-        self.buffer = ""
+        if self.pull_parser is None:
+            xml_data = self.start_stream(xml_data)
 
-        # if the xml data passes our custom checks function, instantly return it
-        if self.custom_checks(xml_data):
-            return [xml_data]
+            if xml_data is None:
+                return []
 
-        # find the starting tag
-        start_tag = re.findall(r'<(\w+)', xml_data)
+        self.pull_parser.feed(xml_data)
 
-        # if we couldn't find the starting tag, we add the data to the buffer and cancel
-        if len(start_tag) == 0:
-            self.buffer = xml_data
-            return []
+        stanzas: List[ET.Element] = []
 
-        # get the starting tag and the length of the starting tag
-        start_tag = start_tag[0]
-        # start_tag_length = xml_data.index(">")
-        start_tag_length = len(start_tag)
+        for event, element in self.pull_parser.read_events():
+            if event == "start":
+                self.depth += 1
 
-        # find the stopping tag, if it exists
-        stop_tag = xml_data.find(f"</{start_tag}")
+                if self.depth == 1:
+                    self.root = element
+
+                continue
 
-        # if we couldn't find the stopping tag, we add the data to the buffer and cancel
-        if stop_tag == -1:
-            self.buffer = xml_data
-            return []
+            self.depth -= 1
+
+            # a stanza is a direct child of the stream
+            if self.depth == 1:
+                stanzas.append(element)
+
+            # the server closed the stream, so the next data starts a new one
+            elif self.depth == 0:
+                self.reset()
+                break
 
-        # do a check to see if there is more data on the end of this xml file
-        if len(xml_data) <= stop_tag + start_tag_length + 3:
-            # if not, then we return the xml data
-            return [xml_data]
+        # completed stanzas are detached so the stream element does not keep every stanza alive. text between stanzas (ex. whitespace pings) is dropped too
+        if self.root is not None and len(stanzas) != 0:
+            for stanza in stanzas:
+                self.root.remove(stanza)
 
-        # get the xml file that is recognized by the start_tag and stop_tag checks
-        newest_xml = xml_data[:stop_tag + start_tag_length + 3]
+            self.root.text = None
 
-        # recursively search the rest of this data to see if there are any other xml files
-        search_output = self.parse_xml(xml_data[len(newest_xml):])
+        for stanza in stanzas:
+            stanza.tail = None
 
-        # put the first xml data in front of the other xml data
-        return [newest_xml] + search_output
+        return stanzas
 
-    async def parse_stream(self, generator: AsyncGenerator[str, None], callback: Callable[[str], Any]) -> None:
+    async def parse_stream(self, generator: AsyncGenerator[str, None], callback: Callable[[List[ET.Element]], Any]) -> None:
         """
-        Parses the XML data from the AsyncGenerator object and calls the callback when an XML object is found
+        Parses the XML data from the AsyncGenerator object and calls the callback when XML stanzas are found
 
         Parameters:
         generator (AsyncGenerator[str, None]): The AsyncGenerator object. Expected to yield string output.
-        callback (Callable[[str], Any]): The callback object. Is called with the parser output as a string.
+        callback (Callable[[List[ET.Element]], Any]): The callback object. Is called with a list of the parsed stanzas, and awaited if it returns a coroutine.
         """
 
         async for data in generator:
@@ -94,5 +157,7 @@ class XMLParser:
             if len(parser_output) == 0:
                 continue
 
-            # call the callback with the parser output
-            callback(parser_output)
+            # call the callback with the parser output, waiting for it if it is a coroutine function
+            result = callback(parser_output)
+            if asyncio.iscoroutine(result):
+                await result
@@ -54,7 +54,7 @@ class StoreManager:
         if self.session.shard is None:
             self.session.get_region()
 
-        return self.session.fetch(f"{self.session.pd_url}/store/v1/offers/")
+        return self.session.fetch(f"{self.session.pd_url}/store/v1/offers/", persist=True)
 
     def get_wallet_raw(self) -> dict:
         """
@@ -0,0 +1,168 @@
+from typing import TYPE_CHECKING, Dict, Optional
+from time import time
+import json
+import threading
+
+from . import utilities
+
+if TYPE_CHECKING:
+    from .authorization import AuthorizationManager
+
+
+def decode_jwt(token: str) -> dict:
+    """
+    Decodes a JWT without verifying it
+
+    Parameters:
+    token (str): The JWT
+
+    Returns:
+    dict: The header, payload and signature of the JWT
+    """
+
+    JWT_TOKEN = token.split(".")
+
+    HEADER = json.loads(utilities.base64_url_decode(JWT_TOKEN[0]).decode("utf-8"))
+    PAYLOAD = json.loads(utilities.base64_url_decode(JWT_TOKEN[1]).decode("utf-8"))
+    SIGNATURE = JWT_TOKEN[2]
+
+    return {"header": HEADER, "payload": PAYLOAD, "signature": SIGNATURE}
+
+
+class TokenManager:
+    def __init__(self, auth: "AuthorizationManager", refresh_margin_seconds: float = 120, retry_interval_seconds: float = 10):
+        """
+        Keeps track of when the access, entitlement and PAS tokens expire, and refreshes them in the background shortly before they do
+
+        Parameters:
+        auth (AuthorizationManager): The AuthorizationManager object
+        refresh_margin_seconds (float, defaults to 120): How long before a token expires that it is refreshed
+        retry_interval_seconds (float, defaults to 10): How long to wait before trying again when a refresh fails
+        """
+
+        self.auth = auth
+
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.retry_interval_seconds = retry_interval_seconds
+
+        # unix timestamps that each token ("access", "entitlement" and "pas") expires at
+        self.expires_at: Dict[str, float] = {}
+
+        self.refreshes = 0
+        self.failed_refreshes = 0
+
+        self.thread: Optional[threading.Thread] = None
+        self.stop_flag = threading.Event()
+        self.wakeup = threading.Event()
+        self.lock = threading.Lock()
+
+    def track(self, name: str, token: str) -> Optional[float]:
+        """
+        Reads the expiry of a token
+
+        Parameters:
+        name (str): The name of the token ("access", "entitlement" or "pas")
+        token (str): The JWT
+
+        Returns:
+        Optional[float]: The unix timestamp that the token expires at, or None if the token has no readable expiry
+        """
+
+        try:
+            expires_at = float(decode_jwt(token)["payload"]["exp"])
+        except (ValueError, KeyError, IndexError, TypeError):
+            with self.lock:
+                self.expires_at.pop(name, None)
+
+            return None
+
+        with self.lock:
+            self.expires_at[name] = expires_at
+
+        # the next refresh may now be sooner than the refresh thread is waiting for
+        self.wakeup.set()
+
+        return expires_at
+
+    def is_expiring(self, *names: str, margin_seconds: Optional[float] = None) -> bool:
+        """
+        Checks if any of the tokens expire within the refresh margin
+
+        Parameters:
+        *names (str): The names of the tokens to check
+        margin_seconds (float, optional, defaults to None): Overrides self.refresh_margin_seconds. Use 0 to check if the tokens have already expired
+
+        Returns:
+        bool: True if any of the tokens needs to be refreshed
+        """
+
+        refresh_before = time() + (margin_seconds if margin_seconds is not None else self.refresh_margin_seconds)
+
+        with self.lock:
+            return any(name in self.expires_at and self.expires_at[name] <= refresh_before for name in names)
+
+    def start(self) -> None:
+        """
+        Starts refreshing tokens in the background
+        """
+
+        if self.thread is not None:
+            return
+
+        self.stop_flag.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops refreshing tokens in the background
+        """
+
+        if self.thread is None:
+            return
+
+        self.stop_flag.set()
+        self.wakeup.set()
+        self.thread.join()
+        self.thread = None
+
+    def get_seconds_until_refresh(self) -> Optional[float]:
+        with self.lock:
+            if len(self.expires_at) == 0:
+                return None
+
+            return max(min(self.expires_at.values()) - self.refresh_margin_seconds - time(), 0)
+
+    def run(self) -> None:
+        while not self.stop_flag.is_set():
+            self.wakeup.clear()
+            self.wakeup.wait(self.get_seconds_until_refresh())
+
+            if self.stop_flag.is_set():
+                return
+
+            try:
+                self.refresh_expiring()
+            except Exception:
+                self.failed_refreshes += 1
+
+                # avoid retrying in a tight loop while the client is unreachable
+                self.stop_flag.wait(self.retry_interval_seconds)
+                continue
+
+            # the client may hand back the same token until it has refreshed it itself
+            if self.get_seconds_until_refresh() == 0:
+                self.stop_flag.wait(self.retry_interval_seconds)
+
+    def refresh_expiring(self) -> None:
+        """
+        Refreshes the tokens that expire within the refresh margin
+        """
+
+        if self.is_expiring("access", "entitlement"):
+            self.auth.renew_auth_headers(self.auth.auth_headers)
+            self.refreshes += 1
+
+        if self.is_expiring("pas") and self.auth.pas_token is not None:
+            self.auth.get_pas_token(force_renew=True)
+            self.refreshes += 1
@@ -0,0 +1,278 @@
+from typing import TYPE_CHECKING, Callable, Dict, Optional
+from urllib.parse import urlsplit
+import functools
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.poolmanager import PoolManager
+
+from . import utilities
+
+if TYPE_CHECKING:
+    from .session import Session
+
+
+HOST_FAMILIES = ("local", "pd", "glz", "shared", "auth", "clientconfig", "other")
+
+
+class PoolStats:
+    def __init__(self, family: str):
+        """
+        Keeps track of how many requests a connection pool has sent and how many connections it had to open
+
+        Parameters:
+        family (str): The host family that these stats belong to
+        """
+
+        self.family = family
+        self.requests_sent = 0
+        self.connections_opened = 0
+
+    @property
+    def connections_reused(self) -> int:
+        return max(self.requests_sent - self.connections_opened, 0)
+
+    def to_dict(self) -> dict:
+        return {
+            "requests_sent": self.requests_sent,
+            "connections_opened": self.connections_opened,
+            "connections_reused": self.connections_reused
+        }
+
+
+class CountingPoolManager(PoolManager):
+    def __init__(self, *args, on_new_connection: Callable[[], None], **kwargs):
+        """
+        A urllib3 PoolManager that reports every connection its pools open, including connections that are reopened after the server closed them
+
+        Parameters:
+        on_new_connection (Callable[[], None]): Called whenever a connection is opened
+        """
+
+        super().__init__(*args, **kwargs)
+        self.on_new_connection = on_new_connection
+        self.connection_classes: Dict[type, type] = {}
+
+    def get_connection_class(self, connection_class: type) -> type:
+        """
+        Gets a subclass of a urllib3 connection class that calls self.on_new_connection whenever it connects
+
+        Parameters:
+        connection_class (type): The connection class of a pool
+
+        Returns:
+        type: The counting connection class
+        """
+
+        counting_class = self.connection_classes.get(connection_class)
+
+        if counting_class is None:
+            on_new_connection = self.on_new_connection
+
+            class CountingConnection(connection_class):
+                def connect(self):
+                    super().connect()
+                    on_new_connection()
+
+            counting_class = self.connection_classes[connection_class] = CountingConnection
+
+        return counting_class
+
+    def _new_pool(self, scheme, host, port, request_context=None):
+        pool = super()._new_pool(scheme, host, port, request_context)
+        pool.ConnectionCls = self.get_connection_class(pool.ConnectionCls)
+
+        return pool
+
+
+class CountingHTTPAdapter(HTTPAdapter):
+    def __init__(self, on_new_connection: Callable[[], None], **kwargs):
+        """
+        An HTTPAdapter whose pools report every connection they open, including those of pools that were later closed or evicted
+
+        Parameters:
+        on_new_connection (Callable[[], None]): Called whenever a connection is opened
+        **kwargs: additional keyword arguments passed to HTTPAdapter (ex. pool_connections, pool_maxsize)
+        """
+
+        # HTTPAdapter creates its PoolManager while it is initialized
+        self.on_new_connection = on_new_connection
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+
+        self.poolmanager = CountingPoolManager(num_pools=connections, maxsize=maxsize, block=block, on_new_connection=self.on_new_connection, **pool_kwargs)
+
+
+class TransportManager:
+    def __init__(self, session: Optional["Session"] = None, pool_connections: int = 4, pool_maxsize: int = 16, pool_sizes: Optional[Dict[str, int]] = None, keep_alive: bool = True):
+        """
+        Sends HTTP requests using a separate keep-alive connection pool for every host family (local, pd, glz, shared, auth, clientconfig)
+
+        Parameters:
+        session (Session, optional, defaults to None): The Session object
+        pool_connections (int, defaults to 4): The number of different hosts a family's pool keeps connections for
+        pool_maxsize (int, defaults to 16): The maximum number of connections kept alive per host
+        pool_sizes (Dict[str, int], optional, defaults to None): Overrides pool_maxsize for specific host families (ex. {"pd": 32})
+        keep_alive (bool, defaults to True): If False, connections are closed after every request
+        """
+
+        self.session = session
+
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_sizes = pool_sizes if pool_sizes is not None else {}
+        self.keep_alive = keep_alive
+
+        self.http_sessions: Dict[str, requests.Session] = {}
+        self.stats: Dict[str, PoolStats] = {family: PoolStats(family) for family in HOST_FAMILIES}
+
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def get_host_family(url: str) -> str:
+        """
+        Finds the host family of a url
+
+        Parameters:
+        url (str): The url to categorize
+
+        Returns:
+        str: The host family (one of HOST_FAMILIES)
+        """
+
+        host = (urlsplit(url).hostname or "").lower()
+
+        if host in ("127.0.0.1", "localhost"):
+            service = utilities.get_stand_in_service(url)
+
+            if service is None:
+                return "local"
+
+            return "auth" if service == "pas" else service
+
+        if host.startswith("pd."):
+            return "pd"
+
+        if host.startswith("glz-"):
+            return "glz"
+
+        if host.startswith("shared."):
+            return "shared"
+
+        if host.startswith("clientconfig."):
+            return "clientconfig"
+
+        if host.startswith("auth.") or host.endswith(".pas.si.riotgames.com"):
+            return "auth"
+
+        return "other"
+
+    def get_http_session(self, family: str) -> requests.Session:
+        """
+        Gets (or creates) the pooled requests.Session used for a host family
+
+        Parameters:
+        family (str): The host family
+
+        Returns:
+        requests.Session: The session which owns the family's connection pool
+        """
+
+        http_session = self.http_sessions.get(family)
+        if http_session is not None:
+            return http_session
+
+        with self.lock:
+            # another thread may have created the session while we were waiting
+            if family in self.http_sessions:
+                return self.http_sessions[family]
+
+            http_session = requests.Session()
+            adapter = CountingHTTPAdapter(functools.partial(self.count_connection, family), pool_connections=self.pool_connections, pool_maxsize=self.pool_sizes.get(family, self.pool_maxsize))
+
+            http_session.mount("https://", adapter)
+            http_session.mount("http://", adapter)
+
+            if not self.keep_alive:
+                http_session.headers["Connection"] = "close"
+
+            self.http_sessions[family] = http_session
+            return http_session
+
+    def request(self, method: str, url: str, *args, **kwargs) -> requests.Response:
+        """
+        Sends a request using the connection pool of the url's host family. Takes the same arguments as requests.request
+
+        Parameters:
+        method (str): The method the request will be sent with
+        url (str): The url to send the request to
+
+        Returns:
+        requests.Response: The response
+        """
+
+        family = self.get_host_family(url)
+        http_session = self.get_http_session(family)
+
+        response = http_session.request(method, url, *args, **kwargs)
+
+        stats = self.stats[family]
+        with self.lock:
+            stats.requests_sent += 1
+
+        return response
+
+    def get(self, url: str, *args, **kwargs) -> requests.Response:
+        return self.request("GET", url, *args, **kwargs)
+
+    def count_connection(self, family: str) -> None:
+        """
+        Counts a connection opened by a host family's pool. The count is kept when the pool is reset
+
+        Parameters:
+        family (str): The host family of the pool
+        """
+
+        with self.lock:
+            self.stats[family].connections_opened += 1
+
+    def get_stats(self) -> Dict[str, dict]:
+        """
+        Gets the connection reuse stats for every host family
+
+        Returns:
+        Dict[str, dict]: The stats of each host family, keyed by the family name
+        """
+
+        with self.lock:
+            return {family: stats.to_dict() for family, stats in self.stats.items()}
+
+    def reset_pool(self, family: str) -> None:
+        """
+        Closes every connection in a host family's pool. The pool is recreated on the next request
+
+        Parameters:
+        family (str): The host family to reset
+        """
+
+        with self.lock:
+            http_session = self.http_sessions.pop(family, None)
+
+        if http_session is not None:
+            http_session.close()
+
+    def close(self) -> None:
+        """
+        Closes every connection pool
+        """
+
+        with self.lock:
+            http_sessions = list(self.http_sessions.values())
+            self.http_sessions.clear()
+
+        for http_session in http_sessions:
+            http_session.close()
@@ -33,7 +33,7 @@ class LocalAccount(User):
             self.fetch_local_account_information()
 
     def fetch_local_account_information_raw(self) -> dict:
-        return self.session.fetch("https://auth.riotgames.com/userinfo")
+        return self.session.fetch(f"{self.session.auth_url}/userinfo")
 
     def fetch_local_account_information(self) -> None:
         """
@@ -62,7 +62,12 @@ class LocalAccount(User):
 
         friends = Friends(self.session, [])
         for friend in data["friends"]:
-            friends.users.append(Friend.from_json(self.session, friend))
+            f = Friend.from_json(self.session, friend)
+            friends.users.append(f)
+
+            # the friends list already includes names, so name-service does not have to be asked for them later
+            if f.game_name and f.game_tag:
+                self.session.names.remember(f.puuid, f.game_name, f.game_tag)
 
         return friends
 
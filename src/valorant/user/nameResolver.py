@@ -0,0 +1,194 @@
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+from collections import OrderedDict
+import threading
+import time
+
+if TYPE_CHECKING:
+    from ..session import Session
+
+
+class NameBatch:
+    def __init__(self):
+        """
+        A group of puuids whose names are looked up together
+        """
+
+        self.puuids: List[str] = []
+        self.event = threading.Event()
+        self.exception: Optional[BaseException] = None
+
+
+class NameResolver:
+    def __init__(self, session: "Session", batch_window_seconds: float = 0.01, max_batch_size: int = 100, max_entries: int = 50000):
+        """
+        Resolves puuids to names for the whole session. Lookups made within batch_window_seconds of each other are sent together, and resolved names are remembered
+
+        Parameters:
+        session (Session): The Session object
+        batch_window_seconds (float, defaults to 0.01): The amount of time to collect lookups for before sending them
+        max_batch_size (int, defaults to 100): The maximum number of puuids sent in one name-service request
+        max_entries (int, defaults to 50000): The maximum number of names remembered. The least recently used names are forgotten first
+        """
+
+        self.session = session
+
+        self.batch_window_seconds = batch_window_seconds
+        self.max_batch_size = max_batch_size
+        self.max_entries = max_entries
+
+        self.names: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+
+        # the batch collecting lookups, and the batches that are being sent keyed by puuid
+        self.open_batch: Optional[NameBatch] = None
+        self.in_flight: Dict[str, NameBatch] = {}
+
+        self.requests_sent = 0
+        self.lock = threading.Lock()
+
+    def get_cached(self, puuid: str) -> Optional[Tuple[str, str]]:
+        """
+        Gets a name without sending a request
+
+        Parameters:
+        puuid (str): The puuid of the user
+
+        Returns:
+        Optional[Tuple[str, str]]: The game name and tag line, or None if the name is not known
+        """
+
+        with self.lock:
+            name = self.names.get(puuid)
+            if name is not None:
+                self.names.move_to_end(puuid)
+
+            return name
+
+    def remember(self, puuid: str, game_name: str, game_tag: str) -> None:
+        """
+        Stores a name that was found elsewhere (ex. the friends list)
+
+        Parameters:
+        puuid (str): The puuid of the user
+        game_name (str): The game name of the user
+        game_tag (str): The tag line of the user
+        """
+
+        with self.lock:
+            self._remember(puuid, game_name, game_tag)
+
+    def _remember(self, puuid: str, game_name: str, game_tag: str) -> None:
+        self.names[puuid] = (game_name, game_tag)
+        self.names.move_to_end(puuid)
+
+        while len(self.names) > self.max_entries:
+            self.names.popitem(last=False)
+
+    def forget(self, puuid: str) -> None:
+        """
+        Forgets a name so that it is looked up again
+
+        Parameters:
+        puuid (str): The puuid of the user
+        """
+
+        with self.lock:
+            self.names.pop(puuid, None)
+
+    def resolve_one(self, puuid: str) -> Optional[Tuple[str, str]]:
+        """
+        Resolves a single puuid. Concurrent lookups are batched together
+
+        Parameters:
+        puuid (str): The puuid of the user
+
+        Returns:
+        Optional[Tuple[str, str]]: The game name and tag line, or None if name-service did not return the user
+        """
+
+        return self.resolve([puuid]).get(puuid)
+
+    def resolve(self, puuids: Iterable[str]) -> Dict[str, Tuple[str, str]]:
+        """
+        Resolves puuids to names. Known names are answered without a request, and the rest are sent in as few requests as possible
+
+        Parameters:
+        puuids (Iterable[str]): The puuids to resolve
+
+        Returns:
+        Dict[str, Tuple[str, str]]: The game name and tag line of each puuid, keyed by puuid. Puuids that name-service did not return are left out
+        """
+
+        puuids = list(dict.fromkeys(puuids))
+        waiting_on: List[NameBatch] = []
+        flush_batch: Optional[NameBatch] = None
+
+        with self.lock:
+            for puuid in puuids:
+                if puuid in self.names:
+                    continue
+
+                # another caller is already looking this puuid up
+                if puuid in self.in_flight:
+                    waiting_on.append(self.in_flight[puuid])
+                    continue
+
+                # the first caller to open a batch is responsible for sending it
+                if self.open_batch is None:
+                    self.open_batch = NameBatch()
+                    flush_batch = self.open_batch
+
+                if self.open_batch not in waiting_on:
+                    waiting_on.append(self.open_batch)
+
+                self.open_batch.puuids.append(puuid)
+                self.in_flight[puuid] = self.open_batch
+
+        if flush_batch is not None:
+            self.flush(flush_batch)
+
+        for batch in waiting_on:
+            batch.event.wait()
+
+            if batch.exception is not None:
+                raise batch.exception
+
+        with self.lock:
+            return {puuid: self.names[puuid] for puuid in puuids if puuid in self.names}
+
+    def flush(self, batch: NameBatch) -> None:
+        """
+        Waits for the batch window to pass, then sends the batch in chunks of self.max_batch_size
+
+        Parameters:
+        batch (NameBatch): The batch to send
+        """
+
+        if self.batch_window_seconds > 0:
+            time.sleep(self.batch_window_seconds)
+
+        # stop adding to the batch
+        with self.lock:
+            if self.open_batch is batch:
+                self.open_batch = None
+
+        try:
+            for i in range(0, len(batch.puuids), self.max_batch_size):
+                chunk = batch.puuids[i:i + self.max_batch_size]
+                content = self.session.fetch(f"{self.session.pd_url}/name-service/v2/players", method="PUT", use_cache=False, json=chunk)
+
+                with self.lock:
+                    self.requests_sent += 1
+
+                    for data in content:
+                        self._remember(data["Subject"], data["GameName"], data["TagLine"])
+
+        except BaseException as e:
+            batch.exception = e
+
+        finally:
+            with self.lock:
+                for puuid in batch.puuids:
+                    if self.in_flight.get(puuid) is batch:
+                        del self.in_flight[puuid]
+
+            batch.event.set()
@@ -1,6 +1,7 @@
-from typing import List, TYPE_CHECKING, Union, Generator, Optional
+from typing import List, TYPE_CHECKING, Union, Generator, Optional, Tuple, Callable
 import requests
 
+from .. import utilities
 from ..rank import Rank
 from ..competitiveUpdate import CompetitiveUpdate
 
@@ -64,10 +65,11 @@ class User:
         if not (self.game_name is None or self.game_tag is None):
             return self.game_name + "#" + self.game_tag
 
-        content = self.session.fetch(f"{self.session.pd_url}/name-service/v2/players", method="PUT", json=[self.puuid])[0]
+        name = self.session.names.resolve_one(self.puuid)
+        if name is None:
+            raise RuntimeError(f"Unable to find the name of the user with the puuid {self.puuid}.")
 
-        self.game_name = content["GameName"]
-        self.game_tag = content["TagLine"]
+        self.game_name, self.game_tag = name
 
         return self.game_name + "#" + self.game_tag
 
@@ -174,6 +176,55 @@ class User:
 
         return competitive_updates
 
+    def iter_competitive_updates(self, page_size: int = 20, limit: Optional[int] = None, since: Optional[int] = None, season_ID: Optional[str] = None, stop_when: Optional[Callable[[CompetitiveUpdate], bool]] = None, use_cache: bool = False, prefetch: bool = True) -> Generator[CompetitiveUpdate, None, None]:
+        """
+        Lazily iterates over the user's competitive updates, newest first, one page at a time
+
+        Parameters:
+        page_size (int, defaults to 20): The number of competitive updates requested per page
+        limit (int, optional): The maximum number of competitive updates to yield
+        since (int, optional): Stops at the first competitive update that started before this unix timestamp, in milliseconds
+        season_ID (str, optional): Only yields competitive updates from this season, and stops once the season has been passed
+        stop_when (Callable[[CompetitiveUpdate], bool], optional): Stops at the first competitive update that this returns True for. That update is not yielded
+        use_cache (bool, defaults to False): Should the requests use the cache if available?
+        prefetch (bool, defaults to True): If True, the next page is fetched while the current page is being consumed
+
+        Returns:
+        Generator[CompetitiveUpdate, None, None]: Yields each competitive update
+        """
+
+        def fetch_page(start: int, end: int) -> List[CompetitiveUpdate]:
+            return self.get_competitive_updates(start=start, end=end, use_cache=use_cache)
+
+        count = 0
+        seen_season = False
+
+        if limit is not None and limit <= 0:
+            return
+
+        for update in utilities.iter_paginated(fetch_page, page_size=page_size, prefetch=prefetch):
+            if since is not None and update.game_start_time < since:
+                return
+
+            if stop_when is not None and stop_when(update):
+                return
+
+            # updates are newest first, so skip newer seasons and stop after the requested season
+            if season_ID is not None and update.season_ID != season_ID:
+                if seen_season:
+                    return
+
+                continue
+
+            seen_season = True
+            count += 1
+
+            yield update
+
+            # stop here so that the next page is not waited on
+            if limit is not None and count >= limit:
+                return
+
     def get_match_history_raw(self, start: int = 0, end: int = 20, queue_ID: Optional[str] = None, use_cache: bool = False) -> dict:
         """
         Fetches the raw match history for the user given start and end indices and the queue type
@@ -214,3 +265,60 @@ class User:
             matches.append(PreviousMatch(self.session, m["MatchID"], m["QueueID"], game_start_time=m["GameStartTime"]))
 
         return matches
+
+    def iter_match_history(self, page_size: int = 20, queue_ID: Optional[str] = None, limit: Optional[int] = None, since: Optional[int] = None, stop_when: Optional[Callable[["PreviousMatch"], bool]] = None, use_cache: bool = False, prefetch: bool = True) -> Generator["PreviousMatch", None, None]:
+        """
+        Lazily iterates over the user's match history, newest first, one page at a time
+
+        Parameters:
+        page_size (int, defaults to 20): The number of matches requested per page
+        queue_ID (str, optional): The queue ID to get the history for (ex. "competitive")
+        limit (int, optional): The maximum number of matches to yield
+        since (int, optional): Stops at the first match that started before this unix timestamp, in milliseconds
+        stop_when (Callable[[PreviousMatch], bool], optional): Stops at the first match that this returns True for. That match is not yielded
+        use_cache (bool, defaults to False): Should the requests use the cache if available?
+        prefetch (bool, defaults to True): If True, the next page is fetched while the current page is being consumed
+
+        Returns:
+        Generator[PreviousMatch, None, None]: Yields each previous match
+        """
+
+        def fetch_page(start: int, end: int) -> List["PreviousMatch"]:
+            return self.get_match_history(start=start, end=end, queue_ID=queue_ID, use_cache=use_cache)
+
+        count = 0
+
+        if limit is not None and limit <= 0:
+            return
+
+        for match in utilities.iter_paginated(fetch_page, page_size=page_size, prefetch=prefetch):
+            if since is not None and match.game_start_time < since:
+                return
+
+            if stop_when is not None and stop_when(match):
+                return
+
+            count += 1
+
+            yield match
+
+            # stop here so that the next page is not waited on
+            if limit is not None and count >= limit:
+                return
+
+    def iter_match_details(self, start: int = 0, end: int = 20, queue_ID: Optional[str] = None, max_workers: int = 8) -> Generator[Tuple["PreviousMatch", dict], None, None]:
+        """
+        Fetches the match details of every match in the user's match history concurrently
+
+        Parameters:
+        start (int, defaults to 0): The starting index of the match history
+        end (int, defaults to 20): The ending index of the match history
+        queue_ID (str, optional): The queue ID to get the history for (ex. "competitive")
+        max_workers (int, defaults to 8): The maximum number of requests that are sent at once
+
+        Returns:
+        Generator[Tuple[PreviousMatch, dict], None, None]: Yields each match and its raw match details as soon as they are fetched
+        """
+
+        from ..match.matchDetailsFetcher import MatchDetailsFetcher
+        return MatchDetailsFetcher(self.session, max_workers=max_workers).iter_match_details([self], start=start, end=end, queue_ID=queue_ID)
@@ -1,10 +1,11 @@
-from typing import List, TYPE_CHECKING, Optional
+from typing import List, TYPE_CHECKING, Optional, Generator, Tuple
 import requests
 
 from .user import User
 
 if TYPE_CHECKING:
     from ..session import Session
+    from ..match.previousMatch import PreviousMatch
 
 
 class IncognitoFilter:
@@ -55,15 +56,34 @@ class Users:
         List[str]: A list of strings representing the username and tagline of each player. Does not include incognito players
         """
 
-
         filtered = self.filter_for_incognito()
-        content = self.session.fetch(f"{self.session.pd_url}/name-service/v2/players", method="PUT", json=[u.puuid for u in filtered.visible_users])
 
-        for user, data in zip(filtered.visible_users, content):
-            user.game_name = data["GameName"]
-            user.game_tag = data["TagLine"]
+        # only look up the users whose names we do not already have
+        unnamed_users = [u for u in filtered.visible_users if u.game_name is None or u.game_tag is None]
+        names = self.session.names.resolve(u.puuid for u in unnamed_users)
+
+        for user in unnamed_users:
+            if user.puuid in names:
+                user.game_name, user.game_tag = names[user.puuid]
+
+        return [u.game_name + "#" + u.game_tag for u in filtered.visible_users if not (u.game_name is None or u.game_tag is None)]
+
+    def iter_match_details(self, start: int = 0, end: int = 20, queue_ID: Optional[str] = None, max_workers: int = 8) -> Generator[Tuple["PreviousMatch", dict], None, None]:
+        """
+        Fetches the match details of every match in the match histories of all the users concurrently. Matches shared between users are only fetched once
+
+        Parameters:
+        start (int, defaults to 0): The starting index of each match history
+        end (int, defaults to 20): The ending index of each match history
+        queue_ID (str, optional): The queue ID to get the history for (ex. "competitive")
+        max_workers (int, defaults to 8): The maximum number of requests that are sent at once
+
+        Returns:
+        Generator[Tuple[PreviousMatch, dict], None, None]: Yields each match and its raw match details as soon as they are fetched
+        """
 
-        return [u.game_name + "#" + u.game_tag for u in filtered.visible_users]
+        from ..match.matchDetailsFetcher import MatchDetailsFetcher
+        return MatchDetailsFetcher(self.session, max_workers=max_workers).iter_match_details(self.users, start=start, end=end, queue_ID=queue_ID)
 
     def __iter__(self):
         return iter(self.users)
@@ -1,4 +1,34 @@
+from typing import Any, Callable, Generator, List, Optional, TypeVar
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qsl, urlencode
 import base64
+import hashlib
+import json
+
+T = TypeVar("T")
+
+# the services that a local stand-in server emulates, named by the first part of the url's path (see Session's base_url)
+STAND_IN_SERVICES = ("pd", "glz", "shared", "auth", "pas", "clientconfig")
+
+
+def get_stand_in_service(url: str) -> Optional[str]:
+    """
+    Finds the service that a url on a local stand-in server emulates
+
+    Parameters:
+    url (str): The url
+
+    Returns:
+    Optional[str]: The service (one of STAND_IN_SERVICES), or None if the url is not on a stand-in server (ex. a request to the local Riot Client)
+    """
+
+    split_url = urlsplit(url)
+
+    if (split_url.hostname or "").lower() not in ("127.0.0.1", "localhost"):
+        return None
+
+    service = split_url.path.split("/", 2)[1] if split_url.path.startswith("/") else ""
+    return service if service in STAND_IN_SERVICES else None
 
 
 def base64_url_decode(base64_data: str) -> bytes:
@@ -14,3 +44,170 @@ def base64_url_decode(base64_data: str) -> bytes:
 
     padding = '=' * (4 - len(base64_data) % 4)
     return base64.urlsafe_b64decode(base64_data + padding)
+
+
+def build_request_key(method: str, url: str, args: tuple = (), kwargs: Optional[dict] = None) -> str:
+    """
+    Builds a canonical cache key for a request. Equivalent requests produce the same key, regardless of the order of their query parameters or keyword arguments
+
+    Parameters:
+    method (str): The method the request will be sent with
+    url (str): The url of the request
+    args (tuple, defaults to ()): Additional positional arguments the request will be sent with
+    kwargs (dict, optional, defaults to None): Additional keyword arguments the request will be sent with (ex. params, json, data)
+
+    Returns:
+    str: The canonical key of the request
+    """
+
+    kwargs = dict(kwargs) if kwargs else {}
+
+    split_url = urlsplit(url)
+
+    # merge the query string with the params keyword argument, then sort them
+    query = parse_qsl(split_url.query, keep_blank_values=True)
+    params = kwargs.pop("params", None)
+    if params:
+        query.extend(params.items() if isinstance(params, dict) else params)
+
+    query.sort(key=lambda item: (str(item[0]), str(item[1])))
+
+    key = f"{method.upper()} {split_url.scheme.lower()}://{split_url.netloc.lower()}{split_url.path}"
+    if query:
+        key += "?" + urlencode(query)
+
+    # hash the body and any remaining arguments instead of storing them in the key
+    if args or kwargs:
+        body = json.dumps([args, kwargs], sort_keys=True, separators=(",", ":"), default=repr)
+        key += "#" + hashlib.sha1(body.encode()).hexdigest()
+
+    return key
+
+
+def _read_only(*args, **kwargs):
+    raise TypeError("Cached responses are read-only. Use utilities.thaw to get a mutable copy")
+
+
+class FrozenDict(dict):
+    """
+    A dict that cannot be modified. Used to share cached responses safely
+    """
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = __ior__ = _read_only
+
+    def __copy__(self) -> dict:
+        return dict(self)
+
+    def __deepcopy__(self, memo: dict) -> dict:
+        return thaw(self)
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+class FrozenList(list):
+    """
+    A list that cannot be modified. Used to share cached responses safely
+    """
+
+    __setitem__ = __delitem__ = append = extend = insert = remove = pop = clear = sort = reverse = __iadd__ = __imul__ = _read_only
+
+    def __copy__(self) -> list:
+        return list(self)
+
+    def __deepcopy__(self, memo: dict) -> list:
+        return thaw(self)
+
+    def __reduce__(self):
+        return (FrozenList, (list(self),))
+
+
+def freeze(data: Any) -> Any:
+    """
+    Converts JSON data into a read-only version of itself. Dicts become FrozenDicts and lists become FrozenLists
+
+    Parameters:
+    data (Any): The data to freeze
+
+    Returns:
+    Any: The read-only data
+    """
+
+    if isinstance(data, (FrozenDict, FrozenList)):
+        return data
+
+    if isinstance(data, dict):
+        return FrozenDict((key, freeze(value)) for key, value in data.items())
+
+    if isinstance(data, list):
+        return FrozenList(freeze(value) for value in data)
+
+    return data
+
+
+def thaw(data: Any) -> Any:
+    """
+    Creates a mutable copy of data returned by freeze
+
+    Parameters:
+    data (Any): The data to copy
+
+    Returns:
+    Any: The mutable copy
+    """
+
+    if isinstance(data, dict):
+        return {key: thaw(value) for key, value in data.items()}
+
+    if isinstance(data, list):
+        return [thaw(value) for value in data]
+
+    return data
+
+
+def iter_paginated(fetch_page: Callable[[int, int], List[T]], page_size: int = 20, start: int = 0, prefetch: bool = True) -> Generator[T, None, None]:
+    """
+    Lazily walks an endpoint that is paged with start and end indices. Only the current and next page are kept in memory
+
+    Parameters:
+    fetch_page (Callable[[int, int], List[T]]): Fetches the items between a start index and an end index
+    page_size (int, defaults to 20): The number of items requested per page
+    start (int, defaults to 0): The index of the first item
+    prefetch (bool, defaults to True): If True, the next page is fetched in the background while the current page is being consumed
+
+    Returns:
+    Generator[T, None, None]: Yields every item, in order, until a page comes back short
+    """
+
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="valorant-pagination") if prefetch else None
+
+    def get_page(page_start: int):
+        if executor is None:
+            return fetch_page(page_start, page_start + page_size)
+
+        return executor.submit(fetch_page, page_start, page_start + page_size)
+
+    try:
+        next_page = get_page(start)
+
+        while True:
+            page = next_page.result() if executor is not None else next_page
+
+            # a short page means there is nothing after it
+            is_last_page = len(page) < page_size
+            start += page_size
+
+            if not is_last_page and executor is not None:
+                next_page = get_page(start)
+
+            yield from page
+
+            if is_last_page:
+                return
+
+            if executor is None:
+                next_page = get_page(start)
+
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False)